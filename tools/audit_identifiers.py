@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import sys
+from argparse import ArgumentParser
+from typing import Dict, Iterator
+
+from identifiers import SCHEMES, check_ids
+from validate_examples import find_records, load_records
+
+
+def iter_ids(value) -> Iterator[str]:
+    """Strings of a record prefixed with the scheme of an id, e.g. 'orcid:'"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from iter_ids(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_ids(item)
+    elif isinstance(value, str):
+        prefix, separator, _ = value.partition(":")
+        if separator and prefix.lower() in SCHEMES:
+            yield value
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Audit identifiers in bulk: check the format of the ids "
+        "found in records, or listed one per line in files"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Directories, files or glob patterns of records, or with --lists "
+        "files of ids (- for stdin)",
+    )
+    parser.add_argument(
+        "--lists",
+        action="store_true",
+        help="The inputs are files with one id per line",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    ids = []
+    if args.lists:
+        for name in args.inputs:
+            f = sys.stdin if name == "-" else open(name, encoding="utf-8")
+            with f:
+                ids.extend(line.strip() for line in f if line.strip())
+    else:
+        for path in find_records(*args.inputs):
+            for record in load_records(path):
+                ids.extend(iter_ids(record))
+
+    valid = check_ids(ids)
+    counts: Dict[str, list] = {}
+    for value, is_valid in zip(ids, valid):
+        scheme = value.partition(":")[0].lower()
+        counts.setdefault(scheme, [0, 0])[not is_valid] += 1
+        if not is_valid:
+            print(value)
+    for scheme, (n_valid, n_invalid) in sorted(counts.items()):
+        print(f"{scheme}: {n_valid} valid, {n_invalid} invalid", file=sys.stderr)
+    sys.exit(1 if not valid.all() else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compares the validation time of a metadata example with the single pass
+Choose validator against the previous implementation, which validated the
+base schema again in fail() and copied the value of every polymorphic node.
+"""
+import sys
+from argparse import ArgumentParser
+from copy import deepcopy
+from pathlib import Path
+from timeit import repeat
+
+import yamale
+from yamale.schema.datapath import DataPath
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from custom_validators import Choose, current_schema, extend_validators  # noqa: E402
+from validate_examples import merged_schema  # noqa: E402
+
+REPO = Path(__file__).parent.parent.parent
+
+
+class PreviousChoose(Choose):
+    """The Choose validator before single pass validation"""
+
+    def remove_validated_items(self, value):
+        base_schema = current_schema.schema.includes[self.base_schema.include_name]
+        value = {**value}
+        for field in base_schema.dict:
+            value.pop(field, None)
+        return value
+
+    def validate(self, value):
+        return yamale.validators.Validator.validate(self, value)
+
+    def fail(self, value):
+        errs = current_schema.schema._validate_include(
+            self.base_schema, value, path=DataPath(), strict=False
+        )
+        if errs != []:
+            return "\n".join(errs)
+        detailed_type = self.get_detailed_type(value)
+        value = self.remove_validated_items(value)
+        errs = current_schema.schema._validate_include(
+            self.detailed_schemas[detailed_type], value, path=DataPath(), strict=True
+        )
+        return "\n".join(errs)
+
+    def _is_valid(self, value):
+        errs = current_schema.schema._validate_include(
+            self.base_schema, value, path=DataPath(), strict=False
+        )
+        if errs != []:
+            return False
+        detailed_type = self.get_detailed_type(value)
+        value = self.remove_validated_items(value)
+        errs = current_schema.schema._validate_include(
+            self.detailed_schemas[detailed_type], value, path=DataPath(), strict=True
+        )
+        return errs == []
+
+
+def time_validation(schema, data, number, repeats):
+    current_schema.schema = schema
+    errors = yamale.validate(schema, data, _raise_error=False)[0].errors
+    best = min(
+        repeat(
+            lambda: yamale.validate(schema, data, _raise_error=False),
+            number=number,
+            repeat=repeats,
+        )
+    )
+    return best / number, errors
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--technique", default="BLI")
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schemas = REPO / "models" / "values-only"
+    inputs = (schemas / f"{args.technique}.yaml", schemas / "general_parameters.yaml")
+    previous_validators = {**extend_validators, Choose.tag: PreviousChoose}
+    data = yamale.make_data(REPO / "metadata-examples" / f"{args.technique}.yaml")
+
+    # every entity of interest fails in its detailed schema
+    invalid = deepcopy(data)
+    for entity in invalid[0][0]["general_parameters"]["entities_of_interest"]:
+        entity["unexpected_field"] = None
+
+    previous_schema = merged_schema(*inputs, validators=previous_validators)
+    single_pass_schema = merged_schema(*inputs)
+    for name, records in (("valid", data), ("invalid", invalid)):
+        previous, previous_errors = time_validation(
+            previous_schema, records, args.number, args.repeat
+        )
+        single_pass, errors = time_validation(
+            single_pass_schema, records, args.number, args.repeat
+        )
+        assert errors == previous_errors
+
+        print(f"{args.technique} ({name}):")
+        print(f"  previous Choose    {previous * 1000:.2f} ms/record")
+        print(f"  single pass Choose {single_pass * 1000:.2f} ms/record")
+        print(f"  speedup {previous / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
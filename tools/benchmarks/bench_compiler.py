@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compares the validation time of a metadata example with the Yamale
+interpreter against the schema compiled by schema_compiler.py, and the time to
+build the compiled schema with and without its on disk code cache. Also
+compares validate_record with screen_record (validate_examples.py
+--fast-reject), which checks the record with the compiled is_valid first.
+"""
+import sys
+from argparse import ArgumentParser
+from copy import deepcopy
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from timeit import repeat
+
+import yamale
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from schema_compiler import CompiledSchema  # noqa: E402
+from validate_examples import (  # noqa: E402
+    merged_schema,
+    screen_record,
+    validate_record,
+)
+
+REPO = Path(__file__).parent.parent.parent
+
+
+def best_time(function, number, repeats):
+    return min(repeat(function, number=number, repeat=repeats)) / number
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--technique", default="BLI")
+    parser.add_argument("--number", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schemas = REPO / "models" / "values-only"
+    inputs = (schemas / f"{args.technique}.yaml", schemas / "general_parameters.yaml")
+    schema = merged_schema(*inputs)
+    record = yamale.make_data(REPO / "metadata-examples" / f"{args.technique}.yaml")
+    record = record[0][0]
+
+    with TemporaryDirectory() as cache_dir:
+        start = perf_counter()
+        compiled = CompiledSchema(schema, cache_dir=Path(cache_dir))
+        cold = perf_counter() - start
+        start = perf_counter()
+        CompiledSchema(schema, cache_dir=Path(cache_dir))
+        warm = perf_counter() - start
+    print(
+        f"{args.technique} compiled schema ({len(compiled.source.splitlines())} lines):"
+    )
+    print(f"  cold build {cold * 1000:.1f} ms, cached build {warm * 1000:.1f} ms")
+
+    # every entity of interest fails in its detailed schema
+    invalid = deepcopy(record)
+    for entity in invalid["general_parameters"]["entities_of_interest"]:
+        entity["unexpected_field"] = None
+
+    for name, data in (("valid", record), ("invalid", invalid)):
+        errors = schema.validate(data, "", True).errors
+        assert compiled.validate(data) == errors
+        interpreter = best_time(
+            lambda: schema.validate(data, "", True), args.number, args.repeat
+        )
+        generated = best_time(lambda: compiled.validate(data), args.number, args.repeat)
+        assert compiled.is_valid(data) == (not errors)
+        checked = best_time(lambda: compiled.is_valid(data), args.number, args.repeat)
+        schemas = {args.technique: compiled}
+        validated = best_time(
+            lambda: validate_record(data, schemas), args.number, args.repeat
+        )
+        screened = best_time(
+            lambda: screen_record(data, schemas), args.number, args.repeat
+        )
+
+        print(f"{args.technique} ({name}):")
+        print(f"  interpreter     {interpreter * 1000:.2f} ms/record")
+        print(f"  compiled schema {generated * 1000:.2f} ms/record")
+        print(f"  speedup {interpreter / generated:.2f}x")
+        print(f"  compiled check  {checked * 1000:.3f} ms/record")
+        print(f"  validate_record {validated * 1000:.2f} ms/record (with links)")
+        print(f"  screen_record   {screened * 1000:.2f} ms/record (with links)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compares the time of unrolling the values-only schemas with the memoized single
+pass expansion of YamaleTree.build against the previous implementation, which
+expanded the tree one level at a time until its string no longer changed.
+"""
+import sys
+from argparse import ArgumentParser
+from copy import deepcopy
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import yamale
+import yamale.validators.validators as validators
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import custom_validators  # noqa: E402
+from unroll import YamaleTree  # noqa: E402
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+SCHEMA_FILES = ("MST", "BLI", "ITC", "SPR")
+
+
+class PreviousYamaleTree(YamaleTree):
+    """YamaleTree.build before the single pass expansion"""
+
+    def build(self):
+        while True:
+            old_tree_string = str(deepcopy(self.tree))
+            self._construct_tree(self.tree)
+            new_tree_string = str(self.tree)
+            if old_tree_string == new_tree_string:
+                break
+
+    def _get_include(self, value, att="dict"):
+        if att == "dict":
+            return self.includes[value.include_name].dict
+        elif att == "_schema":
+            return self.includes[value.include_name]._schema
+        elif att == "choose":
+            return self._from_choose(value)
+
+    def _from_choose(self, value, tree=None):
+        if tree is None:
+            tree = {}
+        value = yamale.make_schema(
+            content=f"tmp: {value}", validators=custom_validators.extend_validators
+        )
+        value = value.dict["tmp"]
+        tree.update(deepcopy(self.includes[value.base_schema.include_name].dict))
+        for v in value.detailed_schemas.values():
+            inc = self.includes[v.include_name].dict
+            if not isinstance(inc, str):
+                tree.update(inc)
+            else:
+                self._from_choose(inc, tree)
+        return tree
+
+    def _construct_tree(self, tree):
+        for key, value in tree.items():
+            if isinstance(value, dict):
+                self._construct_tree(value)
+            elif isinstance(value, validators.Include):
+                include = self._get_include(value)
+                if isinstance(include, str):
+                    include = self._get_include(value, "_schema")
+                tree.update({key: include})
+            elif isinstance(value, validators.List):
+                includes = []
+                value_class = value.__class__
+                for arg in value.args:
+                    include = arg
+                    if isinstance(arg, validators.Include):
+                        include = self._get_include(arg)
+                    elif isinstance(arg, dict):
+                        self._construct_tree(arg)
+                    elif isinstance(arg, str):
+                        include = self._get_include(arg, "choose")
+                    includes.append(include)
+                if includes:
+                    tree.update({key: value_class(*includes)})
+
+
+def unroll_all(tree_class, output_folder: Path) -> float:
+    """Builds and writes the trees of all schema files, returns the build time"""
+    trees = []
+    for name in SCHEMA_FILES:
+        tree = tree_class(SCHEMAS / f"{name}.yaml", expansions={})
+        tree.add_external_includes(SCHEMAS / "general_parameters.yaml")
+        trees.append(tree)
+    # the single pass trees of one run share their expansions
+    for tree in trees[1:]:
+        tree.expansions = trees[0].expansions
+
+    start = perf_counter()
+    for tree in trees:
+        tree.build()
+    elapsed = perf_counter() - start
+    for name, tree in zip(SCHEMA_FILES, trees):
+        tree.write(output_folder / f"{name}.txt")
+    return elapsed
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as previous_folder, TemporaryDirectory() as folder:
+        previous = min(
+            unroll_all(PreviousYamaleTree, Path(previous_folder))
+            for _ in range(args.repeat)
+        )
+        single_pass = min(
+            unroll_all(YamaleTree, Path(folder)) for _ in range(args.repeat)
+        )
+        for name in SCHEMA_FILES:
+            file_name = f"{name}.txt"
+            assert (Path(previous_folder) / file_name).read_text() == (
+                Path(folder) / file_name
+            ).read_text(), f"{file_name} differs"
+
+    print(f"{', '.join(SCHEMA_FILES)} with general_parameters.yaml:")
+    print(f"  previous fixpoint    {previous * 1000:.1f} ms")
+    print(f"  single pass expansion {single_pass * 1000:.1f} ms")
+    print(f"  speedup {previous / single_pass:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+
+import dataclasses
+import hashlib
+import json
+import sys
+import traceback
+from argparse import ArgumentParser
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from module_sources import module_sources
+
+TOOLS = Path(__file__).parent
+REPO = TOOLS.parent
+MODELS = REPO / "models"
+MAIN = MODELS / "main"
+VALUES_ONLY = MODELS / "values-only"
+UNROLLED = MODELS / "unrolled"
+OAREPO = MODELS / "oarepo"
+EXAMPLES = REPO / "metadata-examples"
+TECHNIQUES = ("BLI", "ITC", "MST", "SPR")
+STAMPS = TOOLS / ".build_stamps.json"
+
+UP_TO_DATE = "up to date"
+RAN = "ran"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+@dataclasses.dataclass
+class Step:
+    """
+    A step of the build: action(*args) is run in a worker process when the
+    contents of the inputs, of the sources of the tool modules the action runs
+    or of the outputs changed since the last time it ran. A step depends on the
+    steps producing its inputs.
+    """
+
+    name: str
+    action: Callable
+    args: Tuple
+    inputs: List[Path]
+    outputs: List[Path]
+    modules: Tuple[str, ...] = ()
+
+
+@dataclasses.dataclass
+class Result:
+    step: str
+    status: str
+    # seconds spent running the step, or checking that it is up to date
+    time: float = 0.0
+    error: Optional[str] = None
+
+
+def _digest(paths: Iterable[Path]) -> Optional[str]:
+    """Hash of the names and contents of files, None if one is missing"""
+    digest = hashlib.sha256()
+    for path in sorted(set(paths)):
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        digest.update(f"{path}\0{len(content)}\0".encode())
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def _input_digest(step: Step) -> Optional[str]:
+    sources = [
+        source
+        for module in step.modules
+        for source in module_sources(TOOLS / f"{module}.py")
+    ]
+    digest = _digest([*step.inputs, *sources])
+    if digest is None:
+        return None
+    return hashlib.sha256(f"{digest}\0{step.args!r}".encode()).hexdigest()
+
+
+def dependencies(steps: Sequence[Step]) -> Dict[str, List[str]]:
+    """Names of the steps producing the inputs of every step"""
+    producers = {output: step.name for step in steps for output in step.outputs}
+    return {
+        step.name: sorted(
+            {producers[path] for path in step.inputs if path in producers} - {step.name}
+        )
+        for step in steps
+    }
+
+
+def _run_step(action: Callable, args: Tuple) -> float:
+    start = perf_counter()
+    action(*args)
+    return perf_counter() - start
+
+
+def build(
+    steps: Sequence[Step],
+    workers: Optional[int] = None,
+    force: bool = False,
+    stamps_path: Path = STAMPS,
+) -> List[Result]:
+    """
+    Runs the steps that are not up to date, independent steps in parallel in a
+    pool of workers processes, and returns the result of every step. A step is
+    checked once the steps it depends on are done, so a step whose inputs were
+    rebuilt unchanged is not run again.
+    """
+    try:
+        stamps = json.loads(stamps_path.read_text())
+    except (FileNotFoundError, ValueError):
+        stamps = {}
+    depends_on = dependencies(steps)
+    pending = {step.name: step for step in steps}
+    results: Dict[str, Result] = {}
+    running = {}
+    pool = None
+
+    try:
+        while pending or running:
+            for name, step in list(pending.items()):
+                if any(dep not in results for dep in depends_on[name]):
+                    continue
+                del pending[name]
+                if any(
+                    results[dep].status in (FAILED, BLOCKED) for dep in depends_on[name]
+                ):
+                    results[name] = Result(name, BLOCKED)
+                    continue
+                start = perf_counter()
+                inputs = _input_digest(step)
+                stamp = stamps.get(name, {})
+                if (
+                    not force
+                    and inputs is not None
+                    and stamp.get("inputs") == inputs
+                    and stamp.get("outputs") == _digest(step.outputs)
+                ):
+                    results[name] = Result(name, UP_TO_DATE, perf_counter() - start)
+                    continue
+                if pool is None:
+                    pool = ProcessPoolExecutor(workers)
+                future = pool.submit(_run_step, step.action, step.args)
+                running[future] = step
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Steps depending on each other: {list(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as e:
+                    error = "".join(traceback.format_exception(e)).rstrip()
+                    results[step.name] = Result(step.name, FAILED, error=error)
+                    stamps.pop(step.name, None)
+                    continue
+                results[step.name] = Result(step.name, RAN, elapsed)
+                # the inputs of a step are not changed by the steps running
+                # in parallel, which do not depend on each other
+                stamps[step.name] = {
+                    "inputs": _input_digest(step),
+                    "outputs": _digest(step.outputs),
+                }
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        stamps_path.write_text(json.dumps(stamps, indent=2, sort_keys=True) + "\n")
+    return [results[step.name] for step in steps]
+
+
+# the tool modules are imported by the actions in the worker processes, so
+# checking that the steps are up to date does not import them
+
+
+def strip_descriptions(schema_files: List[Path], output_folder: Path) -> None:
+    from values_only import SimplifiedSchema
+
+    for path in schema_files:
+        schema = SimplifiedSchema()
+        schema.read(path)
+        schema.strip_description()
+        schema.write(output_folder / path.name)
+
+
+def unroll_schemas(
+    schema_files: List[Path], output_folder: Path, includes: List[Path]
+) -> None:
+    from unroll import unroll_files
+
+    unroll_files(schema_files, output_folder, includes)
+
+
+def field_catalogues(
+    schema_files: List[Path], output_folder: Path, includes: List[Path]
+) -> None:
+    from field_catalogue import write_catalogues
+
+    write_catalogues(schema_files, output_folder, includes)
+
+
+def validate_examples(schema_folder: Path, examples_folder: Path) -> None:
+    from validate_examples import validate_test_data
+
+    validate_test_data(schema_folder, examples_folder)
+
+
+def oarepo_model(input_file: Path, include: Path, out_dir: Path) -> None:
+    from yamale2oarepo import convert_batch, write_outputs
+
+    write_outputs(convert_batch([input_file], include), out_dir)
+
+
+def oarepo_files(attachment: Path, out_dir: Path) -> None:
+    from yamale2oarepo import files_output, write_outputs
+
+    write_outputs([files_output(attachment)], out_dir)
+
+
+def mapping_budgets(models_folder: Path) -> None:
+    from mapping_budget import check_budgets
+
+    check_budgets(models_folder)
+
+
+def pipeline() -> List[Step]:
+    """
+    The main models are converted to value-only models, which are unrolled and
+    validate the metadata examples, and to oarepo (Invenio) models, whose
+    mappings are checked against the limits of the index
+    """
+    main_schemas = sorted(MAIN.glob("*.yaml"))
+    values_only = [VALUES_ONLY / path.name for path in main_schemas]
+    general_parameters = VALUES_ONLY / "general_parameters.yaml"
+    general = MAIN / "general_parameters.yaml"
+    steps = [
+        Step(
+            "values_only",
+            strip_descriptions,
+            (main_schemas, VALUES_ONLY),
+            main_schemas,
+            values_only,
+            ("values_only",),
+        ),
+        Step(
+            "unroll",
+            unroll_schemas,
+            (values_only, UNROLLED, [general_parameters]),
+            values_only,
+            [UNROLLED / f"{path.stem}.txt" for path in values_only],
+            ("unroll",),
+        ),
+        Step(
+            "field_catalogue",
+            field_catalogues,
+            (values_only, UNROLLED, [general_parameters]),
+            values_only,
+            [UNROLLED / f"{path.stem}.fields.jsonl" for path in values_only],
+            ("field_catalogue",),
+        ),
+        Step(
+            "validate_examples",
+            validate_examples,
+            (VALUES_ONLY, EXAMPLES),
+            [
+                general_parameters,
+                *(VALUES_ONLY / f"{t}.yaml" for t in TECHNIQUES),
+                *(EXAMPLES / f"{t}.yaml" for t in TECHNIQUES),
+            ],
+            [EXAMPLES / f"{t}.json" for t in TECHNIQUES],
+            ("validate_examples",),
+        ),
+        # general_parameters.yaml is only converted to definitions
+        Step(
+            "oarepo_general_parameters",
+            oarepo_model,
+            (general, general, OAREPO),
+            [general],
+            [OAREPO / "general_parameters-definitions.yaml"],
+            ("yamale2oarepo",),
+        ),
+        Step(
+            "oarepo_files",
+            oarepo_files,
+            (MAIN / "file_attachment.yaml", OAREPO),
+            [MAIN / "file_attachment.yaml"],
+            [OAREPO / "files.yaml"],
+            ("yamale2oarepo",),
+        ),
+    ]
+    # a technique is converted again only when it or the include changed
+    for technique in TECHNIQUES:
+        schema = MAIN / f"{technique}.yaml"
+        package = technique.lower()
+        steps.append(
+            Step(
+                f"oarepo_{package}",
+                oarepo_model,
+                (schema, general, OAREPO),
+                [schema, general],
+                [
+                    OAREPO / f"{package}-definitions.yaml",
+                    OAREPO / f"{package}-metadata.yaml",
+                ],
+                ("yamale2oarepo",),
+            )
+        )
+    steps.append(
+        # fails when the mappings exceed yamale2oarepo_config.MAPPING_LIMITS
+        Step(
+            "mapping_budget",
+            mapping_budgets,
+            (OAREPO,),
+            [
+                *(OAREPO / f"{t.lower()}-definitions.yaml" for t in TECHNIQUES),
+                *(OAREPO / f"{t.lower()}-metadata.yaml" for t in TECHNIQUES),
+            ],
+            [],
+            ("mapping_budget",),
+        )
+    )
+    return steps
+
+
+def print_summary(results: Sequence[Result], elapsed: float, file=sys.stdout) -> None:
+    width = max(len(result.step) for result in results)
+    for result in results:
+        print(
+            f"{result.step:<{width}}  {result.status:<10}  {result.time:8.3f} s",
+            file=file,
+        )
+    print(f"{'total':<{width}}  {'':<10}  {elapsed:8.3f} s", file=file)
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Convert the main models to value-only, unrolled and oarepo "
+        "models and validate the metadata examples, running only the steps whose "
+        "inputs changed"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Run all steps, even if up to date"
+    )
+    parser.add_argument(
+        "--stamps",
+        type=Path,
+        default=STAMPS,
+        help="File storing the hashes of the inputs and outputs of the last runs",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    start = perf_counter()
+    results = build(pipeline(), args.workers, args.force, args.stamps)
+    for result in results:
+        if result.error is not None:
+            print(f"{result.step} failed:\n{result.error}\n", file=sys.stderr)
+    print_summary(results, perf_counter() - start)
+    sys.exit(1 if any(result.status in (FAILED, BLOCKED) for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,25 @@
 import re
+from copy import copy, deepcopy
 from io import StringIO
 from threading import local
+from typing import Iterator, Tuple
 from uuid import UUID
 
 import ruamel.yaml
+from yamale import util
 from yamale.schema.datapath import DataPath
-from yamale.validators import DefaultValidators, Include, String, Validator
-
+from yamale.validators import Any, DefaultValidators, Include
+from yamale.validators import List as ListValidator
+from yamale.validators import Map, String, Subset, Validator
+
+if __package__:
+    # imported as tools.custom_validators
+    from .identifiers import check_id
+else:
+    from identifiers import check_id
+
+# fallback for choose validators not bound to a schema by bind_schema, must be
+# set to the schema being validated before calling yamale.validate
 current_schema = local()
 
 
@@ -86,41 +99,66 @@ class Fulltext(String):
     tag = "fulltext"
 
 
-class MacroMolecule_id(Keyword):
+class Identifier(Keyword):
+    """
+    Id prefixed with its scheme, e.g. 'orcid:0000-0002-1825-0097'. The scheme
+    (case-insensitive) must be one of schemes and the id must have its format,
+    including check digits, see identifiers.SCHEMES.
+    """
+
+    schemes: Tuple[str, ...] = ()
+
+    def _is_valid(self, value):
+        return check_id(value, self.schemes)
+
+    def fail(self, value):
+        prefixes = ", ".join(f"{scheme}:" for scheme in self.schemes)
+        return f"'{value}' is not a {self.tag} ({prefixes} followed by a valid id)."
+
+
+class MacroMolecule_id(Identifier):
     tag = "macromolecule_id"
-    # put into translation yamale2model
-    # enum(pdb:, uniprot:)
+    schemes = ("pdb", "uniprot")
 
 
-class Database_id(Keyword):
+class Database_id(Identifier):
     tag = "database_id"
-    # put into translation yamale2model
-    # enum(doi:)
+    # external databases of entities refer to PDB and UniProt entries
+    schemes = ("doi", "pdb", "uniprot")
 
 
-class Chemical_id(Keyword):
+class Chemical_id(Identifier):
     tag = "chemical_id"
-    # put into translation yamale2model
-    # enum(CAS number 'cas:', 'PubChem Compound ID pccid:', 'PubChem Substance ID pcsid:')
+    # CAS number, PubChem Compound ID and PubChem Substance ID
+    schemes = ("cas", "pccid", "pcsid")
 
 
-class Person_id(Keyword):
+class Person_id(Identifier):
     tag = "person_id"
-    # put into translation yamale2model
-    # enum(orcid:')
+    schemes = ("orcid",)
 
 
 class Nested_include(Include):
     tag = "nested_include"
 
 
-class Publication_id(Keyword):
+class Publication_id(Identifier):
     tag = "publication_id"
-    # put into translation yamale2model
-    # enum(doi: isbn:')
+    schemes = ("doi", "isbn")
 
 
 class Choose(Validator):
+    """
+    Polymorphic object: the fields of the base schema are always validated,
+    the remaining fields by the detailed schema selected by the value of the
+    type field, e.g. {"type": "Molecular assembly", ...} selects
+    Molecular_assembly.
+
+    Yamale would look like:
+
+    Entity: choose(include('Entity_base'), Polymer=include('Polymer'), Molecular_assembly=include('Molecular_assembly'))
+    """
+
     tag = "choose"
 
     def __init__(self, base_schema, *args, type_field="type", **kwargs):
@@ -128,6 +166,14 @@ class Choose(Validator):
         self.base_schema = base_schema
         self.detailed_schemas = kwargs
         self.type_field = type_field
+        # schema owning the includes, set by bind_schema
+        self.schema = None
+        # value of the type field -> include of the detailed schema for the
+        # spellings derived from the keyword names. It is never changed after
+        # construction, as validators are shared between threads, other
+        # spellings are resolved by get_detailed_type on every call.
+        self._detailed_by_type = {k.replace("_", " "): v for k, v in kwargs.items()}
+        self._detailed_by_type.update(kwargs)
 
     def get_detailed_type(self, value):
         if self.type_field in value.keys():
@@ -135,38 +181,221 @@ class Choose(Validator):
             ret = ret.replace(")", "")
             return ret.replace(" ", "_")
 
-    def remove_validated_items(self, value):
-        base_schema = current_schema.schema.includes[self.base_schema.include_name]
-        value = {**value}
-        for field in base_schema.dict:
-            value.pop(field, None)
-        return value
+    def get_detailed_schema(self, value):
+        """Returns the include of the detailed schema selected by value or None"""
+        detailed_type = value.get(self.type_field)
+        try:
+            return self._detailed_by_type[detailed_type]
+        except (KeyError, TypeError):
+            pass
+        if not isinstance(detailed_type, str):
+            return None
+        return self.detailed_schemas.get(self.get_detailed_type(value))
+
+    def get_schema(self):
+        """Returns the schema whose includes are used for validation"""
+        if self.schema is not None:
+            return self.schema
+        return current_schema.schema
+
+    def validate(self, value):
+        errors = self._validate_errors(self.get_schema(), value, DataPath())
+        if errors:
+            return ["\n".join(errors)]
+        return []
 
     def fail(self, value):
-        errs = current_schema.schema._validate_include(
-            self.base_schema, value, path=DataPath(), strict=False
+        return "\n".join(self._validate_errors(self.get_schema(), value, DataPath()))
+
+    def _is_valid(self, value):
+        return self._fields_valid(self.get_schema(), value, frozenset())
+
+    def __deepcopy__(self, memo):
+        # the bound schema is shared with the copy instead of being copied
+        memo[id(self.schema)] = self.schema
+        clone = copy(self)
+        clone.__dict__ = deepcopy(self.__dict__, memo)
+        return clone
+
+    def _validate_errors(self, schema, value, path, skip=frozenset()):
+        """
+        Validates value in a single pass and returns the errors. The fields in
+        skip have already been validated by an enclosing choose and are treated
+        as absent, which avoids copying value without them.
+        """
+        if not isinstance(value, dict):
+            return [f"{path} : '{value}' is not a map"]
+
+        errs = _validate_include_fields(
+            schema, self.base_schema, value, path, strict=False, skip=skip
         )
-        if errs != []:
-            return "\n".join(errs)
-        detailed_type = self.get_detailed_type(value)
-        value = self.remove_validated_items(value)
-        errs = current_schema.schema._validate_include(
-            self.detailed_schemas[detailed_type], value, path=DataPath(), strict=True
+        if errs:
+            return errs
+
+        detailed_schema = self.get_detailed_schema(value)
+        if detailed_schema is None:
+            return [
+                f"{path + DataPath(self.type_field)}: "
+                f"'{value.get(self.type_field)}' does not select a schema"
+            ]
+        base_fields = schema.includes[self.base_schema.include_name].dict
+        return _validate_include_fields(
+            schema,
+            detailed_schema,
+            value,
+            path,
+            strict=True,
+            skip=skip.union(base_fields),
         )
-        return "\n".join(errs)
 
-    def _is_valid(self, value):
-        errs = current_schema.schema._validate_include(
-            self.base_schema, value, path=DataPath(), strict=False
+    def _fields_valid(self, schema, value, skip=frozenset()) -> bool:
+        """Same as not _validate_errors(...), returning at the first error"""
+        if not isinstance(value, dict):
+            return False
+        if not _include_fields_valid(schema, self.base_schema, value, False, skip):
+            return False
+        detailed_schema = self.get_detailed_schema(value)
+        if detailed_schema is None:
+            return False
+        base_fields = schema.includes[self.base_schema.include_name].dict
+        return _include_fields_valid(
+            schema, detailed_schema, value, True, skip.union(base_fields)
         )
-        if errs != []:
+
+
+def _validate_include_fields(schema, include, value, path, strict, skip):
+    """
+    Same as Schema._validate_include for a dict value, but the fields in skip
+    are treated as absent from it
+    """
+    include_schema = schema.includes.get(include.include_name)
+    if not include_schema:
+        return ["Include '%s' has not been defined." % include.include_name]
+    strict = strict if include.strict is None else include.strict
+    validators = include_schema._schema
+
+    if isinstance(validators, Choose):
+        # reported like any other validator failing on value
+        errors = validators._validate_errors(schema, value, path, skip)
+        if errors:
+            return ["%s: %s" % (path, "\n".join(errors))]
+        return []
+    if not skip:
+        return include_schema._validate(validators, value, path, strict)
+    if not isinstance(validators, dict):
+        value = {k: v for k, v in value.items() if k not in skip}
+        return include_schema._validate(validators, value, path, strict)
+
+    errors = []
+    if strict:
+        for key in value.keys() - skip - validators.keys():
+            errors.append("%s: Unexpected element" % (path + DataPath(key)))
+
+    for key, validator in validators.items():
+        if key in skip:
+            if isinstance(validator, Validator) and validator.is_optional:
+                continue
+            errors.append("%s: Required field missing" % (path + DataPath(key)))
+        else:
+            errors += include_schema._validate_item(validator, value, path, strict, key)
+    return errors
+
+
+def is_valid(schema, data, strict: bool = True) -> bool:
+    """
+    Whether schema.validate(data, "", strict) would return no errors. Returns
+    at the first error without formatting any error message, so it is cheaper
+    to screen data with it and validate only the rejected data again for
+    their errors than to collect the errors of all data.
+    """
+    return _node_valid(schema, schema._schema, data, strict)
+
+
+def value_valid(validator: Validator, value) -> bool:
+    """Same as validator.validate(value) == [] without formatting the errors"""
+    if not validator._is_valid(value):
+        return False
+    for constraint in validator._constraints_inst:
+        if constraint.is_active and not constraint._is_valid(value):
+            return False
+    return True
+
+
+def _node_valid(schema, validator, data, strict) -> bool:
+    """Same as not Schema._validate(validator, data, path, strict)"""
+    if isinstance(validator, (dict, list)):
+        if isinstance(validator, dict):
+            if not util.is_map(data):
+                return False
+        elif not util.is_list(data):
             return False
-        detailed_type = self.get_detailed_type(value)
-        value = self.remove_validated_items(value)
-        errs = current_schema.schema._validate_include(
-            self.detailed_schemas[detailed_type], value, path=DataPath(), strict=True
+        if strict and not set(util.get_keys(data)) <= set(util.get_keys(validator)):
+            return False
+        return all(
+            _item_valid(schema, sub_validator, data, strict, key)
+            for key, sub_validator in util.get_iter(validator)
+        )
+
+    if data is None and validator.is_optional and validator.can_be_none:
+        return True
+    if isinstance(validator, Choose):
+        return validator._fields_valid(schema, data)
+    if not value_valid(validator, data):
+        return False
+
+    if isinstance(validator, Include):
+        return _include_fields_valid(schema, validator, data, strict, frozenset())
+    if isinstance(validator, (Map, ListValidator)):
+        return not validator.validators or all(
+            any(
+                _item_valid(schema, sub_validator, data, strict, key)
+                for sub_validator in validator.validators
+            )
+            for key in util.get_keys(data)
         )
-        return errs == []
+    if isinstance(validator, Any):
+        return not validator.validators or any(
+            _node_valid(schema, sub_validator, data, strict)
+            for sub_validator in validator.validators
+        )
+    if isinstance(validator, Subset):
+        return not schema._validate_subset(validator, data, DataPath(), strict)
+    return True
+
+
+def _item_valid(schema, validator, data, strict, key) -> bool:
+    try:
+        item = data[key]
+    except (KeyError, IndexError):
+        return isinstance(validator, Validator) and validator.is_optional
+    return _node_valid(schema, validator, item, strict)
+
+
+def _include_fields_valid(schema, include, value, strict, skip) -> bool:
+    """Same as not _validate_include_fields(...), returning at the first error"""
+    include_schema = schema.includes.get(include.include_name)
+    if not include_schema:
+        return False
+    strict = strict if include.strict is None else include.strict
+    validators = include_schema._schema
+
+    if isinstance(validators, Choose):
+        return validators._fields_valid(schema, value, skip)
+    if not skip:
+        return _node_valid(schema, validators, value, strict)
+    if not isinstance(validators, dict):
+        value = {k: v for k, v in value.items() if k not in skip}
+        return _node_valid(schema, validators, value, strict)
+
+    if strict and not value.keys() - skip <= validators.keys():
+        return False
+    for key, validator in validators.items():
+        if key in skip:
+            if not (isinstance(validator, Validator) and validator.is_optional):
+                return False
+        elif not _item_valid(schema, validator, value, strict, key):
+            return False
+    return True
 
 
 class Uuid(Validator):
@@ -216,6 +445,8 @@ class Vocabulary(Validator):
         super().__init__(*args, fields=fields, **kwargs)
         self.vocabulary = vocabulary
         self.fields = fields
+        # ids of the vocabulary, set by bind_vocabularies
+        self.index = None
 
     def _is_valid(self, value):
         if value is None:
@@ -224,8 +455,58 @@ class Vocabulary(Validator):
             return False
         if "id" not in value:
             return False
+        if self.index is not None and value["id"] not in self.index:
+            return False
         return True
 
+    def fail(self, value):
+        if isinstance(value, dict) and "id" in value and self.index is not None:
+            return f"'{value['id']}' is not an id of the {self.vocabulary} vocabulary."
+        return super().fail(value)
+
+
+def iter_validators(schema) -> Iterator[Validator]:
+    """Yields every validator of a schema and its includes"""
+    for include in (schema, *schema.includes.values()):
+        yield from _iter_validators(include._schema)
+
+
+def _iter_validators(node) -> Iterator[Validator]:
+    if isinstance(node, dict):
+        for value in node.values():
+            yield from _iter_validators(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _iter_validators(value)
+    elif isinstance(node, Validator):
+        yield node
+        # list, map, any and subset validators
+        for value in getattr(node, "validators", ()):
+            yield from _iter_validators(value)
+
+
+def bind_schema(schema) -> None:
+    """
+    Binds all choose validators of a schema and its includes to the schema, so
+    they can validate against its includes without current_schema. Different
+    schemas can then be used for validation concurrently.
+    """
+    for validator in iter_validators(schema):
+        if isinstance(validator, Choose):
+            validator.schema = schema
+
+
+def bind_vocabularies(schema, indexes) -> None:
+    """
+    Makes the vocabulary validators of a schema check that ids are members of
+    their vocabulary, indexes maps vocabulary names to a container of their ids
+    (e.g. vocabulary_index.VocabularyIndex). Vocabularies without an index only
+    have the shape of their value checked.
+    """
+    for validator in iter_validators(schema):
+        if isinstance(validator, Vocabulary):
+            validator.index = indexes.get(validator.vocabulary)
+
 
 # include custom validators
 extend_validators = DefaultValidators.copy()
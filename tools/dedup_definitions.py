@@ -0,0 +1,253 @@
+import dataclasses
+import hashlib
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFS_PREFIX = "#/$defs/"
+
+
+@dataclasses.dataclass
+class DedupReport:
+    package: str
+    definitions: int
+    # removed definition -> the identical definition kept in its place
+    merged: Dict[str, str] = dataclasses.field(default_factory=dict)
+    fields_removed: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.package}: {len(self.merged)} of {self.definitions} "
+            f"definitions and {self.fields_removed} mapping fields removed"
+        )
+
+
+def count_fields(node) -> int:
+    """Number of properties declared in a json model, not following `use`"""
+    if isinstance(node, dict):
+        count = len(node.get("properties", ()))
+        return count + sum(count_fields(value) for value in node.values())
+    if isinstance(node, (list, tuple)):
+        return sum(count_fields(item) for item in node)
+    return 0
+
+
+@dataclasses.dataclass
+class ShareReport:
+    package: str
+    definitions: int
+    file: str
+    # definitions removed as they are in file
+    shared: List[str] = dataclasses.field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.package}: {len(self.shared)} of {self.definitions} "
+            f"definitions shared with {self.file}"
+        )
+
+
+def split_reference(value) -> Optional[Tuple[str, str]]:
+    """
+    (file, definition) of a reference to a definition, file is "" for the
+    definitions of the same file, None if value is not such a reference
+    """
+    if not isinstance(value, str) or DEFS_PREFIX not in value:
+        return None
+    file, name = value.split(DEFS_PREFIX[1:], 1)
+    if not file.endswith("#"):
+        return None
+    return file[:-1], name
+
+
+def _reference(key, value):
+    if key == "use" and isinstance(value, str) and value.startswith(DEFS_PREFIX):
+        return value[len(DEFS_PREFIX) :]
+    return None
+
+
+def references(node) -> Set[str]:
+    """Names of the definitions of the same file used in a json model"""
+    if isinstance(node, dict):
+        ret = set()
+        for key, value in node.items():
+            name = _reference(key, value)
+            ret |= {name} if name is not None else references(value)
+        return ret
+    if isinstance(node, (list, tuple)):
+        return set().union(*(references(item) for item in node))
+    return set()
+
+
+def _with_classes(node, classes: Dict[str, str]):
+    """The node with the definitions it uses replaced by their classes"""
+    if isinstance(node, dict):
+        ret = {}
+        for key, value in node.items():
+            name = _reference(key, value)
+            if name in classes:
+                ret[key] = ["class", classes[name]]
+            else:
+                ret[key] = _with_classes(value, classes)
+        return ret
+    if isinstance(node, (list, tuple)):
+        return [_with_classes(item, classes) for item in node]
+    return node
+
+
+def definition_classes(defs: Dict[str, dict]) -> Dict[str, str]:
+    """
+    Structural hash of every definition: definitions have the same hash when
+    their json is identical, up to the names of the definitions they use as
+    long as these have the same hash too. Definitions are first hashed with
+    all references alike, then rehashed with the hashes of the definitions
+    they use until no more definitions are told apart, so definitions using
+    each other are compared as well.
+    """
+    classes = {name: "" for name in defs}
+    count = 1
+    while True:
+        hashes = {
+            name: hashlib.sha1(
+                json.dumps(
+                    [classes[name], _with_classes(definition, classes)], default=list
+                ).encode()
+            ).hexdigest()
+            for name, definition in defs.items()
+        }
+        new_count = len(set(hashes.values()))
+        classes = hashes
+        if new_count == count:
+            return classes
+        count = new_count
+
+
+def _rename(node, renames: Dict[str, str], prefix=DEFS_PREFIX):
+    if isinstance(node, dict):
+        ret = {}
+        for key, value in node.items():
+            name = _reference(key, value)
+            if name in renames:
+                ret[key] = prefix + renames[name]
+            else:
+                ret[key] = _rename(value, renames, prefix)
+        return ret
+    if isinstance(node, (list, tuple)):
+        return [_rename(item, renames, prefix) for item in node]
+    return node
+
+
+def dedup_definitions(
+    defs: Dict[str, dict], *models: dict, package: str = ""
+) -> Tuple[Dict[str, dict], List[dict], DedupReport]:
+    """
+    Merges identical definitions into the first of them and points the
+    references of the definitions and of the models (e.g. the metadata) using
+    them to it. Returns the new definitions and models and what was removed.
+    """
+    report = DedupReport(package, len(defs))
+    kept = {}
+    for name, digest in definition_classes(defs).items():
+        if digest in kept:
+            report.merged[name] = kept[digest]
+            report.fields_removed += count_fields(defs[name])
+        else:
+            kept[digest] = name
+    if not report.merged:
+        return defs, list(models), report
+    new_defs = {
+        name: _rename(definition, report.merged)
+        for name, definition in defs.items()
+        if name not in report.merged
+    }
+    return new_defs, [_rename(model, report.merged) for model in models], report
+
+
+def dedup_outputs(out) -> Tuple[list, List[DedupReport]]:
+    """
+    Deduplicates the definitions of every package of yamale2oarepo outputs
+    (json, name, package), renaming the references of its metadata
+    """
+    definitions = {
+        package: model for model, name, package in out if name == "definitions"
+    }
+    metadata = {package: model for model, name, package in out if name == "metadata"}
+    renamed = {}
+    reports = []
+    for package, defs in definitions.items():
+        models = [metadata[package]] if package in metadata else []
+        new_defs, new_models, report = dedup_definitions(defs, *models, package=package)
+        renamed[package, "definitions"] = new_defs
+        if models:
+            renamed[package, "metadata"] = new_models[0]
+        reports.append(report)
+    return [
+        (renamed.get((package, name), model), name, package)
+        for model, name, package in out
+    ], reports
+
+
+def share_definitions(
+    defs: Dict[str, dict],
+    shared: Dict[str, dict],
+    file: str,
+    *models: dict,
+    package: str = "",
+) -> Tuple[Dict[str, dict], List[dict], ShareReport]:
+    """
+    Removes the definitions identical to the shared definitions written to
+    file and points the references of the definitions and of the models to
+    file. A definition is only shared if the definitions it uses are shared as
+    well, so definitions that differ in the package, e.g. those given the base
+    schema of a polymorphic field of the package, and the definitions using
+    them stay in the package.
+    """
+    report = ShareReport(package, len(defs), file)
+    uses = {name: references(definition) for name, definition in defs.items()}
+    same = {name for name in defs if shared.get(name) == defs[name]}
+    while True:
+        kept = {name for name in same if uses[name] <= same}
+        if kept == same:
+            break
+        same = kept
+    report.shared = [name for name in defs if name in same]
+    if not same:
+        return defs, list(models), report
+    renames = {name: name for name in same}
+    prefix = file + DEFS_PREFIX
+    new_defs = {
+        name: _rename(definition, renames, prefix)
+        for name, definition in defs.items()
+        if name not in same
+    }
+    return new_defs, [_rename(model, renames, prefix) for model in models], report
+
+
+def share_outputs(
+    out, shared_package: str, file: str
+) -> Tuple[list, List[ShareReport]]:
+    """
+    Removes from the definitions of every package of yamale2oarepo outputs
+    (json, name, package) those of shared_package, written to file
+    """
+    definitions = {
+        package: model for model, name, package in out if name == "definitions"
+    }
+    metadata = {package: model for model, name, package in out if name == "metadata"}
+    shared = definitions[shared_package]
+    renamed = {}
+    reports = []
+    for package, defs in definitions.items():
+        if package == shared_package:
+            continue
+        models = [metadata[package]] if package in metadata else []
+        new_defs, new_models, report = share_definitions(
+            defs, shared, file, *models, package=package
+        )
+        renamed[package, "definitions"] = new_defs
+        if models:
+            renamed[package, "metadata"] = new_models[0]
+        reports.append(report)
+    return [
+        (renamed.get((package, name), model), name, package)
+        for model, name, package in out
+    ], reports
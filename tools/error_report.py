@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+
+import dataclasses
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import yamale
+from yamale.schema.datapath import DataPath
+from yamale.validators import Any, Include
+from yamale.validators import List as ListValidator
+from yamale.validators import Map, Subset, Validator
+
+from custom_validators import Choose
+from link_index import BROKEN_LINK, DUPLICATE_ID, build_link_index
+from schema_compiler import CompiledSchema
+from validate_examples import (
+    PATH_TO_SCHEMAS,
+    find_records,
+    find_technique,
+    validate_batch,
+)
+from validation_profiler import schema_path
+
+# kinds of errors
+REQUIRED = "required"  # a required field is missing
+UNEXPECTED = "unexpected"  # a field not in the (strict) schema
+NOT_A_MAP = "not_a_map"
+NOT_A_LIST = "not_a_list"
+INVALID = "invalid"  # the value is not of the type of its validator
+CONSTRAINT = "constraint"  # the value violates a constraint, e.g. min or max
+UNKNOWN_TYPE = "unknown_type"  # the type field of a choose selects no schema
+UNDEFINED_INCLUDE = "undefined_include"
+RECORD = "record"  # the record has no technique or could not be validated
+# and the kinds of link errors, DUPLICATE_ID and BROKEN_LINK of link_index.py
+
+
+@dataclasses.dataclass(frozen=True)
+class ValidationError:
+    """An error at a path of a record, with the tag of the failing validator"""
+
+    path: Tuple
+    kind: str
+    message: str
+    validator: str = ""
+
+    def __str__(self):
+        return f"{DataPath(*self.path)}: {self.message}"
+
+    def to_dict(self) -> dict:
+        return {
+            "path": str(DataPath(*self.path)),
+            "kind": self.kind,
+            "validator": self.validator,
+            "message": self.message,
+        }
+
+
+def _tag(validator) -> str:
+    if validator is None:
+        return ""
+    if isinstance(validator, dict):
+        return "map"
+    if isinstance(validator, list):
+        return "list"
+    return validator.tag
+
+
+class _ErrorCollector:
+    """
+    Walks a record along a schema like Schema._validate, but collects
+    structured errors with the absolute path of their item. Unlike
+    Choose.validate, the fields of a polymorphic node are validated against its
+    detailed schema even if its base schema fails.
+    """
+
+    def __init__(self, schema: yamale.schema.Schema):
+        self.schema = schema
+        self.errors: List[ValidationError] = []
+
+    def error(self, path, kind, message, validator=None) -> None:
+        self.errors.append(ValidationError(path, kind, message, _tag(validator)))
+
+    def validate(self, validator, data, path, strict) -> None:
+        if isinstance(validator, (dict, list)):
+            self.validate_static_map_list(validator, data, path, strict)
+            return
+        if data is None and validator.is_optional and validator.can_be_none:
+            return
+
+        if isinstance(validator, Choose):
+            self.validate_choose(validator, data, path, frozenset())
+            return
+
+        errors = validator.validate(data)
+        if errors:
+            kind = INVALID if not validator._is_valid(data) else CONSTRAINT
+            for error in errors:
+                self.error(path, kind, error, validator)
+            return
+
+        if isinstance(validator, Include):
+            self.validate_include_fields(validator, data, path, strict, frozenset())
+        elif isinstance(validator, (Map, ListValidator)):
+            self.validate_map_list(validator, data, path, strict)
+        elif isinstance(validator, Any):
+            self.validate_any(validator, data, path, strict)
+        elif isinstance(validator, Subset):
+            self.validate_subset(validator, data, path, strict)
+
+    def validate_item(self, validator, data, path, strict, key) -> None:
+        try:
+            item = data[key]
+        except (KeyError, IndexError):
+            if isinstance(validator, Validator) and validator.is_optional:
+                return
+            self.error(path + (key,), REQUIRED, "Required field missing", validator)
+            return
+        self.validate(validator, item, path + (key,), strict)
+
+    def validate_static_map_list(self, validator, data, path, strict) -> None:
+        if isinstance(validator, dict):
+            if not yamale.util.is_map(data):
+                self.error(path, NOT_A_MAP, f"'{data}' is not a map", validator)
+                return
+        elif not yamale.util.is_list(data):
+            self.error(path, NOT_A_LIST, f"'{data}' is not a list", validator)
+            return
+
+        if strict:
+            data_keys = set(yamale.util.get_keys(data))
+            validator_keys = set(yamale.util.get_keys(validator))
+            for key in data_keys - validator_keys:
+                self.error(path + (key,), UNEXPECTED, "Unexpected element")
+        for key, sub_validator in yamale.util.get_iter(validator):
+            self.validate_item(sub_validator, data, path, strict, key)
+
+    def _alternatives(self, validate, validators) -> None:
+        """Keeps the errors of all alternatives only if none of them is valid"""
+        n_errors = len(self.errors)
+        for sub_validator in validators:
+            n_before = len(self.errors)
+            validate(sub_validator)
+            if len(self.errors) == n_before:
+                del self.errors[n_errors:]
+                return
+
+    def validate_map_list(self, validator, data, path, strict) -> None:
+        if not validator.validators:
+            return
+        for key in yamale.util.get_keys(data):
+            self._alternatives(
+                lambda v: self.validate_item(v, data, path, strict, key),
+                validator.validators,
+            )
+
+    def validate_any(self, validator, data, path, strict) -> None:
+        if validator.validators:
+            self._alternatives(
+                lambda v: self.validate(v, data, path, strict), validator.validators
+            )
+
+    def validate_subset(self, validator, data, path, strict) -> None:
+        """Schema._validate_subset, every part of data must match an alternative"""
+        if not validator.validators:
+            return
+        if yamale.util.is_map(data):
+            parts = [{key: value} for key, value in data.items()]
+        elif yamale.util.is_list(data):
+            parts = data
+        else:
+            parts = [data]
+        for part in parts:
+            self._alternatives(
+                lambda v: self.validate(v, part, path, strict), validator.validators
+            )
+
+    def validate_choose(self, choose, value, path, skip) -> None:
+        """
+        Choose._validate_errors, validating the detailed schema also when the
+        base schema fails
+        """
+        if not isinstance(value, dict):
+            self.error(path, NOT_A_MAP, f"'{value}' is not a map", choose)
+            return
+
+        n_errors = len(self.errors)
+        self.validate_include_fields(choose.base_schema, value, path, False, skip)
+
+        detailed_schema = choose.get_detailed_schema(value)
+        type_path = path + (choose.type_field,)
+        if detailed_schema is None:
+            # a missing type field is already reported by the base schema
+            if not any(e.path == type_path for e in self.errors[n_errors:]):
+                self.error(
+                    type_path,
+                    UNKNOWN_TYPE,
+                    f"'{value.get(choose.type_field)}' does not select a schema",
+                    choose,
+                )
+            return
+        base_fields = self.schema.includes[choose.base_schema.include_name].dict
+        self.validate_include_fields(
+            detailed_schema, value, path, True, skip.union(base_fields)
+        )
+
+    def validate_include_fields(self, include, value, path, strict, skip) -> None:
+        """custom_validators._validate_include_fields"""
+        include_schema = self.schema.includes.get(include.include_name)
+        if not include_schema:
+            self.error(
+                path,
+                UNDEFINED_INCLUDE,
+                f"Include '{include.include_name}' has not been defined.",
+                include,
+            )
+            return
+        strict = strict if include.strict is None else include.strict
+        validators = include_schema._schema
+
+        if isinstance(validators, Choose):
+            self.validate_choose(validators, value, path, skip)
+            return
+        if not skip:
+            self.validate(validators, value, path, strict)
+            return
+        if not isinstance(validators, dict):
+            value = {k: v for k, v in value.items() if k not in skip}
+            self.validate(validators, value, path, strict)
+            return
+
+        if strict:
+            for key in value.keys() - skip - validators.keys():
+                self.error(path + (key,), UNEXPECTED, "Unexpected element")
+        for key, validator in validators.items():
+            if key in skip:
+                if isinstance(validator, Validator) and validator.is_optional:
+                    continue
+                self.error(path + (key,), REQUIRED, "Required field missing", validator)
+            else:
+                self.validate_item(validator, value, path, strict, key)
+
+
+def collect_errors(
+    schema: yamale.schema.Schema, record, strict: bool = True
+) -> List[ValidationError]:
+    """
+    All validation and link errors of a record in a single pass, each with the
+    full path of the item it concerns
+    """
+    if isinstance(schema, CompiledSchema):
+        schema = schema.schema
+    collector = _ErrorCollector(schema)
+    collector.validate(schema._schema, record, (), strict)
+    errors = collector.errors
+
+    kinds = {DUPLICATE_ID: "link_target", BROKEN_LINK: "link"}
+    for path, kind, message in build_link_index(schema, record).path_errors():
+        errors.append(ValidationError(path, kind, message, kinds[kind]))
+    return errors
+
+
+def collect_record_errors(record, schemas: Dict) -> List[ValidationError]:
+    """collect_errors against the schema of the technique of the record"""
+    try:
+        return collect_errors(schemas[find_technique(record)], record)
+    except Exception as e:
+        return [ValidationError((), RECORD, f"{type(e).__name__}: {e}")]
+
+
+def build_report(results: Iterable[Tuple[str, List[ValidationError]]]) -> dict:
+    """
+    Report of the errors of named records: the number of errors by kind and by
+    schema path (list indexes replaced by '*') and kind, and the errors of
+    every invalid record
+    """
+    n_records = 0
+    by_kind: Dict[str, int] = {}
+    by_path: Dict[str, Dict[str, int]] = {}
+    records = {}
+    for name, errors in results:
+        n_records += 1
+        if not errors:
+            continue
+        records[name] = [e.to_dict() for e in errors]
+        for error in errors:
+            by_kind[error.kind] = by_kind.get(error.kind, 0) + 1
+            kinds = by_path.setdefault(schema_path(error.path), {})
+            kinds[error.kind] = kinds.get(error.kind, 0) + 1
+
+    return {
+        "records": n_records,
+        "invalid_records": len(records),
+        "errors": sum(by_kind.values()),
+        "by_kind": dict(sorted(by_kind.items(), key=lambda item: -item[1])),
+        "by_path": dict(
+            sorted(by_path.items(), key=lambda item: -sum(item[1].values()))
+        ),
+        "invalid": records,
+    }
+
+
+def collect_batch(
+    paths: List[Path],
+    schema_folder: Path = PATH_TO_SCHEMAS,
+    workers=None,
+    vocabulary_folder: Optional[Path] = None,
+) -> Iterator[Tuple[str, List[ValidationError]]]:
+    """
+    Collects the errors of the records of all paths in the process pool of
+    validate_examples.validate_batch and yields (record name, errors) in the
+    order of the paths
+    """
+    for name, errors in validate_batch(
+        paths,
+        schema_folder,
+        workers,
+        vocabulary_folder,
+        compiled=False,
+        validate=collect_record_errors,
+    ):
+        # files that could not be loaded have the error of validate_batch
+        yield name, [
+            e if isinstance(e, ValidationError) else ValidationError((), RECORD, e)
+            for e in errors
+        ]
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Collect all errors of records in one pass and write a JSON "
+        "report grouped by path and error kind"
+    )
+    parser.add_argument(
+        "records", nargs="+", help="Directories, files or glob patterns of records"
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="File the JSON report is written to (default: stdout)",
+    )
+    parser.add_argument(
+        "--schema-folder",
+        type=Path,
+        default=PATH_TO_SCHEMAS,
+        help="Folder containing the values-only technique schemas",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--vocabularies",
+        type=Path,
+        default=None,
+        help="Folder of vocabulary fixtures whose ids the vocabulary items of the "
+        "records must be in",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    paths = find_records(*args.records)
+    if not paths:
+        print(f"No records found in {' '.join(args.records)}", file=sys.stderr)
+        sys.exit(2)
+
+    report = build_report(
+        collect_batch(paths, args.schema_folder, args.workers, args.vocabularies)
+    )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(
+        f"{report['records']} records: {report['invalid_records']} invalid, "
+        f"{report['errors']} errors",
+        file=sys.stderr,
+    )
+    sys.exit(1 if report["invalid_records"] else 0)
+
+
+if __name__ == "__main__":
+    main()
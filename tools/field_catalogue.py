@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+
+import dataclasses
+import json
+import sqlite3
+from argparse import ArgumentParser
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import yamale.validators.validators as validators
+
+from custom_validators import Choose, Link, LinkTarget, Vocabulary
+from unroll import YamaleTree
+
+PATH_TO_SCHEMAS = Path(__file__).parent.parent / "models" / "values-only"
+
+_SQL_SCHEMA = """
+CREATE TABLE fields (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    type TEXT NOT NULL,
+    required INTEGER NOT NULL,
+    required_when TEXT NOT NULL,
+    multiplicity TEXT NOT NULL,
+    item_types TEXT NOT NULL,
+    constraints TEXT NOT NULL,
+    enum TEXT NOT NULL,
+    link_target TEXT,
+    link_target_name TEXT,
+    vocabulary TEXT
+);
+CREATE INDEX fields_parent ON fields (parent);
+CREATE INDEX fields_type ON fields (type);
+CREATE INDEX fields_link_target ON fields (link_target);
+"""
+
+
+@dataclasses.dataclass
+class Field:
+    """
+    A field of the unrolled schema. Paths are the keys from the root joined by
+    '.', with '*' for the items of lists (as validation_profiler.schema_path).
+    For lists of values the enum, link and vocabulary describe the items.
+    """
+
+    path: str
+    # tag of the validator, 'map' for maps
+    type: str
+    required: bool = True
+    # fields of the detailed schemas of a choose are not required, but required
+    # when the type fields hold the values of any of these, e.g.
+    # [{"type": "Polymer"}]
+    required_when: List[Dict[str, str]] = dataclasses.field(default_factory=list)
+    # 'singular' or 'list'
+    multiplicity: str = "singular"
+    item_types: List[str] = dataclasses.field(default_factory=list)
+    constraints: Dict = dataclasses.field(default_factory=dict)
+    enum: List = dataclasses.field(default_factory=list)
+    # target of a link(), name of a link_target()
+    link_target: Optional[str] = None
+    link_target_name: Optional[str] = None
+    vocabulary: Optional[str] = None
+
+    @property
+    def parent(self) -> str:
+        """Path of the enclosing map, e.g. 'a.*' for the fields of items of a"""
+        return self.path.rpartition(".")[0]
+
+    def to_dict(self) -> Dict:
+        return dataclasses.asdict(self)
+
+
+def _type(value) -> str:
+    if isinstance(value, dict):
+        return "map"
+    return value.tag
+
+
+def _describe(field: Field, validator: validators.Validator) -> None:
+    """Sets the enum, link and vocabulary of a field from a value validator"""
+    if isinstance(validator, validators.Enum):
+        field.enum = list(validator.enums)
+    elif isinstance(validator, Link):
+        field.link_target = validator.target
+    elif isinstance(validator, LinkTarget):
+        field.link_target_name = validator.name
+    elif isinstance(validator, Vocabulary):
+        field.vocabulary = validator.vocabulary
+
+
+class _FieldWalker:
+    """
+    Walks the schema of a YamaleTree like YamaleTree.build expands it, but
+    keeps what the expansion drops, e.g. whether included maps are required
+    """
+
+    def __init__(self, tree: YamaleTree):
+        self.tree = tree
+        self.seen = set()
+
+    def fields(self) -> Iterator[Field]:
+        yield from self._map(self.tree.schema.dict, (), ())
+
+    def _resolve(self, value, stack: Tuple[str, ...]):
+        """Map or validator an include refers to, and the stack inside it"""
+        name = value.include_name
+        if name in stack:
+            cycle = " -> ".join(stack[stack.index(name) :] + (name,))
+            raise ValueError(f"Include cycle in {self.tree.schema_file}: {cycle}")
+        include = self.tree.includes.get(name)
+        if include is None:
+            raise ValueError(
+                f"Include '{name}' of {self.tree.schema_file} has not been defined, "
+                "is the schema file defining it missing from the includes?"
+            )
+        if isinstance(include.dict, str):
+            return include._schema, stack + (name,)
+        return include.dict, stack + (name,)
+
+    def _children(self, node, path, stack) -> Iterator[Field]:
+        """Fields of the map, include or choose at path"""
+        if isinstance(node, validators.Include):
+            node, stack = self._resolve(node, stack)
+        required_when = {}
+        if isinstance(node, Choose):
+            required_when = self._required_when(node)
+            node = self.tree._choose_fields(node)
+        if isinstance(node, dict):
+            yield from self._map(node, path, stack, required_when)
+
+    def _type_value(self, choose: Choose, name: str) -> str:
+        """Value of the type field selecting the detailed schema of keyword name"""
+        base = self.tree.includes[choose.base_schema.include_name].dict
+        type_validator = base.get(choose.type_field) if isinstance(base, dict) else None
+        for value in getattr(type_validator, "enums", ()):
+            if choose.get_detailed_type({choose.type_field: value}) == name:
+                return value
+        return name.replace("_", " ")
+
+    def _required_when(self, choose: Choose, when: Tuple = ()) -> Dict[str, List]:
+        """
+        Conditions of the fields of the detailed schemas of a choose (and of
+        the chooses nested in them) which are not in its base schema: the type
+        field values of every detailed schema requiring the field
+        """
+        required_when: Dict[str, List] = {}
+        for name, detailed_schema in choose.detailed_schemas.items():
+            branch = when + ((choose.type_field, self._type_value(choose, name)),)
+            include = self.tree.includes[detailed_schema.include_name]
+            if isinstance(include.dict, str):
+                nested = include._schema
+                fields = self.tree.includes[nested.base_schema.include_name].dict
+                for key, conditions in self._required_when(nested, branch).items():
+                    required_when.setdefault(key, []).extend(conditions)
+            else:
+                fields = include.dict
+            for key, value in fields.items():
+                if not isinstance(value, validators.Validator) or value.is_required:
+                    required_when.setdefault(key, []).append(dict(branch))
+        base = self.tree.includes[choose.base_schema.include_name].dict
+        return {k: v for k, v in required_when.items() if k not in base}
+
+    def _map(
+        self, node: dict, path: Tuple[str, ...], stack, required_when=None
+    ) -> Iterator[Field]:
+        required_when = required_when or {}
+        for key, value in node.items():
+            yield from self._value(
+                value, path + (str(key),), stack, required_when.get(key, [])
+            )
+
+    def _value(
+        self, value, path: Tuple[str, ...], stack, required_when=()
+    ) -> Iterator[Field]:
+        field_path = ".".join(path)
+        if field_path in self.seen:
+            # fields of several items of a list
+            return
+        self.seen.add(field_path)
+
+        required = not isinstance(value, validators.Validator) or value.is_required
+        target = value
+        if isinstance(value, validators.Include):
+            target, _ = self._resolve(value, stack)
+        field = Field(field_path, _type(target), required and not required_when)
+        field.required_when = list(required_when)
+
+        if isinstance(target, validators.List):
+            field.multiplicity = "list"
+            for arg in target.args:
+                item = arg
+                if isinstance(arg, validators.Include):
+                    item, _ = self._resolve(arg, stack)
+                field.item_types.append(_type(item))
+                if not isinstance(item, (dict, Choose)):
+                    _describe(field, item)
+            field.constraints = dict(target.kwargs)
+            yield field
+            for arg in target.args:
+                yield from self._children(arg, path + ("*",), stack)
+            return
+
+        if isinstance(target, validators.Validator):
+            field.constraints = dict(target.kwargs)
+            _describe(field, target)
+        yield field
+        yield from self._children(value, path, stack)
+
+
+def iter_fields(tree: YamaleTree) -> Iterator[Field]:
+    """Fields of the schema of a tree, parents before their children"""
+    return _FieldWalker(tree).fields()
+
+
+class FieldCatalogue:
+    """
+    Fields of an unrolled schema with indexes for lookups: a field by its path
+    and the fields of a type, the links (to a target), link targets, enums and
+    vocabularies are dict lookups, the fields under a path a binary search.
+    """
+
+    def __init__(self, fields: Iterable[Field]):
+        self.fields: Dict[str, Field] = {}
+        self.children: Dict[str, List[Field]] = {}
+        self.by_type: Dict[str, List[Field]] = {}
+        self.links: List[Field] = []
+        # link target name -> links to it, link_target fields of the name
+        self.links_to: Dict[str, List[Field]] = {}
+        self.link_targets: Dict[str, List[Field]] = {}
+        self.enums: List[Field] = []
+        self.vocabularies: List[Field] = []
+        for field in fields:
+            self.fields[field.path] = field
+            self.children.setdefault(field.parent, []).append(field)
+            self.by_type.setdefault(field.type, []).append(field)
+            if field.link_target is not None:
+                self.links.append(field)
+                self.links_to.setdefault(field.link_target, []).append(field)
+            if field.link_target_name is not None:
+                self.link_targets.setdefault(field.link_target_name, []).append(field)
+            if field.enum:
+                self.enums.append(field)
+            if field.vocabulary is not None:
+                self.vocabularies.append(field)
+        self._paths = sorted(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __iter__(self) -> Iterator[Field]:
+        return iter(self.fields.values())
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.fields
+
+    def __getitem__(self, path: str) -> Field:
+        return self.fields[path]
+
+    def of_type(self, tag: str) -> List[Field]:
+        return self.by_type.get(tag, [])
+
+    def under(self, path: str) -> List[Field]:
+        """All fields below path, in the order of their paths"""
+        # '/' follows '.' so the paths starting with 'path.' are a range
+        start = bisect_left(self._paths, path + ".")
+        end = bisect_left(self._paths, path + "/", start)
+        return [self.fields[p] for p in self._paths[start:end]]
+
+    @classmethod
+    def load(cls, path: Path) -> "FieldCatalogue":
+        """Reads a catalogue written by write_jsonl or write_sqlite"""
+        if Path(path).suffix in (".sqlite", ".db"):
+            return cls(read_sqlite(path))
+        return cls(read_jsonl(path))
+
+
+def write_jsonl(fields: Iterable[Field], path: Path) -> int:
+    """Writes fields one JSON object per line as they come, returns their number"""
+    n = 0
+    with open(path, "w") as f:
+        for field in fields:
+            f.write(json.dumps(field.to_dict(), ensure_ascii=False, default=str))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def read_jsonl(path: Path) -> Iterator[Field]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield Field(**json.loads(line))
+
+
+def write_sqlite(fields: Iterable[Field], path: Path) -> int:
+    """Writes fields to a new SQLite file as they come, returns their number"""
+    Path(path).unlink(missing_ok=True)
+    n = 0
+
+    def rows():
+        nonlocal n
+        for field in fields:
+            n += 1
+            yield (
+                field.path,
+                field.parent,
+                field.type,
+                field.required,
+                json.dumps(field.required_when, ensure_ascii=False),
+                field.multiplicity,
+                json.dumps(field.item_types),
+                json.dumps(field.constraints, ensure_ascii=False, default=str),
+                json.dumps(field.enum, ensure_ascii=False, default=str),
+                field.link_target,
+                field.link_target_name,
+                field.vocabulary,
+            )
+
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.executescript(_SQL_SCHEMA)
+            connection.executemany(
+                "INSERT INTO fields VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows()
+            )
+    finally:
+        connection.close()
+    return n
+
+
+def read_sqlite(path: Path) -> Iterator[Field]:
+    connection = sqlite3.connect(path)
+    try:
+        # rowid order is the order the fields were written in
+        for row in connection.execute(
+            "SELECT path, type, required, required_when, multiplicity, item_types, "
+            "constraints, enum, link_target, link_target_name, vocabulary "
+            "FROM fields ORDER BY rowid"
+        ):
+            yield Field(
+                row[0],
+                row[1],
+                bool(row[2]),
+                json.loads(row[3]),
+                row[4],
+                json.loads(row[5]),
+                json.loads(row[6]),
+                json.loads(row[7]),
+                *row[8:],
+            )
+    finally:
+        connection.close()
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Write the fields of the mbdb values-only yamale schemas as "
+        "a JSON Lines or SQLite field catalogue"
+    )
+    parser.add_argument(
+        "--schema-files",
+        nargs="+",
+        type=Path,
+        help="Input Yamale schema files without descriptions",
+        default=[PATH_TO_SCHEMAS / "MST.yaml"],
+    )
+    parser.add_argument(
+        "--output-folder",
+        type=Path,
+        help="Output folder of the catalogues",
+        default=Path(__file__).parent.parent / "models" / "unrolled",
+    )
+    parser.add_argument(
+        "--includes",
+        nargs="+",
+        type=Path,
+        help="Additional Yamale schema input files without descriptions to be "
+        "used as includes",
+        default=[PATH_TO_SCHEMAS / "general_parameters.yaml"],
+    )
+    parser.add_argument(
+        "--format",
+        choices=("jsonl", "sqlite"),
+        default="jsonl",
+        help="Write JSON Lines (<schema>.fields.jsonl) or SQLite "
+        "(<schema>.fields.sqlite) catalogues",
+    )
+    return parser
+
+
+def write_catalogues(
+    schema_files: List[Path],
+    output_folder: Path,
+    includes: List[Path] = (),
+    format: str = "jsonl",
+) -> None:
+    """Writes <schema>.fields.<format> catalogues of the schema files"""
+    write = write_jsonl if format == "jsonl" else write_sqlite
+    for path in schema_files:
+        tree = YamaleTree(path)
+        if includes:
+            tree.add_external_includes(*includes)
+        write(iter_fields(tree), output_folder / f"{path.stem}.fields.{format}")
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    write_catalogues(args.schema_files, args.output_folder, args.includes, args.format)
+
+
+if __name__ == "__main__":
+    main()
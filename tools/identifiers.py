@@ -0,0 +1,176 @@
+import dataclasses
+import re
+from typing import Callable, Collection, Dict, Iterable, Optional
+
+import numpy as np
+
+
+def _orcid_checksum(local: str) -> bool:
+    """ISO 7064 11-2 check digit of an ORCID"""
+    digits = local.replace("-", "")
+    total = 0
+    for digit in digits[:-1]:
+        total = (total + int(digit)) * 2
+    check = (12 - total % 11) % 11
+    return digits[-1] == ("X" if check == 10 else str(check))
+
+
+def _cas_checksum(local: str) -> bool:
+    """Check digit of a CAS Registry Number, e.g. 7732-18-5"""
+    digits = local.replace("-", "")
+    total = sum(i * int(d) for i, d in enumerate(reversed(digits[:-1]), 1))
+    return total % 10 == int(digits[-1])
+
+
+def _isbn_checksum(local: str) -> bool:
+    """Check digit of an ISBN-10 or ISBN-13"""
+    digits = local.replace("-", "").replace(" ", "").upper()
+    if len(digits) == 10:
+        values = [10 if d == "X" else int(d) for d in digits]
+        return (
+            "X" not in digits[:-1]
+            and sum((10 - i) * v for i, v in enumerate(values)) % 11 == 0
+        )
+    if len(digits) == 13 and digits.isdigit():
+        return sum((3 if i % 2 else 1) * int(d) for i, d in enumerate(digits)) % 10 == 0
+    return False
+
+
+def _digit_matrix(values: np.ndarray, width: int) -> np.ndarray:
+    """Digits of strings of width characters as rows of a matrix, X is 10"""
+    if not len(values):
+        return np.zeros((0, width), dtype=np.int64)
+    codes = np.frombuffer("".join(values).encode("ascii"), dtype=np.uint8)
+    digits = codes.reshape(-1, width).astype(np.int64) - ord("0")
+    digits[digits == ord("X") - ord("0")] = 10
+    return digits
+
+
+def _orcid_checksums(locals_: np.ndarray) -> np.ndarray:
+    digits = _digit_matrix(np.char.replace(locals_, "-", ""), 16)
+    # weights of the 11-2 algorithm, 2^(15 - i) mod 11
+    weights = np.array([pow(2, 15 - i, 11) for i in range(15)])
+    check = (12 - digits[:, :15] @ weights % 11) % 11
+    return check == digits[:, 15]
+
+
+def _cas_checksums(locals_: np.ndarray) -> np.ndarray:
+    # right aligned, so the digits of every row have the same weights
+    digits = _digit_matrix(
+        np.char.rjust(np.char.replace(locals_, "-", ""), 10, "0"), 10
+    )
+    return digits[:, :9] @ np.arange(9, 0, -1) % 10 == digits[:, 9]
+
+
+def _isbn_checksums(locals_: np.ndarray) -> np.ndarray:
+    digits = np.char.upper(np.char.replace(np.char.replace(locals_, "-", ""), " ", ""))
+    lengths = np.char.str_len(digits)
+    valid = np.zeros(len(digits), dtype=bool)
+
+    isbn10 = lengths == 10
+    matrix = _digit_matrix(digits[isbn10], 10)
+    valid[isbn10] = (matrix[:, :9] < 10).all(axis=1) & (
+        matrix @ np.arange(10, 0, -1) % 11 == 0
+    )
+
+    isbn13 = lengths == 13
+    matrix = _digit_matrix(digits[isbn13], 13)
+    weights = np.tile([1, 3], 7)[:13]
+    valid[isbn13] = (matrix < 10).all(axis=1) & (matrix @ weights % 10 == 0)
+    return valid
+
+
+@dataclasses.dataclass(frozen=True)
+class Scheme:
+    """Format of the ids of a scheme, the part following the 'scheme:' prefix"""
+
+    pattern: re.Pattern
+    checksum: Optional[Callable[[str], bool]] = None
+    # checksum of many ids matching pattern at once
+    checksums: Optional[Callable[[np.ndarray], np.ndarray]] = None
+
+    def check(self, local: str) -> bool:
+        return self.pattern.fullmatch(local) is not None and (
+            self.checksum is None or self.checksum(local)
+        )
+
+
+# schemes by their prefix (compared case-insensitively), see the comments of
+# the identifier validators in custom_validators.py
+SCHEMES: Dict[str, Scheme] = {
+    "orcid": Scheme(
+        re.compile(r"\d{4}-\d{4}-\d{4}-\d{3}[\dX]", re.ASCII),
+        _orcid_checksum,
+        _orcid_checksums,
+    ),
+    "cas": Scheme(
+        re.compile(r"\d{2,7}-\d{2}-\d", re.ASCII), _cas_checksum, _cas_checksums
+    ),
+    "pccid": Scheme(re.compile(r"[1-9]\d*", re.ASCII)),
+    "pcsid": Scheme(re.compile(r"[1-9]\d*", re.ASCII)),
+    "doi": Scheme(re.compile(r"10\.\d{4,9}/\S+", re.ASCII)),
+    "isbn": Scheme(
+        re.compile(r"\d[\d -]*[\dXx]", re.ASCII), _isbn_checksum, _isbn_checksums
+    ),
+    "pdb": Scheme(
+        re.compile(r"[1-9][A-Za-z0-9]{3}|pdb_\d{4}[1-9][A-Za-z0-9]{3}", re.ASCII)
+    ),
+    "uniprot": Scheme(
+        re.compile(
+            r"(?:[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})"
+            r"(?:-\d+)?"
+        )
+    ),
+}
+
+
+def check_id(value, schemes: Optional[Collection[str]] = None) -> bool:
+    """
+    Whether value is an id prefixed with its scheme, e.g.
+    'orcid:0000-0002-1825-0097', of one of schemes (default: all SCHEMES)
+    """
+    if not isinstance(value, str):
+        return False
+    prefix, separator, local = value.partition(":")
+    if not separator:
+        return False
+    name = prefix.lower()
+    if schemes is not None and name not in schemes:
+        return False
+    scheme = SCHEMES.get(name)
+    return scheme is not None and scheme.check(local)
+
+
+def check_ids(
+    values: Iterable, schemes: Optional[Collection[str]] = None
+) -> np.ndarray:
+    """
+    check_id of many values at once: the values are grouped by scheme and the
+    checksums of every group are computed as matrix products
+    """
+    values = list(values)
+    valid = np.zeros(len(values), dtype=bool)
+    is_str = np.fromiter((isinstance(v, str) for v in values), bool, len(values))
+    if not is_str.any():
+        return valid
+    indexes = np.flatnonzero(is_str)
+    parts = np.char.partition(np.array([values[i] for i in indexes], dtype=str), ":")
+    prefixes = np.char.lower(parts[:, 0])
+    has_separator = parts[:, 1] == ":"
+
+    for name, scheme in SCHEMES.items():
+        if schemes is not None and name not in schemes:
+            continue
+        selected = np.flatnonzero(has_separator & (prefixes == name))
+        if not len(selected):
+            continue
+        locals_ = parts[selected, 2]
+        matches = np.fromiter(
+            (scheme.pattern.fullmatch(local) is not None for local in locals_),
+            bool,
+            len(locals_),
+        )
+        if scheme.checksums is not None and matches.any():
+            matches[matches] = scheme.checksums(locals_[matches])
+        valid[indexes[selected]] = matches
+    return valid
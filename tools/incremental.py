@@ -0,0 +1,413 @@
+import json
+from typing import Dict, List
+
+import yamale
+from yamale.schema.datapath import DataPath
+from yamale.validators import Any, Include
+from yamale.validators import List as ListValidator
+from yamale.validators import Map, Subset, Validator
+
+from custom_validators import Choose, Link, LinkTarget
+from link_index import LinkIndex, link_ref
+
+_MISSING = object()
+
+
+def _unchanged(previous, value) -> bool:
+    """
+    Whether value is the same as previous. Equality alone would confuse e.g.
+    1, 1.0 and True, so equal values are also compared in their JSON form, which
+    only tells those apart (dict keys in another order count as a change).
+    """
+    if previous is value:
+        return True
+    if previous is _MISSING or previous != value:
+        return False
+    return json.dumps(previous, default=str) == json.dumps(value, default=str)
+
+
+def _child(previous, key):
+    """Item of the previous version at key or _MISSING"""
+    try:
+        return previous[key]
+    except (KeyError, IndexError, TypeError):
+        return _MISSING
+
+
+class _Entry:
+    """Result of an include or choose node and the entries of the nodes below it"""
+
+    __slots__ = ("result", "children")
+
+    def __init__(self):
+        self.result = None
+        self.children: Dict = {}
+
+
+class _Walk:
+    """
+    A walk of a record along a schema whose include and choose nodes are
+    memoized in a tree of _Entry, keyed by their path, validator and
+    strictness. An entry of the previous walk is reused if the value of its node
+    is unchanged.
+    """
+
+    def __init__(self, schema: yamale.schema.Schema, memo: Dict):
+        self.schema = schema
+        self.old = memo
+        self.new: Dict = {}
+        self.reused = 0
+        self.computed = 0
+
+    def memoized(self, key, value, previous, compute):
+        old = self.old.get(key)
+        if old is not None and _unchanged(previous, value):
+            self.new[key] = old
+            self.reused += 1
+            return old.result
+
+        entry = _Entry()
+        outer_old, outer_new = self.old, self.new
+        self.old = old.children if old is not None else {}
+        self.new = entry.children
+        try:
+            entry.result = compute()
+        finally:
+            self.old, self.new = outer_old, outer_new
+        self.new[key] = entry
+        self.computed += 1
+        return entry.result
+
+
+class _ValidationWalk(_Walk):
+    """Same errors as Schema._validate and Choose, see custom_validators.py"""
+
+    def validate(self, validator, data, previous, path, strict) -> List[str]:
+        if isinstance(validator, (dict, list)):
+            return self.validate_static_map_list(
+                validator, data, previous, path, strict
+            )
+        if data is None and validator.is_optional and validator.can_be_none:
+            return []
+
+        if isinstance(validator, Choose):
+            return self.memoized(
+                (path, id(validator), None),
+                data,
+                previous,
+                lambda: self.validate_choose(validator, data, previous, path),
+            )
+
+        errors = validator.validate(data)
+        if errors:
+            return ["%s: %s" % (DataPath(*path), error) for error in errors]
+
+        if isinstance(validator, Include):
+            return self.memoized(
+                (path, id(validator), strict),
+                data,
+                previous,
+                lambda: self.validate_include(validator, data, previous, path, strict),
+            )
+        if isinstance(validator, (Map, ListValidator)):
+            return self.validate_map_list(validator, data, previous, path, strict)
+        if isinstance(validator, Any):
+            return self.validate_any(validator, data, previous, path, strict)
+        if isinstance(validator, Subset):
+            return self.schema._validate_subset(
+                validator, data, DataPath(*path), strict
+            )
+        return []
+
+    def validate_item(self, validator, data, previous, path, strict, key):
+        try:
+            item = data[key]
+        except (KeyError, IndexError):
+            if isinstance(validator, Validator) and validator.is_optional:
+                return []
+            return ["%s: Required field missing" % DataPath(*path, key)]
+        return self.validate(
+            validator, item, _child(previous, key), path + (key,), strict
+        )
+
+    def validate_static_map_list(self, validator, data, previous, path, strict):
+        if isinstance(validator, dict):
+            if not yamale.util.is_map(data):
+                return ["%s : '%s' is not a map" % (DataPath(*path), data)]
+        elif not yamale.util.is_list(data):
+            return ["%s : '%s' is not a list" % (DataPath(*path), data)]
+
+        errors = []
+        if strict:
+            data_keys = set(yamale.util.get_keys(data))
+            validator_keys = set(yamale.util.get_keys(validator))
+            for key in data_keys - validator_keys:
+                errors.append("%s: Unexpected element" % DataPath(*path, key))
+        for key, sub_validator in yamale.util.get_iter(validator):
+            errors += self.validate_item(
+                sub_validator, data, previous, path, strict, key
+            )
+        return errors
+
+    def validate_include(self, validator, data, previous, path, strict):
+        include_schema = self.schema.includes.get(validator.include_name)
+        if not include_schema:
+            return ["Include '%s' has not been defined." % validator.include_name]
+        strict = strict if validator.strict is None else validator.strict
+        return self.validate(include_schema._schema, data, previous, path, strict)
+
+    def validate_map_list(self, validator, data, previous, path, strict):
+        errors = []
+        if not validator.validators:
+            return errors
+        for key in yamale.util.get_keys(data):
+            sub_errors = []
+            for sub_validator in validator.validators:
+                err = self.validate_item(
+                    sub_validator, data, previous, path, strict, key
+                )
+                if err:
+                    sub_errors.append(err)
+            if len(sub_errors) == len(validator.validators):
+                for err in sub_errors:
+                    errors += err
+        return errors
+
+    def validate_any(self, validator, data, previous, path, strict):
+        if not validator.validators:
+            return []
+        sub_errors = []
+        for sub_validator in validator.validators:
+            err = self.validate(sub_validator, data, previous, path, strict)
+            if err:
+                sub_errors.append(err)
+        errors = []
+        if len(sub_errors) == len(validator.validators):
+            for err in sub_errors:
+                errors += err
+        return errors
+
+    def validate_choose(self, choose, data, previous, path):
+        # as Choose.validate, which reports its errors relative to the node
+        errors = self.choose_errors(choose, data, previous, (), frozenset())
+        if errors:
+            return ["%s: %s" % (DataPath(*path), "\n".join(errors))]
+        return []
+
+    def choose_errors(self, choose, value, previous, path, skip):
+        """Choose._validate_errors"""
+        if not isinstance(value, dict):
+            return [f"{DataPath(*path)} : '{value}' is not a map"]
+
+        errors = self.include_fields(
+            choose.base_schema, value, previous, path, False, skip
+        )
+        if errors:
+            return errors
+        detailed_schema = choose.get_detailed_schema(value)
+        if detailed_schema is None:
+            return [
+                f"{DataPath(*path, choose.type_field)}: "
+                f"'{value.get(choose.type_field)}' does not select a schema"
+            ]
+        base_fields = self.schema.includes[choose.base_schema.include_name].dict
+        return self.include_fields(
+            detailed_schema, value, previous, path, True, skip.union(base_fields)
+        )
+
+    def include_fields(self, include, value, previous, path, strict, skip):
+        """custom_validators._validate_include_fields"""
+        include_schema = self.schema.includes.get(include.include_name)
+        if not include_schema:
+            return ["Include '%s' has not been defined." % include.include_name]
+        strict = strict if include.strict is None else include.strict
+        validators = include_schema._schema
+
+        if isinstance(validators, Choose):
+            errors = self.choose_errors(validators, value, previous, path, skip)
+            if errors:
+                return ["%s: %s" % (DataPath(*path), "\n".join(errors))]
+            return []
+        if not skip:
+            return self.validate(validators, value, previous, path, strict)
+        if not isinstance(validators, dict):
+            value = {k: v for k, v in value.items() if k not in skip}
+            return self.validate(validators, value, _MISSING, path, strict)
+
+        errors = []
+        if strict:
+            for key in value.keys() - skip - validators.keys():
+                errors.append("%s: Unexpected element" % DataPath(*path, key))
+        for key, validator in validators.items():
+            if key in skip:
+                if isinstance(validator, Validator) and validator.is_optional:
+                    continue
+                errors.append("%s: Required field missing" % DataPath(*path, key))
+            else:
+                errors += self.validate_item(
+                    validator, value, previous, path, strict, key
+                )
+        return errors
+
+
+class _LinkWalk(_Walk):
+    """
+    Collects the link targets and links like link_index._walk, returned as
+    lists of add_target and add_link arguments
+    """
+
+    def walk(self, validator, data, previous, path):
+        targets, links = [], []
+        self._walk(validator, data, previous, path, targets, links)
+        return targets, links
+
+    def _memoized_walk(self, validator, data, previous, path, targets, links):
+        sub_targets, sub_links = self.memoized(
+            (path, id(validator), None),
+            data,
+            previous,
+            lambda: self.walk_node(validator, data, previous, path),
+        )
+        targets += sub_targets
+        links += sub_links
+
+    def walk_node(self, validator, data, previous, path):
+        targets, links = [], []
+        if isinstance(validator, Include):
+            include = self.schema.includes.get(validator.include_name)
+            if include is not None:
+                self._walk(include._schema, data, previous, path, targets, links)
+        else:
+            self._walk(validator.base_schema, data, previous, path, targets, links)
+            detailed_schema = validator.get_detailed_schema(data)
+            if detailed_schema is not None:
+                self._walk(detailed_schema, data, previous, path, targets, links)
+        return targets, links
+
+    def _walk_items(self, validator, items, previous, path, targets, links):
+        for key, item in items:
+            for sub_validator in validator.validators:
+                self._walk(
+                    sub_validator,
+                    item,
+                    _child(previous, key),
+                    path + (key,),
+                    targets,
+                    links,
+                )
+
+    def _walk(self, validator, data, previous, path, targets, links):
+        if data is None:
+            return
+
+        if isinstance(validator, dict):
+            if isinstance(data, dict):
+                for key, sub_validator in validator.items():
+                    if key in data:
+                        self._walk(
+                            sub_validator,
+                            data[key],
+                            _child(previous, key),
+                            path + (key,),
+                            targets,
+                            links,
+                        )
+
+        elif isinstance(validator, LinkTarget):
+            if isinstance(data, str):
+                targets.append((validator.name, data, path))
+
+        elif isinstance(validator, Link):
+            if isinstance(data, dict) and "$ref" in data:
+                links.append((validator.target, link_ref(data), path))
+
+        elif isinstance(validator, Include) or (
+            isinstance(validator, Choose) and isinstance(data, dict)
+        ):
+            self._memoized_walk(validator, data, previous, path, targets, links)
+
+        elif isinstance(validator, ListValidator):
+            if isinstance(data, list):
+                self._walk_items(
+                    validator, enumerate(data), previous, path, targets, links
+                )
+
+        elif isinstance(validator, Map):
+            if isinstance(data, dict):
+                self._walk_items(
+                    validator, data.items(), previous, path, targets, links
+                )
+
+        elif isinstance(validator, Any):
+            for sub_validator in validator.validators:
+                self._walk(sub_validator, data, previous, path, targets, links)
+
+
+class IncrementalValidator:
+    """
+    Validates successive versions of a record, e.g. while it is edited. Only
+    the include and choose nodes whose value changed since the previous
+    version are validated again, so the polymorphic node enclosing a change is
+    re-checked as a whole while its unchanged siblings are not, and the link
+    targets and links of unchanged nodes are reused to check link integrity.
+
+    The errors are the same as those of validate_examples.validate_record.
+    Validated records must not be modified in place afterwards, edit a copy
+    (sharing unchanged items with the previous version makes diffing cheaper).
+    """
+
+    def __init__(self, schema: yamale.schema.Schema, strict: bool = True):
+        self.schema = schema
+        self.strict = strict
+        self.record = _MISSING
+        self.errors: List[str] = []
+        # number of include and choose nodes reused and validated by the last call
+        self.reused = 0
+        self.computed = 0
+        self._validation_memo: Dict = {}
+        self._link_memo: Dict = {}
+
+    def validate(self, record, previous=_MISSING) -> List[str]:
+        """
+        Validates record and returns its errors. previous is the version of
+        the record validated last (by default the record of the last call),
+        only the nodes which differ from it are validated again. The results
+        of the nodes are only kept for the record of the last call, so a
+        record with another previous version is validated from scratch.
+        """
+        if previous is _MISSING:
+            previous = self.record
+        if previous is self.record:
+            validation_memo, link_memo = self._validation_memo, self._link_memo
+        else:
+            previous, validation_memo, link_memo = _MISSING, {}, {}
+
+        validation = _ValidationWalk(self.schema, validation_memo)
+        links = _LinkWalk(self.schema, link_memo)
+        try:
+            errors = validation.validate(
+                self.schema._schema, record, previous, (), self.strict
+            )
+            targets, record_links = links.walk(
+                self.schema._schema, record, previous, ()
+            )
+            index = LinkIndex()
+            for target in targets:
+                index.add_target(*target)
+            for link in record_links:
+                index.add_link(*link)
+            errors += index.errors()
+        except Exception as e:
+            # reported like validate_examples.validate_record does, the next
+            # record is validated from scratch
+            self._validation_memo, self._link_memo = {}, {}
+            self.record = _MISSING
+            self.errors = [f"{type(e).__name__}: {e}"]
+            return self.errors
+
+        self._validation_memo, self._link_memo = validation.new, links.new
+        self.reused = validation.reused + links.reused
+        self.computed = validation.computed + links.computed
+        self.record = record
+        self.errors = errors
+        return self.errors
@@ -0,0 +1,82 @@
+from datetime import date
+
+import yamale
+from yamale.validators import Any, Day, Include
+from yamale.validators import List as ListValidator
+from yamale.validators import Map
+
+from custom_validators import Choose, Link
+
+
+def from_json(schema: yamale.schema.Schema, record):
+    """
+    The record as it would be loaded from YAML, from its JSON form (e.g. an
+    Invenio fixture written by validate_examples.py): the ISO dates of day()
+    fields, strings in JSON, are converted to dates and links exported with
+    an "id" get their "$ref" back. The record is not changed, the parts that
+    are converted are copied.
+    """
+    return _convert(schema, schema._schema, record)
+
+
+def _convert(schema, validator, data):
+    """
+    Follows the data along the validator like link_index._walk, structural
+    mismatches are left to the schema validation
+    """
+    if data is None:
+        return data
+
+    if isinstance(validator, dict):
+        if isinstance(data, dict):
+            return {
+                key: _convert(schema, validator[key], value)
+                if key in validator
+                else value
+                for key, value in data.items()
+            }
+
+    elif isinstance(validator, Day):
+        if isinstance(data, str):
+            try:
+                return date.fromisoformat(data)
+            except ValueError:
+                pass
+
+    elif isinstance(validator, Link):
+        if isinstance(data, dict) and "$ref" not in data and "id" in data:
+            return {("$ref" if key == "id" else key): v for key, v in data.items()}
+
+    elif isinstance(validator, Include):
+        include = schema.includes.get(validator.include_name)
+        if include is not None:
+            return _convert(schema, include._schema, data)
+
+    elif isinstance(validator, Choose):
+        if isinstance(data, dict):
+            data = _convert(schema, validator.base_schema, data)
+            detailed_schema = validator.get_detailed_schema(data)
+            if detailed_schema is not None:
+                data = _convert(schema, detailed_schema, data)
+
+    elif isinstance(validator, ListValidator):
+        if isinstance(data, list):
+            return [_convert_any(schema, validator.validators, item) for item in data]
+
+    elif isinstance(validator, Map):
+        if isinstance(data, dict):
+            return {
+                key: _convert_any(schema, validator.validators, item)
+                for key, item in data.items()
+            }
+
+    elif isinstance(validator, Any):
+        data = _convert_any(schema, validator.validators, data)
+
+    return data
+
+
+def _convert_any(schema, validators, data):
+    for validator in validators:
+        data = _convert(schema, validator, data)
+    return data
@@ -0,0 +1,158 @@
+import dataclasses
+from typing import Dict, List, Tuple
+
+import yamale
+from yamale.schema.datapath import DataPath
+from yamale.validators import Any, Include
+from yamale.validators import List as ListValidator
+from yamale.validators import Map
+
+from custom_validators import Choose, Link, LinkTarget
+
+# path of an item in a record as a tuple of keys and indexes
+RecordPath = Tuple
+
+# kinds of link errors
+DUPLICATE_ID = "duplicate_id"  # a link target id declared more than once
+BROKEN_LINK = "broken_link"  # a link referencing no link target
+
+
+@dataclasses.dataclass
+class LinkIndex:
+    """
+    Link targets and links of a record. Targets are indexed by the name of
+    their link_target and their id, so resolving a link is a dict lookup.
+    """
+
+    # link_target name -> id -> path of the id
+    targets: Dict[str, Dict[str, RecordPath]] = dataclasses.field(default_factory=dict)
+    # (link target name, referenced id, path of the link)
+    links: List[Tuple[str, str, RecordPath]] = dataclasses.field(default_factory=list)
+    # (link_target name, id, path, path of the first declaration)
+    duplicates: List[Tuple[str, str, RecordPath, RecordPath]] = dataclasses.field(
+        default_factory=list
+    )
+
+    def add_target(self, name: str, target_id: str, path: RecordPath) -> None:
+        ids = self.targets.setdefault(name, {})
+        first = ids.setdefault(target_id, path)
+        if first != path:
+            self.duplicates.append((name, target_id, path, first))
+
+    def add_link(self, target: str, ref: str, path: RecordPath) -> None:
+        self.links.append((target, ref, path))
+
+    def resolve(self, target: str, ref: str):
+        """Returns the path of the link target referenced by a link or None"""
+        return self.targets.get(target, {}).get(ref)
+
+    def is_valid(self) -> bool:
+        """Whether there are no errors, without formatting them"""
+        return not self.duplicates and all(
+            self.resolve(target, ref) is not None for target, ref, _ in self.links
+        )
+
+    def path_errors(self) -> List[Tuple[RecordPath, str, str]]:
+        """(path, kind, message) of all broken links and duplicated link target ids"""
+        errors = []
+        for name, target_id, path, first in self.duplicates:
+            errors.append(
+                (
+                    path,
+                    DUPLICATE_ID,
+                    f"Duplicated id '{target_id}' of link target '{name}', "
+                    f"first declared at {DataPath(*first)}",
+                )
+            )
+        for target, ref, path in self.links:
+            if self.resolve(target, ref) is None:
+                errors.append(
+                    (
+                        path,
+                        BROKEN_LINK,
+                        f"Link to '{ref}' does not reference the id of a "
+                        f"'{target}' link target",
+                    )
+                )
+        return errors
+
+    def errors(self) -> List[str]:
+        """Errors of all broken links and duplicated link target ids"""
+        return [
+            f"{DataPath(*path)}: {message}" for path, _, message in self.path_errors()
+        ]
+
+
+def build_link_index(schema: yamale.schema.Schema, record) -> LinkIndex:
+    """Walks a record once along its schema and collects its link targets and links"""
+    index = LinkIndex()
+    _walk(schema, schema._schema, record, (), index)
+    return index
+
+
+def check_links(schema: yamale.schema.Schema, record) -> List[str]:
+    """
+    Returns an error for every link of the record which does not reference
+    the id of a link_target with the name of its target, and for every
+    link_target id declared more than once
+    """
+    return build_link_index(schema, record).errors()
+
+
+def link_ref(value) -> str:
+    """Id referenced by the value of a link, a leading '#' is optional"""
+    ref = value["$ref"]
+    if isinstance(ref, str) and ref.startswith("#"):
+        return ref[1:]
+    return ref
+
+
+def _walk(schema, validator, data, path: RecordPath, index: LinkIndex) -> None:
+    """
+    Follows the data along the validator, structural mismatches are skipped
+    as they are reported by the schema validation
+    """
+    if data is None:
+        return
+
+    if isinstance(validator, dict):
+        if isinstance(data, dict):
+            for key, sub_validator in validator.items():
+                if key in data:
+                    _walk(schema, sub_validator, data[key], path + (key,), index)
+
+    elif isinstance(validator, LinkTarget):
+        if isinstance(data, str):
+            index.add_target(validator.name, data, path)
+
+    elif isinstance(validator, Link):
+        if isinstance(data, dict) and "$ref" in data:
+            index.add_link(validator.target, link_ref(data), path)
+
+    elif isinstance(validator, Include):
+        include = schema.includes.get(validator.include_name)
+        if include is not None:
+            _walk(schema, include._schema, data, path, index)
+
+    elif isinstance(validator, Choose):
+        if isinstance(data, dict):
+            _walk(schema, validator.base_schema, data, path, index)
+            detailed_schema = validator.get_detailed_schema(data)
+            if detailed_schema is not None:
+                _walk(schema, detailed_schema, data, path, index)
+
+    elif isinstance(validator, ListValidator):
+        if isinstance(data, list):
+            for i, item in enumerate(data):
+                for sub_validator in validator.validators:
+                    _walk(schema, sub_validator, item, path + (i,), index)
+
+    elif isinstance(validator, Map):
+        if isinstance(data, dict):
+            for key, item in data.items():
+                for sub_validator in validator.validators:
+                    _walk(schema, sub_validator, item, path + (key,), index)
+
+    elif isinstance(validator, Any):
+        for sub_validator in validator.validators:
+            _walk(schema, sub_validator, data, path, index)
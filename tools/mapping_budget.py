@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+import dataclasses
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from ruamel.yaml import YAML
+
+from dedup_definitions import split_reference
+from yamale2oarepo_config import MAPPING_LIMITS, QUERY_STRING_FIELD
+
+OAREPO = Path(__file__).parent.parent / "models" / "oarepo"
+
+
+@dataclasses.dataclass
+class MappingField:
+    """Field of the OpenSearch mapping of an oarepo model"""
+
+    type: str = "object"
+    children: Dict[str, "MappingField"] = dataclasses.field(default_factory=dict)
+    polymorphic: bool = False
+    default_search: bool = False
+
+    def child(self, path: str) -> "MappingField":
+        """The field at a dotted path below this one, added if missing"""
+        field = self
+        for key in path.split("."):
+            if key not in field.children:
+                field.type = "nested" if field.type == "nested" else "object"
+                field.children[key] = MappingField("keyword")
+            field = field.children[key]
+        return field
+
+    def walk(self, depth: int = 1) -> Iterator[Tuple["MappingField", int]]:
+        """
+        The field and the fields below it with their depth, the number of
+        objects containing them (1 for the fields of the root object)
+        """
+        yield self, depth
+        for child in self.children.values():
+            yield from child.walk(depth + 1)
+
+
+class _MappingBuilder:
+    """
+    Expands an oarepo model into its mapping: `use` includes the definition,
+    the schemas of a polymorphic field are merged into one object and
+    relations and vocabularies are objects with their keys
+    """
+
+    def __init__(self, defs: Dict[str, dict]):
+        self.defs = defs
+
+    def resolve(self, node: dict, using: Tuple[str, ...]):
+        while split_reference(node.get("use")):
+            _, name = split_reference(node["use"])
+            if name in using:
+                raise ValueError(
+                    f"Recursive definitions {' -> '.join(using + (name,))}"
+                )
+            using = using + (name,)
+            node = {**self.defs[name], **{k: v for k, v in node.items() if k != "use"}}
+        return node, using
+
+    def add(self, node: dict, field: MappingField, using: Tuple[str, ...]) -> None:
+        node, using = self.resolve(node, using)
+        node_type = node.get("type")
+        mapping = node.get("mapping") or {}
+        self.add_mapping(mapping, field)
+        if node_type == "array":
+            self.add(node["items"], field, using)
+        elif node_type == "polymorphic":
+            field.polymorphic = True
+            field.type = mapping.get("type", "object")
+            for schema in node.get("schemas", {}).values():
+                self.add_properties(*self.resolve(schema, using), field)
+        elif node_type in ("relation", "vocabulary"):
+            field.type = "object"
+            for key in node.get("keys") or ():
+                field.child(key)
+            for key, extra in (node.get("extras") or {}).items():
+                self.add_mapping(extra.get("mapping") or {}, field.child(key))
+        elif "properties" in node:
+            nested = "nested" in (node_type, mapping.get("type"))
+            field.type = "nested" if nested else "object"
+            self.add_properties(node, using, field)
+        else:
+            field.type = node_type
+
+    def add_properties(self, node: dict, using: Tuple[str, ...], field: MappingField):
+        for key, child in node.get("properties", {}).items():
+            name = key[:-2] if key.endswith("[]") else key
+            self.add(child, field.children.setdefault(name, MappingField()), using)
+
+    def add_mapping(self, mapping: dict, field: MappingField) -> None:
+        if mapping.get("copy_to") == QUERY_STRING_FIELD:
+            field.default_search = True
+        for key, child in (mapping.get("properties") or {}).items():
+            self.add_mapping(child, field.child(key))
+
+
+def metadata_mapping(metadata: dict, defs: Dict[str, dict]) -> MappingField:
+    """Mapping of the metadata object of a model"""
+    root = MappingField()
+    _MappingBuilder(defs).add_properties({"properties": metadata}, (), root)
+    return root
+
+
+@dataclasses.dataclass
+class MappingBudget:
+    package: str
+    # fields and objects, as counted by index.mapping.total_fields.limit
+    fields: int
+    nested: int
+    polymorphic: int
+    depth: int
+    # fields copied into QUERY_STRING_FIELD
+    default_search_fields: int
+
+    def exceeded(self, limits: Dict[str, Optional[int]]) -> List[str]:
+        """The limits (None for no limit) exceeded by the mapping"""
+        return [
+            f"{self.package}: {name} {getattr(self, name)} > {limit}"
+            for name, limit in limits.items()
+            if limit is not None and getattr(self, name) > limit
+        ]
+
+
+def mapping_budget(metadata: dict, defs: Dict[str, dict], package: str = ""):
+    """
+    Budget of the mapping of a model, whose metadata object is a field of the
+    root object of the records
+    """
+    fields = list(metadata_mapping(metadata, defs).walk())
+    return MappingBudget(
+        package=package,
+        fields=len(fields),
+        nested=sum(field.type == "nested" for field, _ in fields),
+        polymorphic=sum(field.polymorphic for field, _ in fields),
+        depth=max(depth for _, depth in fields),
+        default_search_fields=sum(field.default_search for field, _ in fields),
+    )
+
+
+def _used_files(node) -> Set[str]:
+    if isinstance(node, dict):
+        reference = split_reference(node.get("use"))
+        files = {reference[0]} - {""} if reference else set()
+        return files.union(*(_used_files(value) for value in node.values()))
+    if isinstance(node, list):
+        return set().union(*(_used_files(item) for item in node))
+    return set()
+
+
+def load_budgets(folder: Path = OAREPO) -> List[MappingBudget]:
+    """
+    Budgets of the models (<package>-metadata.yaml) of an oarepo folder, whose
+    definitions are in <package>-definitions.yaml and in the definitions files
+    they use (yamale2oarepo.py --share)
+    """
+    yaml = YAML(typ="safe")
+    budgets = []
+    for path in sorted(Path(folder).glob("*-metadata.yaml")):
+        package = path.name[: -len("-metadata.yaml")]
+        metadata = yaml.load(path)
+        defs = yaml.load(path.with_name(f"{package}-definitions.yaml"))
+        files, loaded = _used_files([metadata, defs]), set()
+        while files - loaded:
+            file = min(files - loaded)
+            used = yaml.load(path.with_name(file))
+            # a definition is shared with all the definitions it uses
+            defs = {**used, **defs}
+            files |= _used_files(used)
+            loaded.add(file)
+        budgets.append(mapping_budget(metadata, defs, package))
+    return budgets
+
+
+def check_budgets(folder: Path = OAREPO, limits=MAPPING_LIMITS) -> List[MappingBudget]:
+    """Budgets of the models of an oarepo folder, ValueError if over the limits"""
+    budgets = load_budgets(folder)
+    exceeded = [line for budget in budgets for line in budget.exceeded(limits)]
+    if exceeded:
+        raise ValueError("Mapping limits exceeded:\n" + "\n".join(exceeded))
+    return budgets
+
+
+def print_budgets(budgets: List[MappingBudget], limits, file=sys.stdout) -> None:
+    names = [field.name for field in dataclasses.fields(MappingBudget)][1:]
+    width = max(len(package) for package in ["limit", *(b.package for b in budgets)])
+    print(f"{'':<{width}}  " + "  ".join(names), file=file)
+    for budget in budgets:
+        values = "  ".join(f"{getattr(budget, name):>{len(name)}}" for name in names)
+        print(f"{budget.package:<{width}}  {values}", file=file)
+    limit_values = "  ".join(
+        f"{'-' if limits.get(name) is None else limits[name]:>{len(name)}}"
+        for name in names
+    )
+    print(f"{'limit':<{width}}  {limit_values}", file=file)
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Compute the size of the OpenSearch mappings of the oarepo "
+        "models and check them against the limits of the index"
+    )
+    parser.add_argument(
+        "--models",
+        type=Path,
+        default=OAREPO,
+        help="Folder with the <package>-metadata.yaml and <package>-definitions.yaml "
+        "models",
+    )
+    for name, limit in MAPPING_LIMITS.items():
+        parser.add_argument(
+            f"--max-{name.replace('_', '-')}",
+            type=int,
+            default=limit,
+            dest=name,
+            help=f"Limit on the {name.replace('_', ' ')} (default: {limit})",
+        )
+    parser.add_argument("--json", action="store_true", help="Print the budgets as JSON")
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    limits = {name: getattr(args, name) for name in MAPPING_LIMITS}
+    budgets = load_budgets(args.models)
+    if args.json:
+        print(json.dumps([dataclasses.asdict(budget) for budget in budgets], indent=2))
+    else:
+        print_budgets(budgets, limits)
+    exceeded = [line for budget in budgets for line in budget.exceeded(limits)]
+    for line in exceeded:
+        print(line, file=sys.stderr)
+    sys.exit(1 if exceeded else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import ast
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+
+
+@lru_cache(maxsize=None)
+def module_sources(path: Path) -> Tuple[Path, ...]:
+    """
+    Source file of a module and of the modules of its folder it imports,
+    recursively, e.g. of a tool and of the tools it imports as top level
+    modules
+    """
+    folder = path.parent
+    sources = {}
+    pending = [path]
+    while pending:
+        path = pending.pop()
+        if path in sources or not path.exists():
+            continue
+        sources[path] = None
+        for node in ast.walk(ast.parse(path.read_bytes())):
+            if isinstance(node, ast.Import):
+                pending.extend(folder / f"{alias.name}.py" for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(folder / f"{node.module}.py")
+    return tuple(sorted(sources))
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Optional
+
+import yamale
+from yamale.readers import parse_yaml
+
+from custom_validators import bind_schema, extend_validators
+from module_sources import module_sources
+
+CACHE_DIR = Path(
+    os.environ.get("MBDB_SCHEMA_CACHE", Path(__file__).parent / ".schema_cache")
+)
+
+
+def schema_key(*sources: bytes, validators=extend_validators) -> str:
+    """
+    Hash of the schema sources and the validator set used to build them.
+    Validators are identified by their tag, the import path of their class,
+    which is also what the pickled schema refers to, and the source of the
+    modules defining them and of the tool modules those import, e.g.
+    identifiers.py.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"yamale={yamale.__version__}".encode())
+    for tag, validator in sorted(validators.items(), key=lambda item: str(item[0])):
+        digest.update(
+            f"{tag}={validator.__module__}.{validator.__qualname__};".encode()
+        )
+    # pickles only store the attributes of validators, so a change to the code
+    # defining them, or to the tool modules that code imports, must invalidate
+    # the cache as well
+    module_files = set()
+    for module_name in {v.__module__ for v in validators.values()}:
+        module_file = getattr(sys.modules.get(module_name), "__file__", None)
+        if module_file:
+            module_files.update(module_sources(Path(module_file)))
+    for module_file in sorted(module_files):
+        digest.update(module_file.read_bytes())
+    for source in sources:
+        digest.update(hashlib.sha256(source).digest())
+    return digest.hexdigest()
+
+
+def load_schema(
+    schema_file: Optional[Path] = None,
+    *includes: Path,
+    content: Optional[str] = None,
+    validators=extend_validators,
+    cache_dir: Optional[Path] = CACHE_DIR,
+) -> yamale.schema.Schema:
+    """
+    Returns the schema of schema_file (or content) with the includes of the
+    additional include files merged, as built by yamale.make_schema followed by
+    Schema.add_include, and its choose validators bound to it.
+
+    The built schema is pickled to cache_dir, keyed by a hash of the contents of
+    all inputs and the validator set, so any change to them results in a new
+    entry. A cache_dir of None disables the cache.
+    """
+    if content is not None:
+        sources = [content.encode()]
+    else:
+        sources = [Path(schema_file).read_bytes()]
+    sources += [Path(include).read_bytes() for include in includes]
+
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = (
+            Path(cache_dir) / f"{schema_key(*sources, validators=validators)}.pickle"
+        )
+        try:
+            with open(cache_file, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # corrupted or stale entry, rebuild it below
+            pass
+
+    schema = yamale.make_schema(schema_file, validators=validators, content=content)
+    for include in includes:
+        for doc in parse_yaml(include):
+            schema.add_include(doc)
+    bind_schema(schema)
+
+    if cache_file is not None:
+        _write_atomic(cache_file, schema)
+    return schema
+
+
+def _write_atomic(cache_file: Path, schema: yamale.schema.Schema) -> None:
+    """Writes the pickled schema such that concurrent readers never see a partial file"""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile(dir=cache_file.parent, delete=False) as f:
+        pickle.dump(schema, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, cache_file)
+
+
+def clear_cache(cache_dir: Path = CACHE_DIR) -> int:
+    """
+    Removes all cached schemas and compiled validation code and returns how
+    many were removed
+    """
+    removed = 0
+    for pattern in ("*.pickle", "compiled-*.marshal"):
+        for cache_file in Path(cache_dir).glob(pattern):
+            cache_file.unlink()
+            removed += 1
+    return removed
@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+
+import hashlib
+import importlib.util
+import marshal
+import os
+from argparse import ArgumentParser
+from collections.abc import Mapping
+from datetime import date
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, List, Optional
+
+import yamale
+from yamale.schema.datapath import DataPath
+from yamale.validators import Any, Boolean, Day, Enum, Include, Integer
+from yamale.validators import List as ListValidator
+from yamale.validators import Map, Number, String, Subset, Validator
+
+from custom_validators import Choose, value_valid
+from schema_cache import CACHE_DIR, load_schema
+
+_MISSING = object()
+_NO_SKIP = frozenset()
+
+
+def _fmt(path) -> str:
+    """Same as str(DataPath(*path))"""
+    return ".".join(map(str, path))
+
+
+class _PathExpr:
+    """
+    Path of a value in generated code: a tuple variable followed by keys known
+    at compile time and index variables. Only rendered where it is needed.
+    """
+
+    def __init__(self, base: str, parts=()):
+        self.base = base
+        self.parts = tuple(parts)
+
+    def __add__(self, part: str) -> "_PathExpr":
+        return _PathExpr(self.base, self.parts + (part,))
+
+    def as_tuple(self) -> str:
+        if not self.parts:
+            return self.base
+        return f"{self.base} + ({', '.join(self.parts)},)"
+
+    def as_str(self) -> str:
+        return f"_fmt({self.as_tuple()})"
+
+
+class _Compiler:
+    """
+    Generates Python source validating data exactly like
+    yamale.schema.Schema._validate (and custom_validators.Choose) would for a
+    schema, with the dispatch on validator types done at compile time. With
+    check, the generated validate returns whether the data is valid instead,
+    returning False at the first error without formatting any message.
+    """
+
+    def __init__(self, schema: yamale.schema.Schema, check: bool = False):
+        self.schema = schema
+        self.check = check
+        self.constants: List = []
+        self._constant_names: Dict[int, str] = {}
+        self.lines: List[str] = []
+        self._functions: Dict[tuple, str] = {}
+        self._pending: List = []
+        # dispatch tables of choose validators by id of their detailed include
+        # validators (which are not hashable), defined after all functions
+        self._tables: List[str] = []
+        self._n_vars = 0
+
+    # helpers
+
+    def const(self, obj) -> str:
+        """Name of a module level constant holding obj"""
+        name = self._constant_names.get(id(obj))
+        if name is None:
+            name = f"K{len(self.constants)}"
+            self._constant_names[id(obj)] = name
+            self.constants.append(obj)
+        return name
+
+    def var(self, prefix="v") -> str:
+        self._n_vars += 1
+        return f"{prefix}{self._n_vars}"
+
+    def error(self, pad: str, out: str, message: str) -> None:
+        """Statement adding the error message (an expression) to out"""
+        if self.check:
+            self.lines.append(f"{pad}return False")
+        else:
+            self.lines.append(f"{pad}{out}.append({message})")
+
+    def errors(self, pad: str, out: str, call: str, generated=True) -> None:
+        """
+        Statement adding the errors returned by call, of a generated function
+        or (not generated) of yamale, to out
+        """
+        if self.check:
+            self.lines.append(f"{pad}if {'not ' if generated else ''}{call}:")
+            self.lines.append(f"{pad}    return False")
+        else:
+            self.lines.append(f"{pad}{out}.extend({call})")
+
+    def path_tuple(self, path: _PathExpr) -> str:
+        """Path passed on to a function, checks have no use for it"""
+        return "()" if self.check else path.as_tuple()
+
+    def begin(self) -> None:
+        if not self.check:
+            self.lines.append("    errors = []")
+
+    def end(self) -> None:
+        self.lines.append("    return True" if self.check else "    return errors")
+
+    def function(self, kind: str, obj, name: str) -> str:
+        """Name of the generated function of obj, generated after the current one"""
+        key = (kind, id(obj))
+        if key not in self._functions:
+            safe = "".join(c if c.isalnum() else "_" for c in str(name))
+            self._functions[key] = f"{kind}_{safe}_{len(self._functions)}"
+            self._pending.append((kind, obj, self._functions[key]))
+        return self._functions[key]
+
+    # entry point
+
+    def compile(self) -> str:
+        out = self.lines
+        out.append("def validate(data, path, strict):")
+        self.begin()
+        self.emit(self.schema._schema, "data", _PathExpr("path"), "strict", "errors", 1)
+        self.end()
+        while self._pending:
+            kind, obj, name = self._pending.pop(0)
+            out.append("")
+            getattr(self, f"_emit_{kind}")(obj, name)
+        out.append("")
+        out.extend(self._tables)
+        return "\n".join(out) + "\n"
+
+    # generated functions
+
+    def _emit_inc(self, include_name, name):
+        """Include_schema._validate(include_schema._schema, data, path, strict)"""
+        out = self.lines
+        out.append(f"def {name}(data, path, strict):")
+        self.begin()
+        include = self.schema.includes[include_name]
+        self.emit(include._schema, "data", _PathExpr("path"), "strict", "errors", 1)
+        self.end()
+
+    def _emit_alt(self, validator, name):
+        """Check of one of the alternatives of a validator"""
+        self.lines.append(f"def {name}(data, path, strict):")
+        self.emit(validator, "data", _PathExpr("path"), "strict", "errors", 1)
+        self.lines.append("    return True")
+
+    def _emit_incskip(self, include_name, name):
+        """custom_validators._validate_include_fields on a dict include with skip"""
+        out = self.lines
+        validators = self.schema.includes[include_name]._schema
+        d = self.const(validators)
+        out.append(f"def {name}(data, path, strict, skip):")
+        self.begin()
+        out.append("    if strict:")
+        out.append(f"        for key in data.keys() - skip - {d}.keys():")
+        self.error(" " * 12, "errors", "'%s: Unexpected element' % _fmt(path + (key,))")
+        for key, sub in validators.items():
+            k = repr(key)
+            optional = isinstance(sub, Validator) and sub.is_optional
+            out.append(f"    if {k} in skip:")
+            if optional:
+                out.append("        pass")
+            else:
+                self.error(
+                    " " * 8,
+                    "errors",
+                    f"'%s: Required field missing' % _fmt(path + ({k},))",
+                )
+            out.append("    else:")
+            self.emit_item(key, sub, "data", _PathExpr("path"), "strict", "errors", 2)
+        self.end()
+
+    def _emit_fields(self, include: Include, name):
+        """custom_validators._validate_include_fields for an include validator"""
+        out = self.lines
+        out.append(f"def {name}(data, path, strict, skip):")
+        include_schema = self.schema.includes.get(include.include_name)
+        if not include_schema:
+            message = "Include '%s' has not been defined." % include.include_name
+            out.append(
+                "    return False" if self.check else f"    return [{message!r}]"
+            )
+            return
+        if include.strict is not None:
+            out.append(f"    strict = {include.strict!r}")
+        validators = include_schema._schema
+        if isinstance(validators, Choose):
+            choose = self.function("choose", validators, include.include_name)
+            if self.check:
+                out.append(f"    return {choose}(data, path, skip)")
+                return
+            out.append(f"    errors = {choose}(data, path, skip)")
+            out.append("    if errors:")
+            out.append("        return ['%s: %s' % (_fmt(path), '\\n'.join(errors))]")
+            out.append("    return []")
+            return
+        inc = self.function("inc", include.include_name, include.include_name)
+        out.append("    if not skip:")
+        out.append(f"        return {inc}(data, path, strict)")
+        if not isinstance(validators, dict):
+            out.append(
+                f"    return {inc}("
+                "{k: v for k, v in data.items() if k not in skip}, path, strict)"
+            )
+        else:
+            incskip = self.function(
+                "incskip", include.include_name, include.include_name
+            )
+            out.append(f"    return {incskip}(data, path, strict, skip)")
+
+    def _emit_choose(self, choose: Choose, name):
+        """Choose._validate_errors"""
+        out = self.lines
+        c = self.const(choose)
+        base = self.function(
+            "fields", choose.base_schema, choose.base_schema.include_name
+        )
+        table = f"DETAILED_{name}"
+        self._tables.append(
+            f"{table} = {{"
+            + ", ".join(
+                f"id({self.const(include)}): "
+                f"{self.function('fields', include, include.include_name)}"
+                for include in choose.detailed_schemas.values()
+            )
+            + "}"
+        )
+        base_include = self.schema.includes.get(choose.base_schema.include_name)
+        base_fields = self.const(
+            frozenset(base_include.dict) if base_include is not None else frozenset()
+        )
+        type_field = repr(choose.type_field)
+
+        out.append(f"def {name}(data, path, skip):")
+        out.append("    if not isinstance(data, dict):")
+        if self.check:
+            out.append("        return False")
+            out.append(f"    if not {base}(data, path, False, skip):")
+            out.append("        return False")
+        else:
+            out.append(
+                "        return [\"%s : '%s' is not a map\" % (_fmt(path), data)]"
+            )
+            out.append(f"    errors = {base}(data, path, False, skip)")
+            out.append("    if errors:")
+            out.append("        return errors")
+        out.append(f"    detailed = {c}.get_detailed_schema(data)")
+        out.append("    if detailed is None:")
+        if self.check:
+            out.append("        return False")
+        else:
+            out.append(
+                "        return [\"%s: '%s' does not select a schema\" % "
+                f"(_fmt(path + ({type_field},)), data.get({type_field}))]"
+            )
+        out.append(
+            f"    return {table}[id(detailed)](data, path, True, skip.union({base_fields}))"
+        )
+
+    # statements
+
+    def emit_item(self, key, sub, value, path, strict, out, indent):
+        """Schema._validate_item for a key of a dict"""
+        pad = "    " * indent
+        k = repr(key)
+        item = self.var()
+        self.lines.append(f"{pad}{item} = {value}.get({k}, _MISSING)")
+        self.lines.append(f"{pad}if {item} is _MISSING:")
+        if isinstance(sub, Validator) and sub.is_optional:
+            self.lines.append(f"{pad}    pass")
+        else:
+            self.error(
+                pad + "    ",
+                out,
+                f"'%s: Required field missing' % {(path + k).as_str()}",
+            )
+        self.lines.append(f"{pad}else:")
+        self.emit(sub, item, path + k, strict, out, indent + 1)
+
+    def emit(self, node, value, path: _PathExpr, strict, out, indent):
+        """Schema._validate"""
+        if isinstance(node, dict):
+            self.emit_static_map(node, value, path, strict, out, indent)
+        elif isinstance(node, Validator):
+            self.emit_validator(node, value, path, strict, out, indent)
+        else:
+            self.emit_fallback(node, value, path, strict, out, indent)
+
+    def emit_fallback(self, node, value, path, strict, out, indent):
+        pad = "    " * indent
+        self.errors(
+            pad,
+            out,
+            f"SCHEMA._validate({self.const(node)}, {value}, "
+            f"DataPath(*{self.path_tuple(path)}), {strict})",
+            generated=False,
+        )
+
+    def emit_static_map(self, node, value, path, strict, out, indent):
+        """Schema._validate_static_map_list for a dict"""
+        pad = "    " * indent
+        lines = self.lines
+        lines.append(f"{pad}if not isinstance({value}, Mapping):")
+        self.error(
+            pad + "    ",
+            out,
+            f"\"%s : '%s' is not a map\" % ({path.as_str()}, {value})",
+        )
+        lines.append(f"{pad}else:")
+        keys = self.const(set(node.keys()))
+        key = self.var("k")
+        lines.append(f"{pad}    if {strict}:")
+        lines.append(f"{pad}        for {key} in set({value}.keys()) - {keys}:")
+        self.error(
+            pad + " " * 12,
+            out,
+            f"'%s: Unexpected element' % {(path + key).as_str()}",
+        )
+        if not node:
+            lines.append(f"{pad}    pass")
+        for k, sub in node.items():
+            self.emit_item(k, sub, value, path, strict, out, indent + 1)
+
+    def emit_validator(self, node: Validator, value, path, strict, out, indent):
+        """Schema._validate for a validator"""
+        pad = "    " * indent
+        lines = self.lines
+        if node.is_optional and node.can_be_none:
+            lines.append(f"{pad}if {value} is not None:")
+            indent += 1
+            pad = "    " * indent
+
+        if isinstance(node, Choose):
+            choose = self.function("choose", node, "choose")
+            if self.check:
+                lines.append(f"{pad}if not {choose}({value}, (), _NO_SKIP):")
+                lines.append(f"{pad}    return False")
+                return
+            errors = self.var("e")
+            lines.append(f"{pad}{errors} = {choose}({value}, (), _NO_SKIP)")
+            lines.append(f"{pad}if {errors}:")
+            lines.append(
+                f"{pad}    {out}.append('%s: %s' % ({path.as_str()}, '\\n'.join({errors})))"
+            )
+            return
+
+        children = self._has_children(node)
+        fast = self.fast_check(node, value)
+        if fast == "True":
+            if children:
+                self.emit_children(node, value, path, strict, out, indent)
+            return
+
+        v = self.const(node)
+        if self.check:
+            if type(node).validate is Validator.validate:
+                valid = f"value_valid({v}, {value})"
+            else:
+                valid = f"not {v}.validate({value})"
+            lines.append(
+                f"{pad}if not ({valid if fast == 'False' else fast} or {valid}):"
+            )
+            lines.append(f"{pad}    return False")
+            if children:
+                self.emit_children(node, value, path, strict, out, indent)
+            return
+        errors = self.var("e")
+        lines.append(f"{pad}{errors} = None if {fast} else {v}.validate({value})")
+        lines.append(f"{pad}if {errors}:")
+        lines.append(f"{pad}    _prefix = '%s: ' % {path.as_str()}")
+        lines.append(f"{pad}    {out}.extend([_prefix + _e for _e in {errors}])")
+        if children:
+            lines.append(f"{pad}else:")
+            self.emit_children(node, value, path, strict, out, indent + 1)
+
+    @staticmethod
+    def _has_children(node):
+        return isinstance(node, (Include, Map, ListValidator, Any, Subset))
+
+    def emit_children(self, node, value, path, strict, out, indent):
+        pad = "    " * indent
+        lines = self.lines
+        if isinstance(node, Include):
+            include_schema = self.schema.includes.get(node.include_name)
+            if not include_schema:
+                message = "Include '%s' has not been defined." % node.include_name
+                self.error(pad, out, repr(message))
+                return
+            if node.strict is not None:
+                strict = repr(node.strict)
+            inc = self.function("inc", node.include_name, node.include_name)
+            self.errors(pad, out, f"{inc}({value}, {self.path_tuple(path)}, {strict})")
+
+        elif isinstance(node, (Map, ListValidator)):
+            # Schema._validate_map_list
+            if not node.validators:
+                lines.append(f"{pad}pass")
+                return
+            key, item = self.var("i"), self.var()
+            if isinstance(node, Map):
+                lines.append(f"{pad}for {key} in {value}.keys():")
+                lines.append(f"{pad}    {item} = {value}[{key}]")
+            else:
+                lines.append(f"{pad}for {key}, {item} in enumerate({value}):")
+            self.emit_alternatives(
+                node.validators, item, path + key, strict, out, indent + 1
+            )
+
+        elif isinstance(node, Any):
+            # Schema._validate_any
+            if not node.validators:
+                lines.append(f"{pad}pass")
+                return
+            self.emit_alternatives(node.validators, value, path, strict, out, indent)
+
+        else:
+            self.errors(
+                pad,
+                out,
+                f"SCHEMA._validate_subset({self.const(node)}, "
+                f"{value}, DataPath(*{self.path_tuple(path)}), {strict})",
+                generated=False,
+            )
+
+    def emit_alternatives(self, validators, value, path, strict, out, indent):
+        """Errors of all validators if none of them is valid"""
+        pad = "    " * indent
+        if len(validators) == 1:
+            self.emit(validators[0], value, path, strict, out, indent)
+            return
+        if self.check:
+            # valid if any alternative is, each checked by a function of its own
+            calls = " or ".join(
+                f"{self.function('alt', validator, 'alt')}({value}, (), {strict})"
+                for validator in validators
+            )
+            self.lines.append(f"{pad}if not ({calls}):")
+            self.lines.append(f"{pad}    return False")
+            return
+        alternatives = [self.var("a") for _ in validators]
+        for validator, errors in zip(validators, alternatives):
+            self.lines.append(f"{pad}{errors} = []")
+            self.emit(validator, value, path, strict, errors, indent)
+            self.lines.append(f"{pad}if {errors}:")
+            indent += 1
+            pad = "    " * indent
+        self.lines.append(f"{pad}{out}.extend({' + '.join(alternatives)})")
+
+    def fast_check(self, node: Validator, value) -> str:
+        """
+        Expression which is only true if node.validate(value) returns no
+        errors, "False" if the validator must always be run
+        """
+        cls = type(node)
+        if cls.validate is not Validator.validate:
+            return "False"
+        active = [c for c in node._constraints_inst if c.is_active]
+        checks = []
+        if isinstance(node, (Include, Any)) and cls._is_valid in (
+            Include._is_valid,
+            Any._is_valid,
+        ):
+            checks.append("True")
+        elif cls._is_valid is String._is_valid:
+            checks.append(f"isinstance({value}, str)")
+        elif cls._is_valid is Number._is_valid:
+            checks.append(f"(type({value}) is float or type({value}) is int)")
+        elif cls._is_valid is Integer._is_valid:
+            checks.append(f"type({value}) is int")
+        elif cls._is_valid is Boolean._is_valid:
+            checks.append(f"({value} is True or {value} is False)")
+        elif cls._is_valid is Enum._is_valid:
+            checks.append(f"{value} in {self.const(node.enums)}")
+        elif cls._is_valid is Day._is_valid:
+            checks.append(f"isinstance({value}, date)")
+        elif cls._is_valid is ListValidator._is_valid:
+            checks.append(f"type({value}) is list")
+        elif cls._is_valid is Map._is_valid:
+            checks.append(f"type({value}) is dict")
+        elif not active:
+            return f"{self.const(node)}._is_valid({value})"
+        else:
+            return "False"
+
+        for constraint in active:
+            name = type(constraint).__name__
+            if name == "Min" and cls._is_valid in (Number._is_valid, Integer._is_valid):
+                checks.append(f"{self.const(constraint.min)} <= {value}")
+            elif name == "Max" and cls._is_valid in (
+                Number._is_valid,
+                Integer._is_valid,
+            ):
+                checks.append(f"{self.const(constraint.max)} >= {value}")
+            elif name == "LengthMin":
+                checks.append(f"{constraint.min!r} <= len({value})")
+            elif name == "LengthMax":
+                checks.append(f"{constraint.max!r} >= len({value})")
+            elif name == "StringEquals" and not constraint.ignore_case:
+                if constraint.equals is not None:
+                    checks.append(f"{value} == {constraint.equals!r}")
+            else:
+                return "False"
+        return " and ".join(checks)
+
+
+class CompiledSchema:
+    """
+    Validates data like Schema.validate(data, name, strict).errors, using
+    Python code generated for the schema
+    """
+
+    def __init__(self, schema: yamale.schema.Schema, cache_dir=CACHE_DIR):
+        """
+        The generated code is compiled once and its code object cached in
+        cache_dir keyed by a hash of the source, a cache_dir of None disables
+        the cache
+        """
+        self.schema = schema
+        self.cache_dir = cache_dir
+        self.source, self._validate = self._compile(check=False)
+        # compiled when is_valid is first called
+        self.check_source = None
+        self._check = None
+
+    def _compile(self, check: bool):
+        compiler = _Compiler(self.schema, check)
+        source = compiler.compile()
+        namespace = {
+            "Mapping": Mapping,
+            "DataPath": DataPath,
+            "date": date,
+            "SCHEMA": self.schema,
+            "_MISSING": _MISSING,
+            "_NO_SKIP": _NO_SKIP,
+            "_fmt": _fmt,
+            "value_valid": value_valid,
+        }
+        namespace.update(
+            (f"K{i}", constant) for i, constant in enumerate(compiler.constants)
+        )
+        exec(_load_code(source, self.cache_dir), namespace)
+        return source, namespace["validate"]
+
+    def validate(self, data, strict=True) -> List[str]:
+        return self._validate(data, (), strict)
+
+    def is_valid(self, data, strict=True) -> bool:
+        """
+        Same as not validate(data, strict), with code of its own returning at
+        the first error without formatting any error message
+        """
+        if self._check is None:
+            self.check_source, self._check = self._compile(check=True)
+        return self._check(data, (), strict)
+
+
+def _load_code(source: str, cache_dir: Optional[Path]):
+    """Compiles source, or loads its code object from the on disk cache"""
+    if cache_dir is None:
+        return compile(source, "<compiled schema>", "exec")
+    key = hashlib.sha256(importlib.util.MAGIC_NUMBER + source.encode()).hexdigest()
+    cache_file = Path(cache_dir) / f"compiled-{key}.marshal"
+    try:
+        return marshal.loads(cache_file.read_bytes())
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+        pass
+    code = compile(source, "<compiled schema>", "exec")
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile(dir=cache_file.parent, delete=False) as f:
+        marshal.dump(code, f)
+    os.replace(f.name, cache_file)
+    return code
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Generates the Python validation code of a Yamale schema"
+    )
+    parser.add_argument("schema_file", type=Path, help="Yamale schema file")
+    parser.add_argument(
+        "--includes",
+        nargs="+",
+        type=Path,
+        default=[],
+        help="Additional Yamale schema files to be used as includes",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    schema = load_schema(args.schema_file, *args.includes)
+    print(_Compiler(schema).compile())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+import dataclasses
+import hashlib
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from field_catalogue import Field, FieldCatalogue, iter_fields
+from unroll import YamaleTree
+
+ADDED = "added"
+REMOVED = "removed"
+RETYPED = "retyped"
+MULTIPLICITY = "multiplicity"
+REQUIRED = "required"
+CONSTRAINT = "constraint"
+ENUM = "enum"
+LINK = "link"
+VOCABULARY = "vocabulary"
+
+# constraints whose lower (min) or higher (max) values accept more records
+_LOWER_BOUNDS = {"min"}
+_UPPER_BOUNDS = {"max"}
+
+
+@dataclasses.dataclass
+class SchemaNode:
+    """
+    Node of the tree of field paths with the Merkle hash of its subtree. The
+    items of lists are the child '*' of the list, which has no field.
+    """
+
+    field: Optional[Field] = None
+    children: Dict[str, "SchemaNode"] = dataclasses.field(default_factory=dict)
+    digest: str = ""
+
+    def hash(self) -> str:
+        """Hashes the field and the (hashed) children of every subtree"""
+        digest = hashlib.sha1(_describe(self.field).encode())
+        for key, child in sorted(self.children.items()):
+            digest.update(f"\0{key}\0{child.hash()}".encode())
+        self.digest = digest.hexdigest()
+        return self.digest
+
+
+def _describe(field: Optional[Field]) -> str:
+    if field is None:
+        return ""
+    description = field.to_dict()
+    del description["path"]
+    return json.dumps(description, sort_keys=True, default=str)
+
+
+def schema_tree(fields: Iterable[Field]) -> SchemaNode:
+    """Merkle tree of the fields of a schema, e.g. of field_catalogue.iter_fields"""
+    root = SchemaNode()
+    for field in fields:
+        node = root
+        for key in field.path.split("."):
+            node = node.children.setdefault(key, SchemaNode())
+        node.field = field
+    root.hash()
+    return root
+
+
+def load_tree(path: Path, includes: Sequence[Path] = ()) -> SchemaNode:
+    """Merkle tree of a values-only schema file or of a field catalogue"""
+    path = Path(path)
+    if path.suffix in (".yaml", ".yml"):
+        tree = YamaleTree(path)
+        if includes:
+            tree.add_external_includes(*includes)
+        return schema_tree(iter_fields(tree))
+    return schema_tree(FieldCatalogue.load(path))
+
+
+@dataclasses.dataclass
+class Change:
+    path: str
+    kind: str
+    old: object = None
+    new: object = None
+    # whether records valid with the old schema may be invalid with the new one
+    breaking: bool = False
+
+    def to_dict(self) -> Dict:
+        return dataclasses.asdict(self)
+
+    def __str__(self) -> str:
+        mark = "!" if self.breaking else " "
+        if self.kind == ADDED:
+            return f"{mark} added   {self.path} ({self.new})"
+        if self.kind == REMOVED:
+            return f"{mark} removed {self.path} ({self.old})"
+        return f"{mark} {self.kind} {self.path}: {self.old} -> {self.new}"
+
+
+def _summary(node: SchemaNode) -> str:
+    if node.field is None:
+        return "items"
+    if node.field.required_when:
+        conditions = " or ".join(
+            ", ".join(f"{k}={v}" for k, v in condition.items())
+            for condition in node.field.required_when
+        )
+        return f"{node.field.type}, required when {conditions}"
+    required = "required" if node.field.required else "optional"
+    return f"{node.field.type}, {required}"
+
+
+def _required(field: Field):
+    """Whether a field is required, or the conditions under which it is"""
+    return field.required_when or field.required
+
+
+def _requires_more(old: Field, new: Field) -> bool:
+    """Whether new requires a field in records old does not require it in"""
+    if old.required:
+        return False
+    if new.required:
+        return True
+    return any(condition not in old.required_when for condition in new.required_when)
+
+
+class SchemaDiff:
+    """
+    Changes between the Merkle trees of two versions of a schema. Subtrees
+    with the same hash are skipped, so only the nodes on the paths to changes
+    are compared (their number is counted in compared). Added and removed
+    subtrees are reported by their root.
+    """
+
+    def __init__(self, old: SchemaNode, new: SchemaNode):
+        self.compared = 0
+        self.changes: List[Change] = list(self._diff(old, new, ()))
+
+    @property
+    def breaking(self) -> List[Change]:
+        return [change for change in self.changes if change.breaking]
+
+    def _diff(self, old: SchemaNode, new: SchemaNode, path) -> Iterator[Change]:
+        self.compared += 1
+        if old.digest == new.digest:
+            return
+        if old.field is not None and new.field is not None:
+            yield from _field_changes(old.field, new.field)
+        for key, child in old.children.items():
+            child_path = ".".join(path + (key,))
+            if key not in new.children:
+                yield Change(child_path, REMOVED, old=_summary(child), breaking=True)
+            else:
+                yield from self._diff(child, new.children[key], path + (key,))
+        for key, child in new.children.items():
+            if key not in old.children:
+                # required fields of maps already in records break them
+                yield Change(
+                    ".".join(path + (key,)),
+                    ADDED,
+                    new=_summary(child),
+                    breaking=child.field is not None
+                    and bool(child.field.required or child.field.required_when)
+                    and key != "*",
+                )
+
+
+def _field_changes(old: Field, new: Field) -> Iterator[Change]:
+    path = new.path
+    if (old.type, old.item_types) != (new.type, new.item_types):
+        yield Change(
+            path,
+            RETYPED,
+            _type_name(old),
+            _type_name(new),
+            breaking=True,
+        )
+    if old.multiplicity != new.multiplicity:
+        yield Change(path, MULTIPLICITY, old.multiplicity, new.multiplicity, True)
+    if _required(old) != _required(new):
+        yield Change(
+            path, REQUIRED, _required(old), _required(new), _requires_more(old, new)
+        )
+    for name in old.constraints.keys() | new.constraints.keys():
+        before = old.constraints.get(name)
+        after = new.constraints.get(name)
+        if before != after:
+            yield Change(
+                f"{path}:{name}",
+                CONSTRAINT,
+                before,
+                after,
+                _constraint_breaks(name, before, after),
+            )
+    if old.enum != new.enum:
+        yield Change(path, ENUM, old.enum, new.enum, not set(old.enum) <= set(new.enum))
+    if old.link_target != new.link_target:
+        yield Change(path, LINK, old.link_target, new.link_target, True)
+    if old.vocabulary != new.vocabulary:
+        yield Change(path, VOCABULARY, old.vocabulary, new.vocabulary, True)
+
+
+def _type_name(field: Field) -> str:
+    if field.item_types:
+        return f"{field.type}({', '.join(field.item_types)})"
+    return field.type
+
+
+def _constraint_breaks(name: str, before, after) -> bool:
+    """Whether changing a constraint may reject records it accepted before"""
+    if after is None:
+        return False
+    if before is None:
+        return True
+    try:
+        if name in _LOWER_BOUNDS:
+            return after > before
+        if name in _UPPER_BOUNDS:
+            return after < before
+    except TypeError:
+        pass
+    return True
+
+
+def diff_schemas(
+    old: Path,
+    new: Path,
+    old_includes: Sequence[Path] = (),
+    new_includes: Sequence[Path] = (),
+) -> SchemaDiff:
+    """Changes between two schema files or field catalogues"""
+    return SchemaDiff(load_tree(old, old_includes), load_tree(new, new_includes))
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="List the changes between two versions of a values-only "
+        "schema and flag the ones that can break existing records. The exit code "
+        "is 1 if there are breaking changes."
+    )
+    parser.add_argument(
+        "old",
+        type=Path,
+        help="Old values-only schema file, or its field catalogue "
+        "(.fields.jsonl, .fields.sqlite)",
+    )
+    parser.add_argument("new", type=Path, help="New schema file or field catalogue")
+    parser.add_argument(
+        "--includes",
+        action="append",
+        type=Path,
+        default=[],
+        help="Schema file defining includes of the new schema (and of the old "
+        "one, unless --old-includes is given), can be repeated",
+    )
+    parser.add_argument(
+        "--old-includes",
+        action="append",
+        type=Path,
+        default=None,
+        help="Schema file defining includes of the old schema, can be repeated",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the changes as JSON")
+    return parser
+
+
+def main():
+    parser = _mk_arg_parser()
+    args = parser.parse_args()
+    old_includes = args.includes if args.old_includes is None else args.old_includes
+    try:
+        schema_diff = diff_schemas(args.old, args.new, old_includes, args.includes)
+    except ValueError as e:
+        # e.g. an include defined in a file not given with --includes
+        parser.error(str(e))
+    if args.json:
+        json.dump(
+            [change.to_dict() for change in schema_diff.changes],
+            sys.stdout,
+            indent=2,
+            default=str,
+        )
+        print()
+    else:
+        for change in schema_diff.changes:
+            print(change)
+        print(
+            f"{len(schema_diff.changes)} changes, "
+            f"{len(schema_diff.breaking)} breaking",
+            file=sys.stderr,
+        )
+    sys.exit(1 if schema_diff.breaking else 0)
+
+
+if __name__ == "__main__":
+    main()
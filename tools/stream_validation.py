@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterator, TextIO, Tuple
+
+from validate_examples import (
+    PATH_TO_SCHEMAS,
+    record_from_json,
+    validate_record,
+    validation_schemas,
+)
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_values(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """
+    Yields the values of a stream of JSON values one at a time, without
+    reading the whole stream. The values may be separated by whitespace, e.g.
+    JSON Lines, and the items of top level arrays, e.g. an Invenio fixture, are
+    yielded instead of the arrays. Only the chunk and the value being decoded
+    are kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array = False
+    read_size = chunk_size
+
+    while True:
+        # skip whitespace and the separators of array items
+        while pos < len(buffer) and (
+            buffer[pos] in _WHITESPACE or (in_array and buffer[pos] == ",")
+        ):
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                if in_array:
+                    raise ValueError("Unterminated JSON array")
+                return
+            buffer = f.read(read_size)
+            pos = 0
+            eof = not buffer
+            continue
+
+        if buffer[pos] == "[" and not in_array:
+            in_array = True
+            pos += 1
+            continue
+        if buffer[pos] == "]" and in_array:
+            in_array = False
+            pos += 1
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        # a value ending with the buffer (e.g. a number) may continue after it
+        if end is None or (end == len(buffer) and not eof):
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            # large values are read in growing chunks to decode them few times
+            read_size *= 2
+            continue
+
+        yield value
+        # the buffer is only sliced when the next chunk is read
+        pos = end
+        read_size = chunk_size
+
+
+def iter_records(f: TextIO) -> Iterator:
+    """Yields the records of JSON Lines or a fixture, {"metadata": ...} is unwrapped"""
+    for value in iter_json_values(f):
+        if isinstance(value, dict) and "metadata" in value:
+            yield value["metadata"]
+        else:
+            yield value
+
+
+def validate_stream(
+    f: TextIO, out: TextIO, schemas: Dict, name: str = ""
+) -> Tuple[int, int]:
+    """
+    Validates the records of f as they are read, in their YAML form (see
+    validate_examples.record_from_json), and writes a JSON line with the
+    errors of every record to out. Returns the number of records and of
+    invalid records.
+    """
+    n_records = 0
+    n_failed = 0
+    for i, record in enumerate(iter_records(f)):
+        errors = validate_record(record_from_json(record, schemas), schemas)
+        n_records += 1
+        n_failed += bool(errors)
+        result = {"file": name, "index": i, "valid": not errors, "errors": errors}
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return n_records, n_failed
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Validate the records of JSON Lines files or Invenio fixtures "
+        "(JSON arrays) while streaming them, and write the results as JSON Lines"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="JSON Lines or fixture files, - for stdin"
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="File the results are written to (default: stdout)",
+    )
+    parser.add_argument(
+        "--schema-folder",
+        type=Path,
+        default=PATH_TO_SCHEMAS,
+        help="Folder containing the values-only technique schemas",
+    )
+    parser.add_argument(
+        "--vocabularies",
+        type=Path,
+        default=None,
+        help="Folder of vocabulary fixtures whose ids the vocabulary items of the "
+        "records must be in",
+    )
+    parser.add_argument(
+        "--interpreted",
+        action="store_true",
+        help="Validate with the Yamale interpreter instead of compiled schemas",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    schemas = validation_schemas(
+        args.schema_folder, args.vocabularies, not args.interpreted
+    )
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    n_records = 0
+    n_failed = 0
+    start = perf_counter()
+    try:
+        for name in args.inputs:
+            f = sys.stdin if name == "-" else open(name, encoding="utf-8")
+            try:
+                n, failed = validate_stream(f, out, schemas, name)
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+            n_records += n
+            n_failed += failed
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = perf_counter() - start
+
+    print(
+        f"{n_records} records validated in {elapsed:.2f} s: "
+        f"{n_records - n_failed} passed, {n_failed} failed",
+        file=sys.stderr,
+    )
+    sys.exit(1 if n_failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Optional
+
+import pytest
+import yamale
+
+# the tools are scripts importing each other as top level modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# includes of shapes, chosen by their type, and of polygons, chosen by their
+# kind in a choose nested in the first one
+SHAPES = """
+Shape: choose(include('Shape_base'), Circle=include('Circle'), Polygon=include('Polygon'))
+Shape_base:
+    name: str()
+    type: enum('Circle', 'Polygon')
+Circle:
+    radius: num()
+    center: include('Point', required=False, strict=False)
+    url: url(required=False)
+Point:
+    x: num()
+    y: num()
+Polygon: choose(include('Polygon_base'), type_field='kind', Regular_polygon=include('Regular'))
+Polygon_base:
+    kind: enum('Regular polygon')
+Regular:
+    sides: int(min=3)
+"""
+
+
+@pytest.fixture(scope="session")
+def shape_schema():
+    """
+    Factory of bound schemas of a root document using the SHAPES includes,
+    with the validators of a custom_validators module, the top level one
+    unless the tools are imported as a package
+    """
+
+    def build(root: str, module: Optional[ModuleType] = None):
+        if module is None:
+            import custom_validators as module
+        schema = yamale.make_schema(
+            validators=module.extend_validators, content=f"{root}\n---{SHAPES}"
+        )
+        module.bind_schema(schema)
+        return schema
+
+    return build
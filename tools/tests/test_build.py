@@ -0,0 +1,113 @@
+import shutil
+from pathlib import Path
+
+from build import (
+    BLOCKED,
+    EXAMPLES,
+    FAILED,
+    RAN,
+    TECHNIQUES,
+    UP_TO_DATE,
+    Step,
+    build,
+    dependencies,
+    pipeline,
+)
+
+
+def upper(source: Path, target: Path) -> None:
+    target.write_text(source.read_text().upper())
+
+
+def fail() -> None:
+    raise RuntimeError("step failed")
+
+
+def steps(tmp_path):
+    a, b, c, d = (tmp_path / name for name in "abcd")
+    return [
+        Step("upper_a", upper, (a, b), [a], [b]),
+        Step("upper_b", upper, (b, c), [b], [c]),
+        Step("upper_d", upper, (d, tmp_path / "e"), [d], [tmp_path / "e"]),
+    ]
+
+
+def statuses(results):
+    return {result.step: result.status for result in results}
+
+
+class TestBuild:
+    def test_incremental(self, tmp_path):
+        (tmp_path / "a").write_text("a")
+        (tmp_path / "d").write_text("d")
+        stamps = tmp_path / "stamps.json"
+        assert statuses(build(steps(tmp_path), 2, stamps_path=stamps)) == {
+            "upper_a": RAN,
+            "upper_b": RAN,
+            "upper_d": RAN,
+        }
+        assert (tmp_path / "c").read_text() == "A"
+
+        assert statuses(build(steps(tmp_path), 2, stamps_path=stamps)) == {
+            "upper_a": UP_TO_DATE,
+            "upper_b": UP_TO_DATE,
+            "upper_d": UP_TO_DATE,
+        }
+
+        # b is rebuilt with the same content, so c is not
+        (tmp_path / "a").write_text("A")
+        assert statuses(build(steps(tmp_path), 2, stamps_path=stamps)) == {
+            "upper_a": RAN,
+            "upper_b": UP_TO_DATE,
+            "upper_d": UP_TO_DATE,
+        }
+
+        # changed outputs are rebuilt
+        (tmp_path / "e").write_text("edited")
+        assert statuses(build(steps(tmp_path), 2, stamps_path=stamps))["upper_d"] == RAN
+        assert (tmp_path / "e").read_text() == "D"
+
+        assert set(
+            statuses(build(steps(tmp_path), 2, force=True, stamps_path=stamps)).values()
+        ) == {RAN}
+
+    def test_failure(self, tmp_path):
+        (tmp_path / "a").write_text("a")
+        (tmp_path / "d").write_text("d")
+        failing = steps(tmp_path)
+        failing[0] = Step("upper_a", fail, (), [tmp_path / "a"], [tmp_path / "b"])
+        results = build(failing, 2, stamps_path=tmp_path / "stamps.json")
+        assert statuses(results) == {
+            "upper_a": FAILED,
+            "upper_b": BLOCKED,
+            "upper_d": RAN,
+        }
+        assert "step failed" in results[0].error
+
+    def test_pipeline(self):
+        depends_on = dependencies(pipeline())
+        assert depends_on["unroll"] == ["values_only"]
+        assert depends_on["validate_examples"] == ["values_only"]
+        # the oarepo models are converted from the main models
+        assert depends_on["oarepo_bli"] == []
+        assert depends_on["mapping_budget"] == [
+            "oarepo_bli",
+            "oarepo_itc",
+            "oarepo_mst",
+            "oarepo_spr",
+        ]
+
+    def test_pipeline_paths(self, tmp_path, monkeypatch):
+        examples = tmp_path / "examples"
+        examples.mkdir()
+        for technique in TECHNIQUES:
+            shutil.copy(EXAMPLES / f"{technique}.yaml", examples)
+        # the steps do not depend on the current directory
+        monkeypatch.chdir(tmp_path)
+        (step,) = [step for step in pipeline() if step.name == "validate_examples"]
+        step.action(step.args[0], examples)
+        for technique in TECHNIQUES:
+            json_file = f"{technique}.json"
+            assert (examples / json_file).read_text() == (
+                EXAMPLES / json_file
+            ).read_text()
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+
+from validate_examples import load_records, technique_schemas, validate_record
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+
+def make_records():
+    """Valid and invalid records of every technique, invalid ones fail in choose nodes"""
+    records = []
+    for technique in ("BLI", "ITC", "MST", "SPR"):
+        record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+        records.append(record)
+        invalid = deepcopy(record)
+        for entity in invalid["general_parameters"]["entities_of_interest"]:
+            entity[f"{technique}_field"] = None
+        records.append(invalid)
+    return records * 25
+
+
+SCHEMAS_BY_TECHNIQUE = technique_schemas(SCHEMAS)
+RECORDS = make_records()
+
+
+class TestConcurrentValidation:
+    schemas = SCHEMAS_BY_TECHNIQUE
+    records = RECORDS
+    expected = [validate_record(record, SCHEMAS_BY_TECHNIQUE) for record in RECORDS]
+
+    def test_expected(self):
+        assert self.expected[0] == []
+        assert any("BLI_field: Unexpected element" in e for e in self.expected[1])
+
+    def test_thread_pool(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(
+                pool.map(lambda r: validate_record(r, self.schemas), self.records)
+            )
+        assert results == self.expected
+
+    def test_asyncio(self):
+        async def validate_all():
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                return await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            pool, validate_record, record, self.schemas
+                        )
+                        for record in self.records
+                    )
+                )
+
+        assert asyncio.run(validate_all()) == self.expected
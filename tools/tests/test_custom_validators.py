@@ -1,5 +1,12 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
 import yamale
+from yamale.validators import Include
 
+from tools import custom_validators
 from tools.custom_validators import (
     Choose,
     Link,
@@ -8,6 +15,8 @@ from tools.custom_validators import (
     Uuid,
     Vocabulary,
     extend_validators,
+    is_valid,
+    value_valid,
 )
 
 
@@ -181,23 +190,26 @@ class TestUrl:
 
 
 class TestChoose:
-    yamale_schema = """                                        
+    yamale_schema = """
+root: include('Base_test')
+---
 Base_test:
     name: str()
-    type: enum('Case 1', 'Case 2')                        
-Case_1:  
+    type: enum('Case 1', 'Case 2')
+Case_1:
     test_1: int()
 Case_2:
-    test_2: num()   
+    test_2: num()
 """
     test_schema = yamale.make_schema(
         validators=extend_validators, content=yamale_schema
     )
 
-    base_schema = test_schema.dict["Base_test"]
-    case_1 = test_schema.dict["Case_1"]
-    case_2 = test_schema.dict["Case_2"]
+    base_schema = Include("Base_test")
+    case_1 = Include("Case_1")
+    case_2 = Include("Case_2")
     validator = Choose(base_schema=base_schema, Case_1=case_1, Case_2=case_2)
+    validator.schema = test_schema
 
     valid_choose = [
         {"name": "test", "type": "Case 1", "test_1": 1},
@@ -221,3 +233,91 @@ Case_2:
     def test_invalid_choose(self):
         for invalid in self.invalid_choose:
             assert not self.validator._is_valid(invalid)
+
+
+class TestChooseSinglePass:
+    @pytest.fixture(autouse=True, scope="class")
+    def _schema(self, request, shape_schema):
+        request.cls.schema = shape_schema(
+            "root: list(include('Shape'))", custom_validators
+        )
+
+    def validate(self, *shapes):
+        return self.schema.validate({"root": list(shapes)}, "", True).errors
+
+    def test_valid(self):
+        assert (
+            self.validate(
+                {"name": "a", "type": "Circle", "radius": 1.5},
+                {"name": "b", "type": "Polygon", "kind": "Regular polygon", "sides": 4},
+            )
+            == []
+        )
+
+    def test_invalid(self):
+        assert self.validate({"name": "a", "type": "Circle", "radius": "x"}) == [
+            "root.0: radius: 'x' is not a num."
+        ]
+        assert self.validate({"name": "a", "type": "Circle", "sides": 1}) == [
+            "root.0: sides: Unexpected element\nradius: Required field missing"
+        ]
+        assert self.validate(
+            {"name": "b", "type": "Polygon", "kind": "Regular polygon", "sides": 2}
+        ) == ["root.0: : sides: 2 is less than 3"]
+
+    def test_fail_matches_validate(self):
+        shape = {"type": "Circle", "radius": 1}
+        choose = self.schema.includes["Shape"]._schema
+        assert not choose.is_valid(shape)
+        assert choose.validate(shape) == [choose.fail(shape)]
+        assert choose.fail(shape) == "name: Required field missing"
+
+    def test_detailed_schema_read_only(self):
+        choose = self.schema.includes["Polygon"]._schema
+        by_type = dict(choose._detailed_by_type)
+        # a spelling resolved by get_detailed_type is not added to the lookup
+        value = {"kind": "Regular (polygon)"}
+        assert (
+            choose.get_detailed_schema(value)
+            is choose.detailed_schemas["Regular_polygon"]
+        )
+        assert choose.get_detailed_schema({"kind": "Square"}) is None
+        assert choose._detailed_by_type == by_type
+
+
+class TestIsValid:
+    _schema = TestChooseSinglePass._schema
+    shapes = [
+        {"name": "a", "type": "Circle", "radius": 1.5},
+        {"name": "b", "type": "Polygon", "kind": "Regular polygon", "sides": 4},
+        {"name": "a", "type": "Circle", "radius": "x"},
+        {"name": "a", "type": "Circle", "sides": 1},
+        {"name": "b", "type": "Polygon", "kind": "Regular polygon", "sides": 2},
+        {"type": "Circle", "radius": 1},
+        {"name": "c", "type": "Triangle"},
+        "not a shape",
+    ]
+
+    def test_value_valid(self):
+        validator = self.schema.includes["Regular"]._schema["sides"]
+        assert value_valid(validator, 3)
+        assert not value_valid(validator, 2)
+        assert not value_valid(validator, "3")
+
+    def test_same_as_validate(self):
+        for shape in self.shapes:
+            data = {"root": [shape]}
+            expected = self.schema.validate(data, "", True).errors == []
+            assert is_valid(self.schema, data) == expected
+        assert not is_valid(self.schema, {"root": [], "extra": 1})
+        assert is_valid(self.schema, {"root": [], "extra": 1}, strict=False)
+
+
+class TestImport:
+    def test_package_import(self):
+        # without the tools folder on sys.path, as a script importing the repo
+        subprocess.run(
+            [sys.executable, "-c", "import tools.custom_validators"],
+            cwd=Path(__file__).parent.parent.parent,
+            check=True,
+        )
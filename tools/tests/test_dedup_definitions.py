@@ -0,0 +1,127 @@
+from pathlib import Path
+
+from dedup_definitions import (
+    count_fields,
+    dedup_definitions,
+    dedup_outputs,
+    share_definitions,
+    split_reference,
+)
+from yamale2oarepo import convert_batch, share_include_definitions
+
+REPO = Path(__file__).parent.parent.parent
+MAIN = REPO / "models" / "main"
+GENERAL_PARAMETERS = MAIN / "general_parameters.yaml"
+
+
+def obj(**properties):
+    return {"properties": properties, "label.en": "Object"}
+
+
+def use(name, **extras):
+    return {**extras, "use": f"#/$defs/{name}"}
+
+
+NAME = {"type": "keyword", "label.en": "Name"}
+
+DEFS = {
+    "Chemical": obj(name=NAME, constituent=use("Constituent")),
+    "EntityChemicalPolymorphic": obj(name=NAME, constituent=use("Constituent")),
+    # identical to the above once their Constituents are merged
+    "ConstituentChemicalPolymorphic": obj(name=NAME, constituent=use("Other")),
+    "Constituent": obj(name=NAME),
+    "Other": obj(name=NAME),
+    # the same properties in another order
+    "Reordered": {"label.en": "Object", "properties": {"name": NAME}},
+    # using each other
+    "A": obj(next=use("B")),
+    "B": obj(next=use("A")),
+    "C": obj(next=use("C")),
+}
+
+
+class TestDedupDefinitions:
+    def test_merged(self):
+        metadata = {"entity": use("EntityChemicalPolymorphic", required=True)}
+        defs, (new_metadata,), report = dedup_definitions(DEFS, metadata, package="bli")
+        assert report.merged == {
+            "EntityChemicalPolymorphic": "Chemical",
+            "ConstituentChemicalPolymorphic": "Chemical",
+            "Other": "Constituent",
+            "B": "A",
+            "C": "A",
+        }
+        assert list(defs) == ["Chemical", "Constituent", "Reordered", "A"]
+        assert defs["A"] == obj(next=use("A"))
+        assert new_metadata == {"entity": use("Chemical", required=True)}
+        assert report.fields_removed == 2 + 2 + 1 + 1 + 1
+        assert str(report) == "bli: 5 of 9 definitions and 7 mapping fields removed"
+        # the input is not changed
+        assert DEFS["ConstituentChemicalPolymorphic"]["properties"]["constituent"] == (
+            use("Other")
+        )
+
+    def test_count_fields(self):
+        assert count_fields(obj(a=NAME, b=obj(c=NAME, d=NAME))) == 4
+        assert count_fields({"items": obj(a=NAME), "x": [obj(b=NAME)]}) == 2
+
+    def test_models(self):
+        out = convert_batch([GENERAL_PARAMETERS, MAIN / "BLI.yaml"], GENERAL_PARAMETERS)
+        deduplicated, reports = dedup_outputs(out)
+        assert [report.package for report in reports] == ["general_parameters", "bli"]
+        # every polymorphic copy has the base schema fields of its parent
+        assert all(not report.merged for report in reports)
+        assert deduplicated == out
+
+
+class TestShareDefinitions:
+    def test_shared(self):
+        shared = {
+            "Constituent": obj(name=NAME),
+            "Chemical": obj(name=NAME, constituent=use("Constituent")),
+            # differs in the package, so does Entity using it
+            "Polymorphic": obj(name=NAME),
+            "Entity": obj(polymorphic=use("Polymorphic")),
+        }
+        defs = {
+            **shared,
+            "Polymorphic": obj(name=NAME, base=NAME),
+            "Specific": obj(chemical=use("Chemical"), entity=use("Entity")),
+        }
+        metadata = {"general": use("Chemical"), "specific": use("Specific")}
+        new_defs, (new_metadata,), report = share_definitions(
+            defs, shared, "general-definitions.yaml", metadata, package="bli"
+        )
+        assert report.shared == ["Constituent", "Chemical"]
+        assert list(new_defs) == ["Polymorphic", "Entity", "Specific"]
+        assert new_defs["Specific"] == obj(
+            chemical={"use": "general-definitions.yaml#/$defs/Chemical"},
+            entity=use("Entity"),
+        )
+        assert new_metadata == {
+            "general": {"use": "general-definitions.yaml#/$defs/Chemical"},
+            "specific": use("Specific"),
+        }
+        assert str(report) == (
+            "bli: 2 of 5 definitions shared with general-definitions.yaml"
+        )
+
+    def test_split_reference(self):
+        assert split_reference("#/$defs/A") == ("", "A")
+        assert split_reference("general.yaml#/$defs/A") == ("general.yaml", "A")
+        assert split_reference("#/properties/a") is None
+        assert split_reference(None) is None
+
+    def test_models(self):
+        inputs = [GENERAL_PARAMETERS, MAIN / "BLI.yaml", MAIN / "MST.yaml"]
+        out = convert_batch(inputs, GENERAL_PARAMETERS)
+        shared, reports = share_include_definitions(out, GENERAL_PARAMETERS)
+        general = out[0][0]
+        for report, (defs, name, package) in zip(reports, shared[1::2]):
+            assert (name, package) == ("definitions", report.package)
+            assert report.shared == list(general)
+            assert not set(defs) & set(general)
+        assert shared[0] == out[0]
+        assert shared[2][0]["general_parameters"]["use"] == (
+            "general_parameters-definitions.yaml#/$defs/General_parameters"
+        )
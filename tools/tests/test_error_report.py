@@ -0,0 +1,140 @@
+from copy import deepcopy
+from pathlib import Path
+
+import pytest
+import yamale
+from test_schema_compiler import mutated_records
+
+from error_report import (
+    BROKEN_LINK,
+    INVALID,
+    NOT_A_MAP,
+    RECORD,
+    REQUIRED,
+    UNEXPECTED,
+    build_report,
+    collect_batch,
+    collect_errors,
+    collect_record_errors,
+)
+from link_index import build_link_index
+from validate_examples import (
+    find_technique,
+    load_records,
+    technique_schemas,
+    validate_record,
+)
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+SCHEMAS_BY_TECHNIQUE = technique_schemas(SCHEMAS)
+ENTITIES = ("general_parameters", "entities_of_interest")
+
+
+@pytest.fixture
+def record():
+    return deepcopy(load_records(EXAMPLES / "BLI.yaml")[0])
+
+
+class TestCollectErrors:
+    @pytest.mark.parametrize("technique", SCHEMAS_BY_TECHNIQUE)
+    def test_examples(self, technique):
+        record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+        assert collect_record_errors(record, SCHEMAS_BY_TECHNIQUE) == []
+
+    def test_all_errors_of_polymorphic_node(self, record):
+        entity = record["general_parameters"]["entities_of_interest"][0]
+        del entity["name"]
+        entity["storage"] = "x"
+        entity["unexpected"] = 1
+
+        # the interpreter stops at the missing field of the base schema
+        assert len(validate_record(record, SCHEMAS_BY_TECHNIQUE)) == 1
+        errors = collect_record_errors(record, SCHEMAS_BY_TECHNIQUE)
+        assert {(e.path, e.kind) for e in errors} == {
+            (ENTITIES + (0, "name"), REQUIRED),
+            (ENTITIES + (0, "storage"), NOT_A_MAP),
+            (ENTITIES + (0, "unexpected"), UNEXPECTED),
+        }
+        assert str(errors[0]) == (
+            "general_parameters.entities_of_interest.0.name: Required field missing"
+        )
+
+    def test_unknown_type(self, record):
+        entities = record["general_parameters"]["entities_of_interest"]
+        entities[1]["type"] = "Nonsense"
+        entities.append({"id": "new"})
+        errors = collect_record_errors(record, SCHEMAS_BY_TECHNIQUE)
+        # the missing and invalid type fields are reported once each
+        assert [(e.path, e.kind, e.validator) for e in errors] == [
+            (ENTITIES + (1, "type"), INVALID, "enum"),
+            (ENTITIES + (3, "name"), REQUIRED, "str"),
+            (ENTITIES + (3, "type"), REQUIRED, "enum"),
+        ]
+
+    def test_broken_link(self, record):
+        entity = record["general_parameters"]["entities_of_interest"][0]
+        entity["id"] = "renamed"
+        errors = collect_record_errors(record, SCHEMAS_BY_TECHNIQUE)
+        assert errors and all(e.kind == BROKEN_LINK for e in errors)
+        schema = SCHEMAS_BY_TECHNIQUE[find_technique(record)]
+        assert [str(e) for e in errors] == build_link_index(schema, record).errors()
+
+    def test_subset(self):
+        schema = yamale.make_schema(
+            content="things: subset(include('thing'))\n---\nthing:\n  a: int()\n"
+        )
+        errors = collect_errors(schema, {"things": [{"a": 1}, {"a": "x"}]})
+        # the error keeps the path within the item, like the interpreter
+        assert [(e.path, e.kind, e.validator) for e in errors] == [
+            (("things", "a"), INVALID, "int")
+        ]
+        assert str(errors[0]) == "things.a: 'x' is not a int."
+
+    def test_no_technique(self):
+        (error,) = collect_record_errors({}, SCHEMAS_BY_TECHNIQUE)
+        assert error.kind == RECORD
+
+    def test_same_validity_as_validate_record(self):
+        for technique in SCHEMAS_BY_TECHNIQUE:
+            record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+            for mutated in mutated_records(record, 50, seed=4):
+                assert bool(collect_record_errors(mutated, SCHEMAS_BY_TECHNIQUE)) == (
+                    bool(validate_record(mutated, SCHEMAS_BY_TECHNIQUE))
+                )
+
+
+class TestReport:
+    def test_report(self, record):
+        entities = record["general_parameters"]["entities_of_interest"]
+        for entity in entities:
+            del entity["name"]
+        results = list(collect_batch([EXAMPLES / "MST.yaml"], SCHEMAS, workers=0))
+        # JSON fixtures are collected in their YAML form
+        assert list(collect_batch([EXAMPLES / "MST.json"], SCHEMAS, workers=0)) == [
+            (str(EXAMPLES / "MST.json"), [])
+        ]
+        results.append(("broken", collect_record_errors(record, SCHEMAS_BY_TECHNIQUE)))
+
+        report = build_report(results)
+        assert report["records"] == 2
+        assert report["invalid_records"] == 1
+        assert report["errors"] == len(entities)
+        assert report["by_kind"] == {REQUIRED: len(entities)}
+        assert report["by_path"] == {
+            "general_parameters.entities_of_interest.*.name": {REQUIRED: len(entities)}
+        }
+        assert report["invalid"]["broken"][0] == {
+            "path": "general_parameters.entities_of_interest.0.name",
+            "kind": REQUIRED,
+            "validator": "str",
+            "message": "Required field missing",
+        }
+
+    def test_unreadable_file(self, tmp_path):
+        path = tmp_path / "record.yaml"
+        path.write_text("a: [")
+        ((name, (error,)),) = collect_batch([path], SCHEMAS, workers=0)
+        assert name == str(path) and error.kind == RECORD
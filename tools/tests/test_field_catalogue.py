@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import pytest
+
+from field_catalogue import (
+    FieldCatalogue,
+    iter_fields,
+    read_jsonl,
+    read_sqlite,
+    write_jsonl,
+    write_sqlite,
+)
+from unroll import YamaleTree
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+
+
+@pytest.fixture(scope="module")
+def fields():
+    tree = YamaleTree(SCHEMAS / "BLI.yaml")
+    tree.add_external_includes(SCHEMAS / "general_parameters.yaml")
+    return list(iter_fields(tree))
+
+
+@pytest.fixture(scope="module")
+def catalogue(fields):
+    return FieldCatalogue(fields)
+
+
+class TestFieldCatalogue:
+    def test_fields(self, catalogue):
+        measurements = catalogue["method_specific_parameters.measurements"]
+        assert measurements.type == "list"
+        assert measurements.multiplicity == "list"
+        assert measurements.item_types == ["map"]
+        assert measurements.constraints == {"min": 1}
+        # dropped by the expansion of YamaleTree.build
+        assert not catalogue[
+            "method_specific_parameters.measurements.*.sample.temperature"
+        ].required
+        assert catalogue[
+            "general_parameters.record_information.access_rights"
+        ].enum == [
+            "open access",
+            "embargoed access",
+            "restricted access",
+        ]
+        affiliations = catalogue["general_parameters.depositors.depositor.affiliations"]
+        assert affiliations.vocabulary == "affiliations"
+
+    def test_required_when(self, catalogue):
+        entities = "general_parameters.entities_of_interest.*."
+        # only required by the detailed schemas selected by these types
+        polymer_type = catalogue[entities + "polymer_type"]
+        assert not polymer_type.required
+        assert polymer_type.required_when == [{"type": "Polymer"}]
+        assert catalogue[entities + "molecular_weight"].required_when == [
+            {"type": "Polymer"},
+            {"type": "Molecular assembly"},
+        ]
+        # fields of the base schema are required whatever the type
+        assert catalogue[entities + "name"].required
+        assert catalogue[entities + "name"].required_when == []
+
+    def test_parents_first(self, fields):
+        seen = {""}
+        for field in fields:
+            # fields of list items have the list and '*' as parent
+            assert field.parent.removesuffix(".*") in seen
+            seen.add(field.path)
+        assert len(seen) == len(fields) + 1
+
+    def test_queries(self, catalogue):
+        under = catalogue.under("method_specific_parameters.measurements")
+        assert under
+        assert all(
+            f.path.startswith("method_specific_parameters.measurements.") for f in under
+        )
+        assert len(under) == sum(
+            f.path.startswith("method_specific_parameters.measurements.")
+            for f in catalogue
+        )
+        assert catalogue.under("method_specific_parameters.measure") == []
+
+        assert [f.path for f in catalogue.link_targets["bli-sensor"]] == [
+            "method_specific_parameters.sensors.*.id"
+        ]
+        assert [f.path for f in catalogue.links_to["bli-sensor"]] == [
+            "method_specific_parameters.measurements.*.sensor"
+        ]
+        link = catalogue["method_specific_parameters.data_analysis.*.measurements"]
+        assert link in catalogue.links and link.link_target == "bli-measurement"
+        assert all(f.enum for f in catalogue.enums)
+        assert catalogue.of_type("link_target") == [
+            f for f in catalogue if f.link_target_name is not None
+        ]
+        assert [
+            f.path for f in catalogue.children["general_parameters.depositors"]
+        ] == [
+            "general_parameters.depositors.depositor",
+            "general_parameters.depositors.principal_contact",
+            "general_parameters.depositors.contributors",
+        ]
+
+    @pytest.mark.parametrize(
+        "write, read, suffix",
+        [(write_jsonl, read_jsonl, "jsonl"), (write_sqlite, read_sqlite, "sqlite")],
+    )
+    def test_round_trip(self, fields, tmp_path, write, read, suffix):
+        path = tmp_path / f"BLI.fields.{suffix}"
+        assert write(iter(fields), path) == len(fields)
+        assert list(read(path)) == fields
+        assert len(FieldCatalogue.load(path)) == len(fields)
+
+    def test_include_cycle(self, tmp_path):
+        schema_file = tmp_path / "cycle.yaml"
+        schema_file.write_text(
+            "a: include('A')\n---\nA:\n  b: include('B')\nB:\n  a: list(include('A'))\n"
+        )
+        with pytest.raises(ValueError, match="A -> B -> A"):
+            list(iter_fields(YamaleTree(schema_file)))
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from audit_identifiers import iter_ids
+from custom_validators import Chemical_id, Database_id, Person_id, Publication_id
+from identifiers import check_id, check_ids
+
+VALID = [
+    "orcid:0000-0002-1825-0097",
+    "ORCID:0000-0002-1694-233X",
+    "cas:7732-18-5",
+    "cas:50-00-0",
+    "pccid:962",
+    "pcsid:12345",
+    "doi:10.1000/xyz123",
+    "isbn:978-0-306-40615-7",
+    "isbn:0-8044-2957-X",
+    "pdb:2HCO",
+    "pdb:pdb_00002hco",
+    "Uniprot:P69905",
+    "uniprot:A0A022YWF9",
+]
+INVALID = [
+    "orcid:0000-0002-1825-0096",  # check digit
+    "orcid:0000-0002-1825",
+    "cas:7732-18-4",  # check digit
+    "pccid:0",
+    "doi:11.1000/xyz",
+    "isbn:978-0-306-40615-6",  # check digit
+    "isbn:0-306-40615-3",
+    "pdb:0HCO",
+    "uniprot:p69905",
+    "orcid:0000-0002-1825-009١",  # non ASCII digit
+    "foo:1",
+    "0000-0002-1825-0097",
+    "",
+    5,
+    None,
+]
+
+
+class TestCheckId:
+    @pytest.mark.parametrize("value", VALID)
+    def test_valid(self, value):
+        assert check_id(value)
+
+    @pytest.mark.parametrize("value", INVALID)
+    def test_invalid(self, value):
+        assert not check_id(value)
+
+    def test_schemes(self):
+        assert check_id("doi:10.1000/xyz", ("doi", "isbn"))
+        assert not check_id("orcid:0000-0002-1825-0097", ("doi", "isbn"))
+
+    def test_bulk_same_as_single(self):
+        rng = random.Random(1)
+        values = VALID + INVALID
+        # ids with random digits, about one in ten has a valid check digit
+        for _ in range(2000):
+            digits = "".join(rng.choice("0123456789") for _ in range(16))
+            values.append(
+                rng.choice(
+                    [
+                        f"orcid:{digits[:4]}-{digits[4:8]}-{digits[8:12]}-{digits[12:]}",
+                        f"cas:{digits[:rng.randint(2, 7)]}-{digits[7:9]}-{digits[9]}",
+                        f"isbn:{digits[:10]}",
+                        f"isbn:978{digits[:10]}",
+                    ]
+                )
+            )
+        expected = [check_id(v) for v in values]
+        assert list(check_ids(values)) == expected
+        assert 0 < sum(expected) < len(values)
+        assert list(check_ids(values, ("cas",))) == [
+            check_id(v, ("cas",)) for v in values
+        ]
+        assert list(check_ids([])) == []
+
+    def test_iter_ids(self):
+        record = {
+            "a": ["orcid:0000-0002-1825-0097", "Tris:HCl"],
+            "b": {"c": "pdb:2HCO"},
+        }
+        assert list(iter_ids(record)) == ["orcid:0000-0002-1825-0097", "pdb:2HCO"]
+
+
+class TestIdentifierValidators:
+    def test_validators(self):
+        assert Person_id().is_valid("orcid:0000-0002-1825-0097")
+        assert not Person_id().is_valid("cas:7732-18-5")
+        assert Chemical_id().is_valid("cas:7732-18-5")
+        assert Database_id().is_valid("Uniprot:P69905")
+        assert Publication_id().is_valid("isbn:978-0-306-40615-7")
+        assert Person_id().validate("orcid:1") == [
+            "'orcid:1' is not a person_id (orcid: followed by a valid id)."
+        ]
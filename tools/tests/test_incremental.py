@@ -0,0 +1,87 @@
+from copy import copy
+from pathlib import Path
+
+from test_schema_compiler import mutated_records
+
+from incremental import IncrementalValidator
+from link_index import check_links
+from validate_examples import load_records, technique_schemas
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+SCHEMAS_BY_TECHNIQUE = technique_schemas(SCHEMAS)
+
+
+def full_validation(schema, record):
+    try:
+        return schema.validate(record, "", True).errors + check_links(schema, record)
+    except Exception as e:
+        return [f"{type(e).__name__}: {e}"]
+
+
+def edit_entity(record, **fields):
+    """Copy of record sharing all items but the first entity of interest"""
+    record = copy(record)
+    general_parameters = record["general_parameters"] = copy(
+        record["general_parameters"]
+    )
+    entities = general_parameters["entities_of_interest"] = copy(
+        general_parameters["entities_of_interest"]
+    )
+    entities[0] = {**entities[0], **fields}
+    return record
+
+
+class TestIncrementalValidator:
+    schema = SCHEMAS_BY_TECHNIQUE["BLI"]
+    record = load_records(EXAMPLES / "BLI.yaml")[0]
+
+    def test_unchanged(self):
+        validator = IncrementalValidator(self.schema)
+        assert validator.validate(self.record) == []
+        assert validator.computed > 0
+        assert validator.validate(copy(self.record)) == []
+        assert validator.computed == 0
+
+    def test_edit_in_choose(self):
+        validator = IncrementalValidator(self.schema)
+        validator.validate(self.record)
+        edited = edit_entity(self.record, unexpected=1)
+        errors = validator.validate(edited)
+        assert errors == full_validation(self.schema, edited)
+        assert len(errors) == 1
+        assert errors[0].startswith("general_parameters.entities_of_interest.0: ")
+        assert "unexpected: Unexpected element" in errors[0]
+        assert validator.reused > validator.computed
+        assert validator.validate(self.record, edited) == []
+
+    def test_previous_not_last(self):
+        validator = IncrementalValidator(self.schema)
+        validator.validate(self.record)
+        validator.validate(edit_entity(self.record, unexpected=1))
+        # the results kept for the last record are not reused for another one
+        unchanged = copy(self.record)
+        assert validator.validate(unchanged, previous=self.record) == []
+        assert validator.reused == 0
+        assert validator.validate(copy(unchanged)) == []
+        assert validator.computed == 0
+
+    def test_edit_link_target(self):
+        validator = IncrementalValidator(self.schema)
+        validator.validate(self.record)
+        edited = edit_entity(self.record, id="renamed")
+        errors = validator.validate(edited)
+        assert errors == full_validation(self.schema, edited)
+        assert any("does not reference the id" in e for e in errors)
+        assert validator.validate(self.record) == []
+
+    def test_same_errors_as_full_validation(self):
+        for technique, schema in SCHEMAS_BY_TECHNIQUE.items():
+            record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+            validator = IncrementalValidator(schema)
+            validator.validate(record)
+            for mutated in mutated_records(record, 50, seed=2):
+                # every mutation is diffed against the previous one
+                assert validator.validate(mutated) == full_validation(schema, mutated)
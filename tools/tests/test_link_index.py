@@ -0,0 +1,91 @@
+from copy import deepcopy
+from pathlib import Path
+
+from link_index import build_link_index, check_links
+from validate_examples import load_records, technique_schemas
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = technique_schemas(REPO / "models" / "values-only")
+EXAMPLES = REPO / "metadata-examples"
+
+
+def example(technique):
+    return load_records(EXAMPLES / f"{technique}.yaml")[0]
+
+
+class TestLinkIndex:
+    def test_examples(self):
+        for technique, schema in SCHEMAS.items():
+            assert check_links(schema, example(technique)) == []
+
+    def test_index(self):
+        index = build_link_index(SCHEMAS["BLI"], example("BLI"))
+        assert len(index.targets["bli-sensor"]) == 2
+        (sensor_id,) = [i for i, p in index.targets["bli-sensor"].items() if p[-2] == 0]
+        assert index.targets["bli-sensor"][sensor_id] == (
+            "method_specific_parameters",
+            "sensors",
+            0,
+            "id",
+        )
+        assert index.resolve("bli-sensor", sensor_id)
+        assert index.resolve("plate", sensor_id) is None
+
+    def test_broken_link(self):
+        record = example("BLI")
+        measurement = record["method_specific_parameters"]["measurements"][1]
+        measurement["sensor"]["$ref"] = "no-such-sensor"
+        assert check_links(SCHEMAS["BLI"], record) == [
+            "method_specific_parameters.measurements.1.sensor: Link to "
+            "'no-such-sensor' does not reference the id of a 'bli-sensor' link target"
+        ]
+
+    def test_link_to_target_of_other_name(self):
+        record = example("BLI")
+        entity_id = record["general_parameters"]["entities_of_interest"][0]["id"]
+        measurement = record["method_specific_parameters"]["measurements"][0]
+        measurement["sample"]["plate"] = {"$ref": entity_id}
+        errors = check_links(SCHEMAS["BLI"], record)
+        assert errors == [
+            "method_specific_parameters.measurements.0.sample.plate: Link to "
+            f"'{entity_id}' does not reference the id of a 'plate' link target"
+        ]
+
+    def test_nested_list_of_links(self):
+        record = example("SPR")
+        steps = record["method_specific_parameters"]["measurement_protocol"]
+        paths = [
+            (i, step["flow"]["path"])
+            for i, step in enumerate(steps)
+            if "flow" in step and "path" in step["flow"]
+        ]
+        i, path = paths[0]
+        path[-1][-1] = {"$ref": "nowhere"}
+        (error,) = check_links(SCHEMAS["SPR"], record)
+        j, k = len(path) - 1, len(path[-1]) - 1
+        assert error.startswith(
+            f"method_specific_parameters.measurement_protocol.{i}.flow.path.{j}.{k}: "
+        )
+
+    def test_duplicated_target(self):
+        record = example("BLI")
+        entities = record["general_parameters"]["entities_of_interest"]
+        entities[1]["id"] = entities[0]["id"]
+        errors = check_links(SCHEMAS["BLI"], record)
+        assert errors[0] == (
+            f"general_parameters.entities_of_interest.1.id: Duplicated id "
+            f"'{entities[0]['id']}' of link target 'entity', first declared at "
+            f"general_parameters.entities_of_interest.0.id"
+        )
+
+    def test_many_measurements(self):
+        record = example("BLI")
+        measurements = record["method_specific_parameters"]["measurements"]
+        template = measurements[0]
+        for i in range(5000):
+            measurement = deepcopy(template)
+            measurement["id"] = f"measurement-{i}"
+            measurements.append(measurement)
+        index = build_link_index(SCHEMAS["BLI"], record)
+        assert len(index.targets["bli-measurement"]) == 5000 + 8
+        assert index.errors() == []
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+
+from mapping_budget import check_budgets, load_budgets, mapping_budget, metadata_mapping
+from yamale2oarepo import convert_batch, share_include_definitions, write_outputs
+from yamale2oarepo_config import MAPPING_LIMITS, QUERY_STRING_FIELD
+
+MAIN = Path(__file__).parent.parent.parent / "models" / "main"
+GENERAL_PARAMETERS = MAIN / "general_parameters.yaml"
+
+SEARCHED = {"copy_to": QUERY_STRING_FIELD}
+
+DEFS = {
+    "Quantity": {
+        "type": "object",
+        "properties": {
+            "value": {"type": "double"},
+            "unit": {"type": "keyword", "mapping": SEARCHED},
+        },
+    },
+    "Buffer": {
+        "type": "nested",
+        "properties": {
+            "name": {"type": "keyword", "mapping": SEARCHED},
+            "concentration": {"use": "#/$defs/Quantity"},
+        },
+    },
+    "Cell": {"type": "object", "properties": {"size": {"type": "integer"}}},
+    "Bead": {
+        "type": "object",
+        "properties": {"size": {"type": "integer"}, "material": {"type": "keyword"}},
+    },
+}
+
+METADATA = {
+    "title": {"type": "keyword", "mapping": SEARCHED},
+    "buffers[]": {"type": "array", "items": {"use": "#/$defs/Buffer"}},
+    "entity": {
+        "type": "polymorphic",
+        "mapping": {"type": "nested"},
+        "discriminator": "type",
+        "schemas": {"cell": {"use": "#/$defs/Cell"}, "bead": {"use": "#/$defs/Bead"}},
+    },
+    "organism": {
+        "type": "vocabulary",
+        "keys": ["id", "title", "props.rank"],
+        "extras": {"title": {"mapping": SEARCHED}},
+    },
+}
+
+
+class TestMappingBudget:
+    def test_mapping(self):
+        mapping = metadata_mapping(METADATA, DEFS)
+        assert list(mapping.children) == ["title", "buffers", "entity", "organism"]
+        buffers = mapping.children["buffers"]
+        assert buffers.type == "nested"
+        assert buffers.children["concentration"].children["value"].type == "double"
+        entity = mapping.children["entity"]
+        assert entity.polymorphic and entity.type == "nested"
+        # the schemas are merged into one object
+        assert list(entity.children) == ["size", "material"]
+        organism = mapping.children["organism"]
+        assert list(organism.children) == ["id", "title", "props"]
+        assert organism.children["props"].children["rank"].type == "keyword"
+        assert organism.children["title"].default_search
+
+    def test_budget(self):
+        budget = mapping_budget(METADATA, DEFS, "test")
+        # metadata, title, buffers (name, concentration (value, unit)),
+        # entity (size, material), organism (id, title, props (rank))
+        assert budget.fields == 15
+        assert budget.nested == 2
+        assert budget.polymorphic == 1
+        # metadata.buffers.concentration.value
+        assert budget.depth == 4
+        assert budget.default_search_fields == 4
+
+    def test_exceeded(self):
+        budget = mapping_budget(METADATA, DEFS, "test")
+        assert budget.exceeded({"fields": 15, "nested": None}) == []
+        assert budget.exceeded({"fields": 10, "depth": 3}) == [
+            "test: fields 15 > 10",
+            "test: depth 4 > 3",
+        ]
+
+    def test_recursive_definitions(self):
+        defs = {
+            "A": {"type": "object", "properties": {"b": {"use": "#/$defs/B"}}},
+            "B": {"type": "object", "properties": {"a": {"use": "#/$defs/A"}}},
+        }
+        with pytest.raises(ValueError, match="A -> B -> A"):
+            metadata_mapping({"a": {"use": "#/$defs/A"}}, defs)
+
+    def test_models(self):
+        budgets = check_budgets()
+        assert [budget.package for budget in budgets] == ["bli", "itc", "mst", "spr"]
+        for budget in budgets:
+            assert budget.fields <= MAPPING_LIMITS["fields"]
+            assert budget.polymorphic > 0
+            assert budget.default_search_fields > 0
+        with pytest.raises(ValueError, match="Mapping limits exceeded"):
+            check_budgets(limits={"fields": 100})
+
+    def test_empty_folder(self, tmp_path):
+        assert load_budgets(tmp_path) == []
+
+    def test_shared_definitions(self, tmp_path):
+        out = convert_batch([GENERAL_PARAMETERS, MAIN / "ITC.yaml"], GENERAL_PARAMETERS)
+        out, _ = share_include_definitions(out, GENERAL_PARAMETERS)
+        write_outputs(out, tmp_path)
+        # the same as with all definitions in itc-definitions.yaml
+        assert load_budgets(tmp_path) == [
+            budget for budget in load_budgets() if budget.package == "itc"
+        ]
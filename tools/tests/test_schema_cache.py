@@ -0,0 +1,72 @@
+import importlib
+
+import yamale
+
+from custom_validators import extend_validators
+from schema_cache import load_schema, schema_key
+
+SCHEMA = """
+root: include('Item')
+---
+Item:
+    name: str()
+    link: link(target='item')
+"""
+
+
+class TestSchemaCache:
+    def test_key_depends_on_validators(self):
+        validators = yamale.validators.DefaultValidators.copy()
+        assert schema_key(b"a") != schema_key(b"a", validators=validators)
+        assert schema_key(b"a") != schema_key(b"b")
+        assert schema_key(b"a") == schema_key(b"a")
+
+    def test_key_depends_on_imported_modules(self, tmp_path, monkeypatch):
+        (tmp_path / "checks.py").write_text("LIMIT = 1\n")
+        (tmp_path / "cache_validators.py").write_text(
+            "from yamale.validators import Validator\n"
+            "from checks import LIMIT\n\n"
+            "class Limited(Validator):\n"
+            "    tag = 'limited'\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        module = importlib.import_module("cache_validators")
+        validators = {"limited": module.Limited}
+
+        key = schema_key(b"a", validators=validators)
+        (tmp_path / "checks.py").write_text("LIMIT = 2\n")
+        assert schema_key(b"a", validators=validators) != key
+
+    def test_cache_hit(self, tmp_path):
+        schema_file = tmp_path / "schema.yaml"
+        schema_file.write_text(SCHEMA)
+        cache_dir = tmp_path / "cache"
+
+        cold = load_schema(schema_file, cache_dir=cache_dir)
+        assert len(list(cache_dir.iterdir())) == 1
+        warm = load_schema(schema_file, cache_dir=cache_dir)
+        assert warm is not cold
+        assert warm.includes.keys() == cold.includes.keys()
+        assert warm.includes["Item"].dict["link"].target == "item"
+        data = [({"root": {"name": "a", "link": {"$ref": "a", "name": "a"}}}, "")]
+        assert yamale.validate(warm, data)[0].isValid()
+
+    def test_invalidated_by_change(self, tmp_path):
+        schema_file = tmp_path / "schema.yaml"
+        include_file = tmp_path / "include.yaml"
+        schema_file.write_text("root: include('Other')\n")
+        include_file.write_text("Other:\n    value: int()\n")
+        cache_dir = tmp_path / "cache"
+
+        schema = load_schema(schema_file, include_file, cache_dir=cache_dir)
+        assert "Other" in schema.includes
+        include_file.write_text("Other:\n    value: num()\n")
+        schema = load_schema(schema_file, include_file, cache_dir=cache_dir)
+        assert type(schema.includes["Other"].dict["value"]).__name__ == "Number"
+        assert len(list(cache_dir.iterdir())) == 2
+
+    def test_content(self, tmp_path):
+        schema = load_schema(
+            content=SCHEMA, validators=extend_validators, cache_dir=tmp_path
+        )
+        assert "Item" in schema.includes
@@ -0,0 +1,199 @@
+import random
+from copy import deepcopy
+from pathlib import Path
+
+import pytest
+
+from schema_compiler import CompiledSchema
+from validate_examples import load_records, technique_schemas
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+TECHNIQUES = ("BLI", "ITC", "MST", "SPR")
+
+SCHEMAS_BY_TECHNIQUE = technique_schemas(SCHEMAS)
+
+
+def interpreted(schema, data, strict=True):
+    try:
+        return schema.validate(data, "", strict).errors
+    except Exception as e:
+        return type(e).__name__
+
+
+def compiled(schema, data, strict=True):
+    try:
+        return schema.validate(data, strict)
+    except Exception as e:
+        return type(e).__name__
+
+
+def checked(schema, data, strict=True):
+    """compiled() of a record, from the check of the compiled schema"""
+    try:
+        return [] if schema.is_valid(data, strict) else ["invalid"]
+    except Exception as e:
+        return type(e).__name__
+
+
+def _items(data, path=()):
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = enumerate(data)
+    else:
+        return
+    for key, value in list(items):
+        yield data, key
+        yield from _items(value, path + (key,))
+
+
+def mutated_records(record, n, seed):
+    """
+    Copies of a record with a few of its items removed, renamed, replaced by
+    values of another type or by values of other items
+    """
+    rng = random.Random(seed)
+    values = ["garbage", 123, 1.5, True, None, [1], {"a": 1}, "", []]
+    for _ in range(n):
+        mutated = deepcopy(record)
+        items = list(_items(mutated))
+        for _ in range(rng.randint(1, 3)):
+            parent, key = rng.choice(items)
+            op = rng.random()
+            if op < 0.25 and isinstance(parent, dict) and key in parent:
+                del parent[key]
+            elif op < 0.35 and isinstance(parent, dict):
+                parent[f"{key}_x"] = 1
+            elif op < 0.5:
+                other_parent, other_key = rng.choice(items)
+                try:
+                    parent[key] = deepcopy(other_parent[other_key])
+                except (KeyError, IndexError):
+                    pass
+            else:
+                try:
+                    parent[key] = rng.choice(values)
+                except IndexError:
+                    pass
+        yield mutated
+
+
+@pytest.fixture(scope="module", params=TECHNIQUES)
+def technique(request):
+    schema = SCHEMAS_BY_TECHNIQUE[request.param]
+    record = load_records(EXAMPLES / f"{request.param}.yaml")[0]
+    return schema, CompiledSchema(schema, cache_dir=None), record
+
+
+class TestExamples:
+    def test_example(self, technique):
+        schema, compiled_schema, record = technique
+        assert compiled(compiled_schema, record) == interpreted(schema, record) == []
+
+    def test_mutated(self, technique):
+        schema, compiled_schema, record = technique
+        n_invalid = 0
+        for mutated in mutated_records(record, 150, seed=0):
+            expected = interpreted(schema, mutated)
+            assert compiled(compiled_schema, mutated) == expected
+            if isinstance(expected, str):
+                # the check may return before reaching the validator raising
+                assert checked(compiled_schema, mutated) in (expected, ["invalid"])
+            else:
+                assert checked(compiled_schema, mutated) == ["invalid"] * bool(expected)
+            n_invalid += bool(expected)
+        assert n_invalid > 100
+
+    def test_not_strict(self, technique):
+        schema, compiled_schema, record = technique
+        for mutated in mutated_records(record, 30, seed=1):
+            assert compiled(compiled_schema, mutated, False) == interpreted(
+                schema, mutated, False
+            )
+
+
+class TestCompiledSchema:
+    yamale_schema = """
+root: list(include('Shape'))
+tags: list(str(), int(min=0), required=False)
+extra: any(num(max=10), enum('a', 'b'), required=False, none=True)
+label: str(equals='x', required=False)
+missing: include('Undefined', required=False)
+"""
+
+    @pytest.fixture(autouse=True, scope="class")
+    def _schema(self, request, shape_schema):
+        request.cls.schema = shape_schema(self.yamale_schema)
+        request.cls.compiled_schema = CompiledSchema(request.cls.schema, cache_dir=None)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"root": []},
+            {"root": [{"name": "a", "type": "Circle", "radius": 1.5}]},
+            {"root": [{"name": "a", "type": "Circle", "radius": "x"}]},
+            {"root": [{"name": "a", "type": "Circle", "sides": 1}]},
+            {"root": [{"name": "a", "type": "Square"}]},
+            {"root": [{"type": "Circle", "radius": 1}]},
+            {"root": ["a"]},
+            {"root": {"a": 1}},
+            {"root": [{"name": "a", "type": "Polygon", "kind": "Regular polygon"}]},
+            {"root": [{"name": "a", "type": "Polygon", "kind": "Star", "sides": 5}]},
+            {
+                "root": [
+                    {
+                        "name": "b",
+                        "type": "Polygon",
+                        "kind": "Regular polygon",
+                        "sides": 2,
+                    }
+                ]
+            },
+            {
+                "root": [
+                    {
+                        "name": "a",
+                        "type": "Circle",
+                        "radius": 1,
+                        "center": {"x": 0, "y": 0, "z": 0},
+                    }
+                ]
+            },
+            {"root": [], "tags": ["a", 1, -1, 1.5, True]},
+            {"root": [], "tags": "a"},
+            {"root": [], "extra": None},
+            {"root": [], "extra": 11},
+            {"root": [], "extra": "c"},
+            {"root": [], "label": "x"},
+            {"root": [], "label": "y"},
+            {"root": [], "missing": {}},
+            {"root": [], "unexpected": 1},
+            {},
+            [],
+            None,
+        ],
+    )
+    def test_same_errors(self, data):
+        for strict in (True, False):
+            expected = interpreted(self.schema, data, strict)
+            assert compiled(self.compiled_schema, data, strict) == expected
+            assert self.compiled_schema.is_valid(data, strict) == (not expected)
+
+    def test_check_source(self):
+        compiled_schema = CompiledSchema(self.schema, cache_dir=None)
+        assert compiled_schema.check_source is None
+        assert not compiled_schema.is_valid({"root": [{"name": "a"}]})
+        # the check returns at the first error without formatting any message
+        assert "_fmt" not in compiled_schema.check_source
+        assert "append" not in compiled_schema.check_source
+
+    def test_code_cache(self, tmp_path):
+        CompiledSchema(self.schema, cache_dir=tmp_path)
+        (cache_file,) = tmp_path.iterdir()
+        warm = CompiledSchema(self.schema, cache_dir=tmp_path)
+        assert list(tmp_path.iterdir()) == [cache_file]
+        assert warm.validate({"root": [{"name": "a"}]}) == [
+            "root.0: type: Required field missing"
+        ]
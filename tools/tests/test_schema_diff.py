@@ -0,0 +1,175 @@
+from pathlib import Path
+
+import pytest
+
+from field_catalogue import iter_fields, write_jsonl
+from schema_diff import (
+    ADDED,
+    CONSTRAINT,
+    ENUM,
+    LINK,
+    REMOVED,
+    REQUIRED,
+    RETYPED,
+    SchemaDiff,
+    diff_schemas,
+    load_tree,
+    main,
+)
+from unroll import YamaleTree
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+INCLUDES = [SCHEMAS / "general_parameters.yaml"]
+
+EDITS = [
+    # breaking
+    ("  experiment_type: enum('Affinity','Quantification', 'Other')\n", ""),
+    (
+        "  plates: list(include('Plate'), min=1)",
+        "  plates: list(include('Plate'), min=2)",
+    ),
+    ("  name: str()\n  sensor:", "  name: int()\n  sensor:"),
+    ("link(target='bli-sensor')", "link(target='bli-sensors')"),
+    ("  sensor_id: str(required=False)", "  sensor_id: str()"),
+    ("'Regeneration', 'Load',", "'Load',"),
+    (
+        "  surface_properties: str(required=False)",
+        "  surface_properties: str(required=False, max=100)",
+    ),
+    # not breaking
+    (
+        "  data_analysis: list(include('BLI_data_analysis'), required=False)",
+        "  data_analysis: list(include('BLI_data_analysis'), required=False)\n"
+        "  notes: str(required=False)",
+    ),
+    (
+        "  measurements: list(include('BLI_Measurement'), min=1)",
+        "  measurements: list(include('BLI_Measurement'), min=0)",
+    ),
+    ("'Wash',\n    'Activation'", "'Wash',\n    'Activation', 'Quench'"),
+]
+
+
+@pytest.fixture(scope="module")
+def old():
+    return load_tree(SCHEMAS / "BLI.yaml", INCLUDES)
+
+
+@pytest.fixture(scope="module")
+def new_schema(tmp_path_factory):
+    content = (SCHEMAS / "BLI.yaml").read_text()
+    for before, after in EDITS:
+        assert content.count(before) == 1, before
+        content = content.replace(before, after)
+    path = tmp_path_factory.mktemp("schemas") / "BLI.yaml"
+    path.write_text(content)
+    return path
+
+
+class TestSchemaDiff:
+    def test_same(self, old):
+        schema_diff = SchemaDiff(old, load_tree(SCHEMAS / "BLI.yaml", INCLUDES))
+        assert schema_diff.changes == []
+        assert schema_diff.compared == 1
+
+    def test_changes(self, old, new_schema):
+        schema_diff = SchemaDiff(old, load_tree(new_schema, INCLUDES))
+        changes = {
+            (change.path, change.kind): change.breaking
+            for change in schema_diff.changes
+        }
+        prefix = "method_specific_parameters."
+        assert changes == {
+            (prefix + "experiment_type", REMOVED): True,
+            (prefix + "plates:min", CONSTRAINT): True,
+            (prefix + "measurements.*.name", RETYPED): True,
+            (prefix + "measurements.*.sensor", LINK): True,
+            (prefix + "sensors.*.sensor_id", REQUIRED): True,
+            (prefix + "measurement_protocol.*.type", ENUM): True,
+            (prefix + "notes", ADDED): False,
+            (prefix + "sensors.*.surface_properties:max", CONSTRAINT): True,
+            (prefix + "measurements:min", CONSTRAINT): False,
+        }
+
+    def test_required_when(self, old, tmp_path):
+        includes = tmp_path / "general_parameters.yaml"
+        content = INCLUDES[0].read_text()
+        for before, after in [
+            # sequence becomes required by molecular assemblies
+            (
+                "  components: list(nested_include('Assembly_component'), min=1)\n",
+                "  components: list(nested_include('Assembly_component'), min=1)\n"
+                "  sequence: str()\n",
+            ),
+            (
+                "  molecular_weight: include('Molecular_weight')\n"
+                "  chemical_modifications",
+                "  molecular_weight: include('Molecular_weight', required=False)\n"
+                "  chemical_modifications",
+            ),
+        ]:
+            assert content.count(before) == 1, before
+            content = content.replace(before, after)
+        includes.write_text(content)
+
+        schema_diff = SchemaDiff(old, load_tree(SCHEMAS / "BLI.yaml", [includes]))
+        entities = "general_parameters.entities_of_interest.*."
+        changes = {
+            change.path: change
+            for change in schema_diff.changes
+            if change.path.startswith(entities)
+        }
+        assert changes[entities + "sequence"].kind == REQUIRED
+        assert changes[entities + "sequence"].new == [{"type": "Molecular assembly"}]
+        assert changes[entities + "sequence"].breaking
+        # molecular weights are only required by polymers any more
+        assert changes[entities + "molecular_weight"].new == [{"type": "Polymer"}]
+        assert not changes[entities + "molecular_weight"].breaking
+
+    def test_compares_changed_parts(self, old, new_schema):
+        schema_diff = SchemaDiff(old, load_tree(new_schema, INCLUDES))
+        # the general parameters are skipped by their hash
+        assert schema_diff.compared < len(list(iter_fields_of(new_schema))) / 4
+
+    def test_catalogues(self, new_schema, tmp_path):
+        catalogue = tmp_path / "BLI.fields.jsonl"
+        write_jsonl(iter_fields_of(SCHEMAS / "BLI.yaml"), catalogue)
+        from_catalogue = diff_schemas(catalogue, new_schema, new_includes=INCLUDES)
+        from_schema = diff_schemas(SCHEMAS / "BLI.yaml", new_schema, INCLUDES, INCLUDES)
+        assert from_catalogue.changes == from_schema.changes
+
+
+class TestMain:
+    def run(self, monkeypatch, *args):
+        monkeypatch.setattr("sys.argv", ["schema_diff.py", *map(str, args)])
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+        return exit_info.value.code
+
+    def test_includes_before_schemas(self, monkeypatch, new_schema, capsys):
+        schema = SCHEMAS / "BLI.yaml"
+        assert self.run(monkeypatch, "--includes", INCLUDES[0], schema, schema) == 0
+        assert (
+            self.run(
+                monkeypatch,
+                "--includes",
+                INCLUDES[0],
+                "--old-includes",
+                INCLUDES[0],
+                schema,
+                new_schema,
+            )
+            == 1
+        )
+
+    def test_missing_include(self, monkeypatch, capsys):
+        schema = SCHEMAS / "BLI.yaml"
+        assert self.run(monkeypatch, schema, schema) == 2
+        assert "Include 'General_parameters'" in capsys.readouterr().err
+
+
+def iter_fields_of(schema_file):
+    tree = YamaleTree(schema_file)
+    tree.add_external_includes(*INCLUDES)
+    return iter_fields(tree)
@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from stream_validation import iter_json_values, iter_records, validate_stream
+from validate_examples import load_records, validate_record, validation_schemas
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+VALUES = [{"a": [1, 2.5, {"b": "]},["}, []]}, 12345678, "x", None, {"c": True}]
+
+
+class TestIterJsonValues:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 1 << 16])
+    @pytest.mark.parametrize(
+        "text",
+        [
+            json.dumps(VALUES),
+            json.dumps(VALUES, indent=2),
+            "\n".join(json.dumps(v) for v in VALUES) + "\n",
+            " ".join(json.dumps(v) for v in VALUES),
+        ],
+    )
+    def test_values(self, text, chunk_size):
+        assert list(iter_json_values(io.StringIO(text), chunk_size)) == VALUES
+
+    def test_json_lines(self):
+        # many small values decoded from one large chunk
+        values = [{"a": i, "b": [i, str(i)]} for i in range(5000)]
+        text = "\n".join(json.dumps(v) for v in values)
+        assert list(iter_json_values(io.StringIO(text), 1 << 20)) == values
+
+    def test_empty(self):
+        assert list(iter_json_values(io.StringIO(""))) == []
+        assert list(iter_json_values(io.StringIO(" [ ] "))) == []
+
+    def test_invalid(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_values(io.StringIO('[{"a": 1}, {"a": ]'), 4))
+        with pytest.raises(ValueError):
+            list(iter_json_values(io.StringIO('[{"a": 1}'), 4))
+
+    def test_fixture(self):
+        fixture = json.dumps([{"metadata": {"a": 1}}, {"metadata": {"a": 2}}])
+        assert list(iter_records(io.StringIO(fixture))) == [{"a": 1}, {"a": 2}]
+
+
+class TestValidateStream:
+    schemas = validation_schemas(SCHEMAS)
+
+    def test_results(self):
+        techniques = ("BLI", "ITC", "MST", "SPR")
+        records = [load_records(EXAMPLES / f"{t}.json")[0] for t in techniques]
+        records.append({"general_parameters": {}})
+        fixture = json.dumps([{"metadata": r} for r in records])
+
+        out = io.StringIO()
+        assert validate_stream(io.StringIO(fixture), out, self.schemas, "f") == (5, 1)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+        # the shipped fixtures are valid
+        assert [r["valid"] for r in results] == [True, True, True, True, False]
+        assert results[-1]["errors"] == validate_record(records[-1], self.schemas)
+
+    def peak_memory(self, path, n):
+        record = load_records(EXAMPLES / "BLI.json")[0]
+        with open(path, "w") as f:
+            json.dump([{"metadata": record}] * n, f)
+
+        tracemalloc.start()
+        with open(path) as f, open(os.devnull, "w") as out:
+            assert validate_stream(f, out, self.schemas)[0] == n
+            _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    def test_flat_memory(self, tmp_path):
+        peak = self.peak_memory(tmp_path / "small.json", 20)
+        assert self.peak_memory(tmp_path / "large.json", 400) < peak * 1.5
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+from unroll import YamaleTree
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+UNROLLED = REPO / "models" / "unrolled"
+
+
+def unrolled_tree(name, expansions=None):
+    tree = YamaleTree(SCHEMAS / f"{name}.yaml", expansions)
+    tree.add_external_includes(SCHEMAS / "general_parameters.yaml")
+    tree.build()
+    return tree
+
+
+class TestYamaleTree:
+    @pytest.mark.parametrize("name", ["MST", "BLI", "ITC", "SPR"])
+    def test_same_as_committed(self, name, tmp_path):
+        unrolled_tree(name).write(tmp_path / f"{name}.txt")
+        assert (tmp_path / f"{name}.txt").read_text() == (
+            UNROLLED / f"{name}.txt"
+        ).read_text()
+
+    def test_shared_expansions(self):
+        expansions = {}
+        first = unrolled_tree("MST", expansions)
+        n_expansions = len(expansions)
+        second = unrolled_tree("BLI", expansions)
+        # the general parameters are expanded once for both schema files
+        assert first.tree["general_parameters"] is second.tree["general_parameters"]
+        assert len(expansions) > n_expansions
+
+    def test_include_cycle(self, tmp_path):
+        schema_file = tmp_path / "cycle.yaml"
+        schema_file.write_text(
+            "a: include('A')\n---\nA:\n  b: include('B')\nB:\n  a: list(include('A'))\n"
+        )
+        with pytest.raises(ValueError, match="A -> B -> A"):
+            YamaleTree(schema_file).build()
@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+
+import pytest
+from test_schema_compiler import mutated_records
+
+from validate_examples import (
+    find_records,
+    find_technique,
+    is_record_valid,
+    load_records,
+    record_from_json,
+    run_batch,
+    screen_record,
+    technique_schemas,
+    validate_batch,
+    validate_record,
+    validation_schemas,
+)
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+
+class TestBatch:
+    schemas = technique_schemas(SCHEMAS)
+
+    def test_find_technique(self):
+        record = load_records(EXAMPLES / "BLI.yaml")[0]
+        assert find_technique(record) == "BLI"
+        with pytest.raises(ValueError):
+            find_technique({"general_parameters": {}})
+
+    def test_find_records(self):
+        assert len(find_records(str(EXAMPLES))) == 8
+        assert find_records(f"{EXAMPLES}/*.yaml") == find_records(
+            str(EXAMPLES / "BLI.yaml"),
+            str(EXAMPLES / "ITC.yaml"),
+            str(EXAMPLES / "MST.yaml"),
+            str(EXAMPLES / "SPR.yaml"),
+        )
+
+    def test_load_fixture(self):
+        (record,) = load_records(EXAMPLES / "MST.json")
+        assert find_technique(record) == "MST"
+
+    def test_validate_record(self):
+        for technique in self.schemas:
+            record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+            assert validate_record(record, self.schemas) == []
+
+        record["general_parameters"]["record_information"].pop("title")
+        assert validate_record(record, self.schemas) == [
+            "general_parameters.record_information.title: Required field missing"
+        ]
+
+    def test_record_from_json(self):
+        for technique in self.schemas:
+            record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+            (fixture,) = load_records(EXAMPLES / f"{technique}.json")
+            assert record_from_json(fixture, self.schemas) == record
+        unsupported = {"deposition_date": "2022-01-23"}
+        assert record_from_json(unsupported, self.schemas) is unsupported
+
+    def test_validate_batch(self):
+        # the JSON fixtures are as valid as the YAML examples they are made of
+        paths = find_records(str(EXAMPLES))
+        results = list(validate_batch(paths, SCHEMAS, workers=2))
+        assert [name for name, _ in results] == [str(p) for p in paths]
+        assert all(errors == [] for _, errors in results)
+
+    def test_run_batch(self, tmp_path, capsys):
+        record = load_records(EXAMPLES / "BLI.yaml")[0]
+        entity = record["general_parameters"]["entities_of_interest"][0]
+        entity["x"] = entity["y"] = 1
+        path = tmp_path / "record.json"
+        path.write_text(json.dumps(record, default=str))
+        assert run_batch([str(path)], SCHEMAS, workers=0) == 1
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == f"FAIL {path}"
+        # the continuation line of the error of the choose is indented
+        assert sorted(line.split(": ")[-2].strip() for line in lines[1:3]) == ["x", "y"]
+        assert lines[1].startswith("    general_parameters.entities_of_interest.0: ")
+        assert lines[2].startswith("        ") and lines[2].endswith(
+            "Unexpected element"
+        )
+
+    def test_fast_reject(self):
+        compiled_schemas = validation_schemas(SCHEMAS)
+        for technique in self.schemas:
+            record = load_records(EXAMPLES / f"{technique}.yaml")[0]
+            for mutated in mutated_records(record, 50, seed=6):
+                errors = validate_record(mutated, self.schemas)
+                for schemas in (self.schemas, compiled_schemas):
+                    assert is_record_valid(mutated, schemas) == (not errors)
+                    assert screen_record(mutated, schemas) == errors
+
+        paths = find_records(str(EXAMPLES))
+        assert list(validate_batch(paths, SCHEMAS, workers=0, fast_reject=True)) == (
+            list(validate_batch(paths, SCHEMAS, workers=0))
+        )
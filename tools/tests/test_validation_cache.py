@@ -0,0 +1,87 @@
+import datetime
+import shutil
+from pathlib import Path
+
+from validate_examples import run_batch, technique_fingerprints
+from validation_cache import ValidationCache, record_hash, schema_fingerprint
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+
+class TestRecordHash:
+    def test_key_order(self):
+        assert record_hash({"a": 1, "b": [1, {"c": 2, "d": 3}]}) == record_hash(
+            {"b": [1, {"d": 3, "c": 2}], "a": 1}
+        )
+
+    def test_types(self):
+        values = [1, 1.0, True, "1", "2020-01-01", datetime.date(2020, 1, 1), None]
+        assert len({record_hash({"a": value}) for value in values}) == len(values)
+
+
+class TestValidationCache:
+    def test_get_put(self, tmp_path):
+        with ValidationCache(tmp_path / "cache.sqlite") as cache:
+            assert cache.get("schema", "record") is None
+            cache.put("schema", "record", ["error"])
+            cache.put("schema", "valid", [])
+            assert cache.get("schema", "record") == ["error"]
+            assert cache.get("schema", "valid") == []
+            assert cache.get("other schema", "record") is None
+            assert (cache.hits, cache.misses) == (2, 2)
+
+        with ValidationCache(tmp_path / "cache.sqlite") as cache:
+            assert cache.get("schema", "record") == ["error"]
+            assert len(cache) == 2
+
+    def test_lru_eviction(self, tmp_path):
+        with ValidationCache(tmp_path / "cache.sqlite", max_entries=3) as cache:
+            for record in "abc":
+                cache.put("schema", record, [])
+            cache.get("schema", "a")
+            cache.put("schema", "d", [])
+            assert len(cache) == 3
+            assert cache.get("schema", "b") is None
+            assert all(cache.get("schema", record) == [] for record in "acd")
+
+    def test_bounded_without_evict(self, tmp_path):
+        with ValidationCache(tmp_path / "cache.sqlite", max_entries=10) as cache:
+            for i in range(100):
+                cache.put("schema", str(i), [])
+            assert len(cache) == 10
+
+
+class TestBatchCache:
+    def test_fingerprints(self, tmp_path):
+        fingerprints = technique_fingerprints(SCHEMAS)
+        assert len(set(fingerprints.values())) == 4
+        shutil.copytree(SCHEMAS, tmp_path / "schemas")
+        general_parameters = tmp_path / "schemas" / "general_parameters.yaml"
+        assert schema_fingerprint(
+            [tmp_path / "schemas" / "BLI.yaml", general_parameters]
+        ) == (fingerprints["BLI"])
+        general_parameters.write_text(general_parameters.read_text() + "\n")
+        assert technique_fingerprints(tmp_path / "schemas")["BLI"] != (
+            fingerprints["BLI"]
+        )
+
+    def test_fingerprint_depends_on_modules(self, tmp_path):
+        module = tmp_path / "checks.py"
+        module.write_text("from limits import LIMIT\n")
+        (tmp_path / "limits.py").write_text("LIMIT = 1\n")
+        schema_files = [SCHEMAS / "BLI.yaml"]
+        fingerprint = schema_fingerprint(schema_files, modules=[module])
+        assert fingerprint != schema_fingerprint(schema_files)
+        # a change to a module imported by the module
+        (tmp_path / "limits.py").write_text("LIMIT = 2\n")
+        assert schema_fingerprint(schema_files, modules=[module]) != fingerprint
+
+    def test_second_run_hits(self, tmp_path, capsys):
+        cache = tmp_path / "cache.sqlite"
+        records = [str(EXAMPLES / f"{t}.yaml") for t in ("BLI", "MST")]
+        assert run_batch(records, SCHEMAS, workers=1, cache_path=cache) == 0
+        assert "0 hits, 2 misses" in capsys.readouterr().out
+        assert run_batch(records, SCHEMAS, workers=1, cache_path=cache) == 0
+        assert "2 hits, 0 misses" in capsys.readouterr().out
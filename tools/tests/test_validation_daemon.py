@@ -0,0 +1,156 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from validate_examples import load_records, validate_record, validation_schemas
+from validation_daemon import ValidationService
+
+REPO = Path(__file__).parent.parent.parent
+SCHEMAS = REPO / "models" / "values-only"
+EXAMPLES = REPO / "metadata-examples"
+
+# as sent over HTTP: a fixture, with dates as strings and links with "id"
+RECORD = load_records(EXAMPLES / "BLI.json")[0]
+INVALID = {"general_parameters": {}}
+SCHEMAS_BY_TECHNIQUE = validation_schemas(SCHEMAS)
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    cache_path = tmp_path_factory.mktemp("daemon") / "cache.sqlite"
+    service = ValidationService(SCHEMAS, workers=0, cache_path=cache_path)
+    yield service
+    service.close()
+
+
+async def request(socket_path, method, target, payload=None):
+    reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    body = b"" if payload is None else json.dumps(payload, default=str).encode()
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n".encode() + body
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), body.decode()
+
+
+def raw_request(service, socket_path, data: bytes) -> bytes:
+    async def run():
+        server = await asyncio.start_unix_server(
+            service.handle_connection, path=str(socket_path)
+        )
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(str(socket_path))
+            writer.write(data)
+            response = await reader.read()
+            writer.close()
+            return response
+
+    return asyncio.run(run())
+
+
+def run_requests(service, socket_path, *requests):
+    async def run():
+        server = await asyncio.start_unix_server(
+            service.handle_connection, path=str(socket_path)
+        )
+        async with server:
+            return await asyncio.gather(
+                *(request(socket_path, *args) for args in requests)
+            )
+
+    return asyncio.run(run())
+
+
+class TestValidationService:
+    def test_validate(self, service, tmp_path):
+        (status, body), (_, batch_body) = run_requests(
+            service,
+            tmp_path / "socket",
+            ("POST", "/validate", RECORD),
+            ("POST", "/validate", [{"metadata": RECORD}, INVALID]),
+        )
+        assert status == 200
+        # the valid example is valid
+        assert json.loads(body) == {"valid": True, "errors": []}
+        assert json.loads(batch_body) == [
+            {"valid": True, "errors": []},
+            {
+                "valid": False,
+                "errors": validate_record(INVALID, SCHEMAS_BY_TECHNIQUE),
+            },
+        ]
+
+    def test_batching(self, service):
+        async def run():
+            return await asyncio.gather(
+                *(service.validate([RECORD, INVALID]) for _ in range(10))
+            )
+
+        n_pending = []
+        original = service._flush
+        service._flush = lambda: n_pending.append(len(service._pending)) or original()
+        try:
+            results = asyncio.run(run())
+        finally:
+            del service._flush
+        # the records of concurrent requests are validated together
+        assert n_pending == [20]
+        assert all(result[0] == [] and result[1] for result in results)
+
+    def test_errors(self, service, tmp_path):
+        results = run_requests(
+            service,
+            tmp_path / "socket",
+            ("GET", "/validate"),
+            ("GET", "/unknown"),
+        )
+        assert [status for status, _ in results] == [405, 404]
+
+        response = raw_request(
+            service,
+            tmp_path / "socket",
+            b"POST /validate HTTP/1.1\r\nContent-Length: 1\r\n"
+            b"Connection: close\r\n\r\n{",
+        )
+        assert response.startswith(b"HTTP/1.1 400 Bad Request")
+
+    @pytest.mark.parametrize(
+        "data, status",
+        [
+            (b"GET /" + b"x" * (1 << 17) + b" HTTP/1.1\r\n\r\n", b"400"),
+            (b"GET / HTTP/1.1\r\nX: " + b"x" * (1 << 17) + b"\r\n\r\n", b"431"),
+            (b"POST /validate HTTP/1.1\r\nContent-Length: -5\r\n\r\n", b"400"),
+            (
+                b"POST /validate HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                b"2\r\n{}\r\n0\r\n\r\nGET /health HTTP/1.1\r\n\r\n",
+                b"411",
+            ),
+        ],
+    )
+    def test_malformed_requests(self, service, tmp_path, data, status):
+        response = raw_request(service, tmp_path / "socket", data)
+        # a single error response, the rest of the connection is not parsed
+        assert response.startswith(b"HTTP/1.1 " + status)
+        assert response.count(b"HTTP/1.1") == 1
+        assert b"Connection: close" in response
+
+    def test_metrics(self, service, tmp_path):
+        service.metrics.observe(0.001)
+        ((status, body),) = run_requests(
+            service, tmp_path / "socket", ("GET", "/metrics")
+        )
+        assert status == 200
+        metrics = dict(
+            line.rsplit(" ", 1) for line in body.splitlines() if line[0] != "#"
+        )
+        assert int(metrics["mbdb_validation_requests_total"]) >= 1
+        assert (
+            float(metrics['mbdb_validation_request_latency_seconds{quantile="0.5"}'])
+            > 0
+        )
+        assert "mbdb_validation_cache_hits_total" in metrics
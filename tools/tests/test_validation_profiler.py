@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from yamale.schema import Schema
+
+from validation_profiler import ValidationProfiler, schema_path
+
+
+class TestValidationProfiler:
+    data = {
+        "root": [
+            {"name": "a", "type": "Circle", "radius": 1, "url": "https://a.org"},
+            {"name": "b", "type": "Circle", "radius": 2},
+        ]
+    }
+
+    @pytest.fixture(autouse=True, scope="class")
+    def _schema(self, request, shape_schema):
+        request.cls.schema = shape_schema("root: list(include('Shape'))")
+
+    def test_schema_path(self):
+        assert schema_path(("a", 0, "b", 12)) == "a.*.b.*"
+
+    def test_profile(self, tmp_path):
+        original = Schema._validate_primitive
+        with ValidationProfiler() as profiler:
+            assert Schema._validate_primitive is not original
+            assert self.schema.validate(self.data, "", True).errors == []
+        assert Schema._validate_primitive is original
+
+        by_path = profiler.by_path
+        assert by_path["root"].calls == 1
+        # include('Shape') and the choose it includes
+        assert by_path["root.*"].calls == 4
+        assert by_path["root.*.radius"].calls == 2
+        assert by_path["root.*.url"].calls == 1
+        assert profiler.by_validator["Choose"].calls == 2
+        assert profiler.by_validator["Url"].calls == 1
+
+        choose = profiler.by_validator["Choose"]
+        assert choose.own < choose.total
+        assert "root.*.radius" in profiler.report()
+
+        profiler.dump_json(tmp_path / "profile.json")
+        profile = json.loads((tmp_path / "profile.json").read_text())
+        assert profile["by_validator"]["Url"]["calls"] == 1
+
+    def test_single_profiler(self):
+        with ValidationProfiler():
+            with pytest.raises(RuntimeError):
+                ValidationProfiler().enable()
@@ -0,0 +1,110 @@
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import yamale
+
+from custom_validators import bind_vocabularies, extend_validators
+from vocabulary_index import (
+    VocabularyIndex,
+    index_path,
+    load_index,
+    load_indexes,
+    update_indexes,
+    write_index,
+)
+
+FIXTURE = """---
+id: ror:02hpadn98
+title:
+  en: University
+---
+id: ror:05gq02987
+title:
+  en: Other university
+---
+id: taxid:9606
+title:
+  en: Homo sapiens
+"""
+
+
+class TestVocabularyIndex:
+    def test_membership(self, tmp_path):
+        ids = [f"oa:{i:07d}" for i in range(0, 20000, 3)]
+        assert write_index(ids + ids[:10], tmp_path / "grants.idx") == len(ids)
+        index = VocabularyIndex(tmp_path / "grants.idx")
+        assert len(index) == len(ids)
+        assert list(index) == sorted(ids)
+        for i in range(0, 20000, 1):
+            assert (f"oa:{i:07d}" in index) == (i % 3 == 0)
+        assert "" not in index
+        assert "zzz" not in index
+
+    def test_empty(self, tmp_path):
+        write_index([], tmp_path / "empty.idx")
+        index = VocabularyIndex(tmp_path / "empty.idx")
+        assert len(index) == 0
+        assert "a" not in index
+
+    def test_unicode_and_numbers(self, tmp_path):
+        write_index(["é", 1234], tmp_path / "v.idx")
+        index = VocabularyIndex(tmp_path / "v.idx")
+        assert "é" in index
+        assert 1234 in index
+        assert "1234" in index
+
+    def test_load_from_fixture(self, tmp_path):
+        fixture = tmp_path / "affiliations.yaml"
+        fixture.write_text(FIXTURE)
+        index = load_index(fixture)
+        assert index_path(fixture).exists()
+        assert "ror:05gq02987" in index
+        assert "ror:00000000" not in index
+
+        # reused while the fixture is unchanged, rebuilt when it is newer
+        mtime = index_path(fixture).stat().st_mtime
+        assert len(load_index(fixture)) == 3
+        fixture.write_text(FIXTURE + "---\nid: ror:00000000\n")
+        os.utime(fixture, (mtime + 10, mtime + 10))
+        assert "ror:00000000" in load_index(fixture)
+
+        assert pickle.loads(pickle.dumps(index)).path == index.path
+
+    def test_concurrent_writers(self, tmp_path):
+        # e.g. worker processes building the index of the same fixture at once
+        ids = [f"oa:{i}" for i in range(5000)]
+        with ThreadPoolExecutor(8) as executor:
+            counts = executor.map(
+                lambda _: write_index(ids, tmp_path / "grants.idx"), range(16)
+            )
+            assert list(counts) == [len(ids)] * 16
+        assert len(VocabularyIndex(tmp_path / "grants.idx")) == len(ids)
+        assert [p.name for p in tmp_path.iterdir()] == ["grants.idx"]
+
+    def test_update_indexes(self, tmp_path):
+        (tmp_path / "affiliations.yaml").write_text(FIXTURE)
+        update_indexes(tmp_path)
+        path = index_path(tmp_path / "affiliations.yaml")
+        mtime = path.stat().st_mtime_ns
+        # the indexes are only mapped afterwards
+        assert "taxid:9606" in load_indexes(tmp_path)["affiliations"]
+        assert path.stat().st_mtime_ns == mtime
+
+    def test_vocabulary_validator(self, tmp_path):
+        (tmp_path / "affiliations.yaml").write_text(FIXTURE)
+        schema = yamale.make_schema(
+            validators=extend_validators,
+            content="affiliation: vocabulary(vocabulary='affiliations')\n"
+            "grant: vocabulary(vocabulary='grants')\n",
+        )
+        bind_vocabularies(schema, load_indexes(tmp_path))
+
+        def errors(affiliation):
+            data = {"affiliation": {"id": affiliation}, "grant": {"id": "oa:1"}}
+            return schema.validate(data, "", True).errors
+
+        assert errors("ror:02hpadn98") == []
+        assert errors("ror:unknown") == [
+            "affiliation: 'ror:unknown' is not an id of the affiliations vocabulary."
+        ]
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from yamale2oarepo import (
+    convert,
+    convert_batch,
+    files_output,
+    parse_cache,
+    parse_include_body,
+    parse_link_fields,
+    write_outputs,
+)
+
+REPO = Path(__file__).parent.parent.parent
+MAIN = REPO / "models" / "main"
+OAREPO = REPO / "models" / "oarepo"
+GENERAL_PARAMETERS = MAIN / "general_parameters.yaml"
+TECHNIQUES = [MAIN / f"{technique}.yaml" for technique in ("BLI", "ITC", "MST", "SPR")]
+
+
+class TestConvertBatch:
+    def test_same_as_convert(self):
+        expected = convert(GENERAL_PARAMETERS, GENERAL_PARAMETERS, only_defs=True)
+        for technique in TECHNIQUES:
+            expected += convert(technique, GENERAL_PARAMETERS)
+        # processing a model does not change the shared include of the others
+        for input_files in (
+            [GENERAL_PARAMETERS, *TECHNIQUES],
+            [*reversed(TECHNIQUES), GENERAL_PARAMETERS],
+        ):
+            out = convert_batch(input_files, GENERAL_PARAMETERS)
+            assert sorted(out, key=lambda o: (o[2], o[1])) == sorted(
+                expected, key=lambda o: (o[2], o[1])
+            )
+
+
+class TestParseCache:
+    def test_reused(self):
+        parse_cache.clear()
+        body = "enum('mL/min','µl/s', required=False)"
+        validator = parse_include_body(body)
+        assert parse_include_body(body) is validator
+        assert validator.enums == ("mL/min", "µl/s") and not validator.is_required
+        assert parse_link_fields("[id, name]") == ["id", "name"]
+        assert (parse_cache.hits, parse_cache.misses) == (1, 2)
+
+        convert(TECHNIQUES[0], GENERAL_PARAMETERS)
+        hits = parse_cache.hits
+        convert(TECHNIQUES[0], GENERAL_PARAMETERS)
+        assert parse_cache.misses > 2 and parse_cache.hits > hits
+        assert "reused saving" in parse_cache.stats()
+
+
+class TestWriteOutputs:
+    def test_golden_files(self, tmp_path):
+        out = convert_batch([GENERAL_PARAMETERS, *TECHNIQUES], GENERAL_PARAMETERS)
+        write_outputs(out + [files_output()], tmp_path)
+        written = sorted(path.name for path in tmp_path.iterdir())
+        assert written == sorted(path.name for path in OAREPO.glob("*.yaml"))
+        for name in written:
+            assert (tmp_path / name).read_bytes() == (OAREPO / name).read_bytes(), name
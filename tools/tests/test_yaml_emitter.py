@@ -0,0 +1,97 @@
+from io import StringIO
+
+import pytest
+from ruamel.yaml import YAML, RoundTripRepresenter
+from ruamel.yaml.scalarstring import DoubleQuotedScalarString
+
+from yaml_emitter import DOUBLE_QUOTED, PLAIN, SINGLE_QUOTED, dump_yaml, scalar_style
+
+LONG = (
+    "Name (id) of the measurement which must be unique within a record (i.e. "
+    "triplicates must be named individually in the raw data file)"
+)
+
+DATA = [
+    {},
+    {"a": None, "b": True, "c": False, "d": 3, "e": -1.5, "f": 100.0},
+    {"nan": float("nan"), "inf": float("inf"), "-inf": float("-inf")},
+    {"empty": {}, "list": [], "nested": {"deeper": {"empty": {}}}, "last": []},
+    {"Yes": "No", "On": ["Yes", "No", "On", "Off"], "yes": "no"},
+    {"strings": ["", "1", "1.0", "true", "null", "~", "2001-01-01", "<<", "="]},
+    {"indicators": ["#a", "a #b", "a#b", "- a", "-a", "a: b", "a:b", "? a", "?"]},
+    {"flow": ["a,b", "[a]", "{a}", "% saturated", "<90 %", ">90 %", "it's"]},
+    {"spaces": [" a", "a ", "a  b", "a\nb", "a\tb", "µl/s", "Å"]},
+    {"help.en": LONG, "^help.en": LONG + " " + LONG, "label.en": "Name"},
+    {"nested": {"deeper": {"help.en": LONG + " 'quoted' and " + LONG}}},
+    {"long_word": "x" * 100, "words": " ".join(["y" * 30] * 6)},
+    {"enum": [f"{LONG[:n]}, {n}" for n in range(0, 90, 7)]},
+    {"enum": [f"word {n}" for n in range(60)] + ["a, b"] * 10},
+    {"quoted": "'" + LONG + "'", "double": '"' + LONG + "\n" + LONG + '"'},
+    {"x" * 100: 1, "a b": {"c d": [1, 2.5, None, True, "e f"]}},
+]
+
+
+class NonAliasingRTRepresenter(RoundTripRepresenter):
+    def ignore_aliases(self, data):
+        return True
+
+
+def quote_booleans(data):
+    if isinstance(data, list):
+        return [quote_booleans(item) for item in data]
+    if isinstance(data, dict):
+        return {quote_booleans(k): quote_booleans(v) for k, v in data.items()}
+    if data in ("Yes", "No", "On", "Off"):
+        return DoubleQuotedScalarString(data)
+    return data
+
+
+def set_flow_style(data):
+    if isinstance(data, list):
+        data.fa.set_flow_style()
+    elif isinstance(data, dict):
+        for value in data.values():
+            set_flow_style(value)
+
+
+def ruamel_yaml(data) -> str:
+    """How the models were written before: dumped, loaded and dumped again"""
+    yaml = YAML()
+    yaml.default_flow_style = False
+    yaml.preserve_quotes = True
+    yaml.allow_unicode = True
+    yaml.Representer = NonAliasingRTRepresenter
+    io = StringIO()
+    yaml.dump(quote_booleans(data), io)
+    io.seek(0)
+    loaded = yaml.load(io)
+    set_flow_style(loaded)
+    io = StringIO()
+    yaml.dump(loaded, io)
+    return io.getvalue()
+
+
+class TestYamlEmitter:
+    @pytest.mark.parametrize("data", DATA)
+    def test_same_as_ruamel(self, data):
+        assert dump_yaml(data) == ruamel_yaml(data)
+
+    def test_styles(self):
+        assert scalar_style("Yes") == DOUBLE_QUOTED
+        assert scalar_style("1") == SINGLE_QUOTED
+        assert scalar_style("it's", flow=True) == PLAIN
+        assert scalar_style("a, it's", flow=True) == DOUBLE_QUOTED
+        assert scalar_style("a, b") == PLAIN
+        assert scalar_style("a, b", flow=True) == SINGLE_QUOTED
+        # quoted in a flow sequence as it was quoted in a block sequence
+        assert scalar_style("? a", flow=True) == SINGLE_QUOTED
+
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            dump_yaml({"x" * 200: 1})
+        with pytest.raises(ValueError):
+            dump_yaml({"a\nb": 1})
+        with pytest.raises(TypeError):
+            dump_yaml({"a": [{"b": 1}]})
+        with pytest.raises(TypeError):
+            dump_yaml({"a": object()})
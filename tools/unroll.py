@@ -1,22 +1,30 @@
 #!/usr/bin/env python3
 
+import hashlib
 from argparse import ArgumentParser
 from copy import deepcopy
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import yamale
 import yamale.validators.validators as validators
-from yamale.readers import parse_yaml
 
 import custom_validators
+from schema_cache import load_schema
 
 
 class YamaleTree:
     """Class for building and storing unrolled yaml tree"""
 
-    def __init__(self, schema_file: Path):
-        self.schema = yamale.make_schema(
+    def __init__(self, schema_file: Path, expansions: Optional[Dict] = None):
+        """
+        Trees of schema files built together can share expansions, a dict
+        of the expanded includes by their signature
+        """
+        self.schema_file = schema_file
+        self.expansions = {} if expansions is None else expansions
+        self.external_includes: List[Path] = []
+        self.schema = load_schema(
             schema_file, validators=custom_validators.extend_validators
         )
         self.includes = self.schema.includes
@@ -24,49 +32,38 @@ class YamaleTree:
 
     def add_external_includes(self, *args: Path) -> None:
         """adds includes from external schemas"""
-        for external_include in args:
-            self._add_includes(external_include)
+        self.external_includes.extend(args)
+        self.schema = load_schema(
+            self.schema_file,
+            *self.external_includes,
+            validators=custom_validators.extend_validators,
+        )
 
         # update includes and tree with the new information
         self.includes = self.schema.includes
         self.tree = deepcopy(self.schema.dict)
 
-    def _add_includes(self, external_include: Path) -> None:
-        """
-        Helper function to extract includes from all documents
-        within a multi document yamale schema
-        """
-        includes = parse_yaml(external_include)
-        for include in includes:
-            self.schema.add_include(include)
-
     def build(self):
         """
-        Expands the tree from the initially supplied schema by passing it
-        iteratively to _construct_tree until it no longer changes
+        Expands the tree from the initially supplied schema in a single pass,
+        replacing includes by their expanded content. Every include is
+        expanded once and reused wherever it occurs, and by the other trees
+        sharing the expansions.
         """
-        while True:
-            old_tree_string = str(deepcopy(self.tree))
-            self._construct_tree(self.tree)
-            new_tree_string = str(self.tree)
-            if old_tree_string == new_tree_string:
-                break
+        self._signatures: Dict[str, str] = {}
+        self.tree = self._expand_map(self.tree, ())
 
     def write(self, path):
         """
         Collects annotations, sets indentation levels and writes the unrolled
         yaml tree to the supplied file path
         """
-        tree_lines = ""
-        for key, value, level in self._walk_tree(self.tree):
-            indentation = "  |  " * level
-            summary = self._value_summary(value)
-            line = f"{indentation} {key}"
-            line = f'{line} {(90 - len(line)) * " "} {summary} "\n"'
-            tree_lines += line
-
         with open(path, "w") as f:
-            f.write(tree_lines)
+            for key, value, level in self._walk_tree(self.tree):
+                indentation = "  |  " * level
+                summary = self._value_summary(value)
+                line = f"{indentation} {key}"
+                f.write(f'{line} {(90 - len(line)) * " "} {summary} "\n"')
 
     @staticmethod
     def _value_summary(value) -> Tuple[str, str, List[str], dict]:
@@ -105,73 +102,117 @@ class YamaleTree:
                     if isinstance(arg, dict):
                         yield from self._walk_tree(arg, level=level + 1)
 
-    def _get_include(self, value, att="dict"):
-        """Helper function to extract the content of a yamale include"""
-        if att == "dict":
-            return self.includes[value.include_name].dict
-        elif att == "_schema":
-            return self.includes[value.include_name]._schema
-        elif att == "choose":
-            return self._from_choose(value)
-        else:
-            return
-
-    def _from_choose(self, value, tree=None):
-        if tree is None:
-            tree = {}
-        value = yamale.make_schema(
-            content=f"tmp: {value}", validators=custom_validators.extend_validators
-        )
-        value = value.dict["tmp"]
-        tree.update(deepcopy(self.includes[value.base_schema.include_name].dict))
-        for v in value.detailed_schemas.values():
-            inc = self.includes[v.include_name].dict
-            if not isinstance(inc, str):
-                tree.update(inc)
-            else:
-                self._from_choose(inc, tree)
-        return tree
+    def _signature(self, name: str, stack: Tuple[str, ...] = ()) -> str:
+        """
+        Hash of the definition of an include and of the includes it refers
+        to, includes with the same signature have the same expansion
+        """
+        signature = self._signatures.get(name)
+        if signature is None:
+            if name in stack:
+                # cycles are reported by the expansion
+                return name
+            include = self.includes[name]
+            node = include._schema if isinstance(include.dict, str) else include.dict
+            digest = hashlib.sha1(repr(include.dict).encode())
+            for referenced in sorted(set(_referenced_includes(node))):
+                digest.update(self._signature(referenced, stack + (name,)).encode())
+            signature = self._signatures[name] = digest.hexdigest()
+        return signature
 
-    def _construct_tree(self, tree):
+    def _memoized(self, kind: str, name: str, stack: Tuple[str, ...], expand):
+        """Expansion of an include, computed once per kind and signature"""
+        if name in stack:
+            cycle = " -> ".join(stack[stack.index(name) :] + (name,))
+            raise ValueError(f"Include cycle in {self.schema_file}: {cycle}")
+        key = (kind, name, self._signature(name))
+        if key not in self.expansions:
+            self.expansions[key] = expand(stack + (name,))
+        return self.expansions[key]
+
+    def _expand_map(self, tree: dict, stack: Tuple[str, ...]) -> dict:
+        return {key: self._expand_value(value, stack) for key, value in tree.items()}
+
+    def _expand_value(self, value, stack: Tuple[str, ...]):
         """
-        Helper function that finds include objects and replaces them with the
-        object it references. This is where the actual unrolling of the yamale
-        schema happens
+        Expands a value of a map: includes of maps are replaced by the map,
+        other includes (e.g. of a choose) by their validator
         """
-        for (
-            key,
-            value,
-        ) in tree.items():
-            if isinstance(value, dict):
-                self._construct_tree(value)
+        if isinstance(value, dict):
+            return self._expand_map(value, stack)
+        if isinstance(value, validators.Include):
+            name = value.include_name
+            include = self.includes[name]
+            if isinstance(include.dict, str):
+                return self._memoized(
+                    "validator",
+                    name,
+                    stack,
+                    lambda inner: self._expand_value(include._schema, inner),
+                )
+            return self._memoized(
+                "map", name, stack, lambda inner: self._expand_map(include.dict, inner)
+            )
+        if isinstance(value, validators.List) and value.args:
+            return value.__class__(
+                *(self._expand_item(arg, stack) for arg in value.args)
+            )
+        return value
 
-            elif isinstance(value, validators.Include):
-                ## debugging
-                # print(f'direct: {key}')
-                include = self._get_include(value)
-                if isinstance(include, str):
-                    include = self._get_include(value, "_schema")
-                tree.update({key: include})
+    def _expand_item(self, value, stack: Tuple[str, ...]):
+        """
+        Expands an item validator of a list: a choose is replaced by the union
+        of the fields of its base and detailed schemas
+        """
+        if isinstance(value, dict):
+            return self._expand_map(value, stack)
+        if not isinstance(value, validators.Include):
+            return value
+        name = value.include_name
+        include = self.includes[name]
+        if isinstance(include.dict, str):
+            return self._memoized(
+                "choose",
+                name,
+                stack,
+                lambda inner: self._expand_map(
+                    self._choose_fields(include._schema), inner
+                ),
+            )
+        return self._memoized(
+            "map", name, stack, lambda inner: self._expand_map(include.dict, inner)
+        )
 
-            elif isinstance(value, validators.List):
-                includes = []
-                value_class = value.__class__
-                for arg in value.args:
-                    include = arg
-                    if isinstance(arg, validators.Include):
-                        ## debugging
-                        # print(f'list: {key}')
-                        include = self._get_include(arg)
-                    elif isinstance(arg, dict):
-                        self._construct_tree(arg)
-                    # choose validator ends up being of type str
-                    elif isinstance(arg, str):
-                        include = self._get_include(arg, "choose")
-                    includes.append(include)
-                if includes:
-                    tree.update({key: value_class(*includes)})
+    def _choose_fields(self, choose: custom_validators.Choose, tree=None) -> dict:
+        """Fields of the base and all detailed schemas of a choose validator"""
+        if not isinstance(choose, custom_validators.Choose):
+            raise ValueError(f"Cannot unroll {choose} in {self.schema_file}")
+        if tree is None:
+            tree = {}
+        tree.update(self.includes[choose.base_schema.include_name].dict)
+        for detailed_schema in choose.detailed_schemas.values():
+            include = self.includes[detailed_schema.include_name]
+            if isinstance(include.dict, str):
+                self._choose_fields(include._schema, tree)
             else:
-                continue
+                tree.update(include.dict)
+        return tree
+
+
+def _referenced_includes(node) -> Iterator[str]:
+    """Names of the includes a schema node refers to"""
+    if isinstance(node, dict):
+        for value in node.values():
+            yield from _referenced_includes(value)
+    elif isinstance(node, validators.Include):
+        yield node.include_name
+    elif isinstance(node, custom_validators.Choose):
+        yield node.base_schema.include_name
+        for include in node.detailed_schemas.values():
+            yield include.include_name
+    elif isinstance(node, yamale.validators.Validator):
+        for arg in node.args:
+            yield from _referenced_includes(arg)
 
 
 def new_filename(file):
@@ -211,18 +252,30 @@ def _mk_arg_parser() -> ArgumentParser:
     return parser
 
 
-def main():
-    args = _mk_arg_parser().parse_args()
-    for path in args.schema_files:
-        yt = YamaleTree(path)
-        if args.includes:
-            yt.add_external_includes(*args.includes)
+def unroll_files(
+    schema_files: List[Path],
+    output_folder: Optional[Path] = None,
+    includes: List[Path] = (),
+) -> None:
+    """Writes the unrolled tree of every schema file"""
+    # includes shared by the schema files (e.g. general parameters) are only
+    # expanded once
+    expansions = {}
+    for path in schema_files:
+        yt = YamaleTree(path, expansions)
+        if includes:
+            yt.add_external_includes(*includes)
         yt.build()
         parent, name = new_filename(path)
-        if args.output_folder:
-            parent = args.output_folder
+        if output_folder:
+            parent = output_folder
         yt.write(parent.joinpath(name))
 
 
+def main():
+    args = _mk_arg_parser().parse_args()
+    unroll_files(args.schema_files, args.output_folder, args.includes)
+
+
 if __name__ == "__main__":
     main()
@@ -1,24 +1,58 @@
 #!/usr/bin/env python3
 
 import json
+import sys
+from argparse import ArgumentParser
+from glob import glob
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import yamale
 from yamale.readers import parse_yaml
 
-from custom_validators import current_schema, extend_validators
+from custom_validators import bind_vocabularies, extend_validators, is_valid
+from json_records import from_json
+from link_index import build_link_index, check_links
+from schema_cache import load_schema
+from schema_compiler import CompiledSchema
+from validation_cache import (
+    DEFAULT_MAX_ENTRIES,
+    ValidationCache,
+    record_hash,
+    schema_fingerprint,
+)
+from validation_profiler import ValidationProfiler
+from vocabulary_index import load_indexes, update_indexes
 
-PATH_TO_SCHEMAS = Path("../models/values-only/")
-PATH_TO_TEST_DATA = Path("../metadata-examples/")
+PATH_TO_SCHEMAS = Path(__file__).parent.parent / "models" / "values-only"
+PATH_TO_TEST_DATA = Path(__file__).parent.parent / "metadata-examples"
+GENERAL_PARAMETERS = "general_parameters.yaml"
+
+# resource type of a record (general_parameters.record_information.resource_type)
+# mapped to the schema file of the technique
+TECHNIQUE_SCHEMAS = {
+    "BLI": "BLI.yaml",
+    "ITC": "ITC.yaml",
+    "MST": "MST.yaml",
+    "SPR": "SPR.yaml",
+}
+RECORD_SUFFIXES = (".yaml", ".yml", ".json")
+
+# technique schemas of a batch worker process, built once by _init_worker
+_worker_schemas: Dict[str, Union[yamale.schema.Schema, CompiledSchema]] = {}
+# validation cache of a batch worker process and schema fingerprints by technique
+_worker_cache: Dict[str, ValidationCache] = {}
+_worker_fingerprints: Dict[str, str] = {}
+# validate_record or screen_record, set by _init_worker
+_worker_validate: Dict[str, Callable] = {}
 
 
 def merged_schema(
     method_specific: Path, *additional_includes: Path, validators=extend_validators
 ) -> yamale.schema.Schema:
-    schema = yamale.make_schema(method_specific, validators=validators)
-    for path in additional_includes:
-        add_includes(path, schema)
-    return schema
+    return load_schema(method_specific, *additional_includes, validators=validators)
 
 
 def add_includes(path: Path, schema: yamale.schema.Schema) -> None:
@@ -27,20 +61,404 @@ def add_includes(path: Path, schema: yamale.schema.Schema) -> None:
         schema.add_include(doc)
 
 
-def main():
-    general_param_file_name = PATH_TO_SCHEMAS.joinpath("general_parameters.yaml")
+def technique_schemas(
+    schema_folder: Path = PATH_TO_SCHEMAS,
+) -> Dict[str, yamale.schema.Schema]:
+    """Builds the merged schema of every supported technique"""
+    general_parameters = schema_folder.joinpath(GENERAL_PARAMETERS)
+    return {
+        technique: merged_schema(schema_folder.joinpath(file_name), general_parameters)
+        for technique, file_name in TECHNIQUE_SCHEMAS.items()
+    }
+
+
+def validation_schemas(
+    schema_folder: Path = PATH_TO_SCHEMAS,
+    vocabulary_folder: Optional[Path] = None,
+    compiled: bool = True,
+) -> Dict[str, Union[yamale.schema.Schema, CompiledSchema]]:
+    """
+    Technique schemas for validate_record, checking vocabulary ids against the
+    fixtures of vocabulary_folder if given and compiled unless compiled is False
+    """
+    schemas = technique_schemas(schema_folder)
+    if vocabulary_folder is not None:
+        indexes = load_indexes(vocabulary_folder)
+        for schema in schemas.values():
+            bind_vocabularies(schema, indexes)
+    if compiled:
+        schemas = {
+            technique: CompiledSchema(schema) for technique, schema in schemas.items()
+        }
+    return schemas
+
+
+def find_technique(record) -> str:
+    """Returns the technique of a record from its resource type"""
+    try:
+        technique = record["general_parameters"]["record_information"]["resource_type"]
+    except (KeyError, TypeError):
+        raise ValueError(
+            "Record has no general_parameters.record_information.resource_type"
+        )
+    if technique not in TECHNIQUE_SCHEMAS:
+        raise ValueError(f"Unsupported technique '{technique}'")
+    return technique
+
+
+def find_records(*patterns: str) -> List[Path]:
+    """
+    Expands directories (recursively) and glob patterns to a sorted list of
+    record files
+    """
+    files = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = path.rglob("*")
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = map(Path, glob(pattern, recursive=True))
+        files.update(p for p in candidates if p.suffix in RECORD_SUFFIXES)
+    return sorted(files)
+
+
+def load_records(path: Path) -> List[dict]:
+    """
+    Loads all records from a YAML (possibly multi document) or JSON file. An
+    Invenio fixture, i.e. a list of {"metadata": record}, is unwrapped.
+    """
+    if path.suffix == ".json":
+        with open(path) as f:
+            docs = json.load(f)
+        if not isinstance(docs, list):
+            docs = [docs]
+    else:
+        docs = [d for d, _ in yamale.make_data(path)]
+
+    return [
+        d["metadata"] if isinstance(d, dict) and "metadata" in d else d for d in docs
+    ]
+
+
+def record_from_json(
+    record, schemas: Dict[str, Union[yamale.schema.Schema, CompiledSchema]]
+):
+    """
+    A record loaded from JSON as it would be loaded from YAML (see
+    json_records.from_json), records of no supported technique are unchanged
+    """
+    try:
+        schema = schemas[find_technique(record)]
+    except ValueError:
+        return record
+    if isinstance(schema, CompiledSchema):
+        schema = schema.schema
+    return from_json(schema, record)
+
+
+def validate_record(
+    record, schemas: Dict[str, Union[yamale.schema.Schema, CompiledSchema]]
+) -> List[str]:
+    """
+    Validates a record against the (possibly compiled) schema of its
+    technique, including the integrity of its links, and returns the errors
+    """
+    try:
+        schema = schemas[find_technique(record)]
+        if isinstance(schema, CompiledSchema):
+            errors = schema.validate(record)
+            schema = schema.schema
+        else:
+            (result,) = yamale.validate(schema, [(record, None)], _raise_error=False)
+            errors = result.errors
+        return errors + check_links(schema, record)
+    except Exception as e:
+        return [f"{type(e).__name__}: {e}"]
+
+
+def is_record_valid(
+    record, schemas: Dict[str, Union[yamale.schema.Schema, CompiledSchema]]
+) -> bool:
+    """
+    Whether validate_record would return no errors. Interpreted and compiled
+    schemas alike stop at the first error and format no error messages.
+    """
+    try:
+        schema = schemas[find_technique(record)]
+        if isinstance(schema, CompiledSchema):
+            valid = schema.is_valid(record)
+            schema = schema.schema
+        else:
+            valid = is_valid(schema, record)
+        return valid and build_link_index(schema, record).is_valid()
+    except Exception:
+        return False
+
+
+def screen_record(
+    record, schemas: Dict[str, Union[yamale.schema.Schema, CompiledSchema]]
+) -> List[str]:
+    """
+    Same as validate_record, but the errors are only collected for records
+    rejected by is_record_valid, which is faster if most records are valid
+    """
+    if is_record_valid(record, schemas):
+        return []
+    return validate_record(record, schemas)
+
+
+def technique_fingerprints(
+    schema_folder: Path = PATH_TO_SCHEMAS, vocabulary_folder: Optional[Path] = None
+) -> Dict[str, str]:
+    """Fingerprints of the schema files of every supported technique"""
+    general_parameters = schema_folder.joinpath(GENERAL_PARAMETERS)
+    return {
+        technique: schema_fingerprint(
+            (schema_folder.joinpath(file_name), general_parameters), vocabulary_folder
+        )
+        for technique, file_name in TECHNIQUE_SCHEMAS.items()
+    }
+
+
+def validate_cached(
+    record,
+    schemas: Dict[str, Union[yamale.schema.Schema, CompiledSchema]],
+    cache: ValidationCache,
+    fingerprints: Dict[str, str],
+    validate: Callable = validate_record,
+) -> Tuple[List[str], bool]:
+    """
+    validate (validate_record or screen_record), returning the errors stored
+    in the cache for records already validated against the same schema files.
+    Returns the errors and whether they came from the cache.
+    """
+    try:
+        fingerprint = fingerprints[find_technique(record)]
+    except ValueError:
+        return validate(record, schemas), False
+    key = record_hash(record)
+    errors = cache.get(fingerprint, key)
+    if errors is not None:
+        return errors, True
+    errors = validate(record, schemas)
+    cache.put(fingerprint, key, errors)
+    return errors, False
+
+
+def _init_worker(
+    schema_folder: Path,
+    vocabulary_folder: Optional[Path],
+    compiled: bool,
+    cache_path: Optional[Path],
+    cache_size: int,
+    fast_reject: bool = False,
+    validate: Optional[Callable] = None,
+) -> None:
+    """Builds all technique schemas (and opens the cache) once per worker process"""
+    if validate is None:
+        validate = screen_record if fast_reject else validate_record
+    _worker_validate["validate"] = validate
+    if cache_path is not None:
+        _worker_cache["cache"] = ValidationCache(cache_path, cache_size)
+        _worker_fingerprints.update(
+            technique_fingerprints(schema_folder, vocabulary_folder)
+        )
+    _worker_schemas.update(
+        validation_schemas(schema_folder, vocabulary_folder, compiled)
+    )
+
+
+def _validate_records(
+    records: List, from_json: bool = False
+) -> List[Tuple[List[str], Optional[bool]]]:
+    """
+    Validates records (loaded from JSON if from_json) within a worker process,
+    returns the errors and whether they came from the cache (None without
+    cache) of every record
+    """
+    cache = _worker_cache.get("cache")
+    validate = _worker_validate["validate"]
+    if from_json:
+        records = [record_from_json(record, _worker_schemas) for record in records]
+    if cache is None:
+        return [(validate(record, _worker_schemas), None) for record in records]
+    return [
+        validate_cached(record, _worker_schemas, cache, _worker_fingerprints, validate)
+        for record in records
+    ]
+
+
+def _validate_file(path: Path) -> List[Tuple[str, List[str], Optional[bool]]]:
+    """
+    Validates every record of a file within a worker process, returns the
+    name, errors and whether they came from the cache (None without cache) of
+    every record
+    """
+    try:
+        records = load_records(path)
+    except Exception as e:
+        return [(str(path), [f"{type(e).__name__}: {e}"], None)]
+
+    return [
+        (str(path) if len(records) == 1 else f"{path}[{i}]", errors, hit)
+        for i, (errors, hit) in enumerate(
+            _validate_records(records, path.suffix == ".json")
+        )
+    ]
+
+
+def validate_batch(
+    paths: List[Path],
+    schema_folder: Path = PATH_TO_SCHEMAS,
+    workers=None,
+    vocabulary_folder: Optional[Path] = None,
+    compiled: bool = True,
+    cache: Optional[ValidationCache] = None,
+    fast_reject: bool = False,
+    validate: Optional[Callable] = None,
+) -> Iterator[Tuple[str, List]]:
+    """
+    Validates the records of all paths in a process pool and yields
+    (record name, errors) in the order of the paths. With a vocabulary_folder
+    the ids of vocabulary items must be in the fixtures of that folder. The
+    schemas are compiled to Python code unless compiled is False. With a
+    cache, the workers look up and store errors in its file and its hit and
+    miss counters are updated. With fast_reject, records are screened by
+    is_record_valid and only the errors of rejected records are collected.
+    validate(record, schemas), a module level function sent to the workers,
+    replaces validate_record, e.g. error_report.collect_record_errors. With 0
+    workers the records are validated in this process, e.g. to profile them.
+    """
+    initargs = (
+        schema_folder,
+        vocabulary_folder,
+        compiled,
+        cache.path if cache is not None else None,
+        cache.max_entries if cache is not None else DEFAULT_MAX_ENTRIES,
+        fast_reject,
+        validate,
+    )
+    if workers == 0:
+        _init_worker(*initargs)
+        yield from _count_hits(map(_validate_file, paths), cache)
+        return
+
+    if vocabulary_folder is not None:
+        update_indexes(vocabulary_folder)
+
+    workers = workers or cpu_count()
+    # a few chunks per worker keeps the pool balanced without per-record IPC
+    chunksize = max(1, len(paths) // (workers * 4))
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from _count_hits(
+            pool.imap(_validate_file, paths, chunksize=chunksize), cache
+        )
+
+
+def _count_hits(
+    file_results: Iterator[List[Tuple[str, List[str], Optional[bool]]]],
+    cache: Optional[ValidationCache],
+) -> Iterator[Tuple[str, List[str]]]:
+    """Yields the results of _validate_file counting the cache hits and misses"""
+    for results in file_results:
+        for name, errors, hit in results:
+            if hit is not None:
+                if hit:
+                    cache.hits += 1
+                else:
+                    cache.misses += 1
+            yield name, errors
+
+
+def run_batch(
+    patterns: List[str],
+    schema_folder: Path,
+    workers=None,
+    vocabulary_folder: Optional[Path] = None,
+    compiled: bool = True,
+    cache_path: Optional[Path] = None,
+    cache_size: int = DEFAULT_MAX_ENTRIES,
+    profile_path: Optional[Path] = None,
+    fast_reject: bool = False,
+) -> int:
+    """
+    Validates all records matched by patterns, prints a report and returns the
+    exit code. With a profile_path the records are validated by the
+    interpreter in this process and the validation profile is printed and
+    written to profile_path.
+    """
+    paths = find_records(*patterns)
+    if not paths:
+        print(f"No records found in {' '.join(patterns)}", file=sys.stderr)
+        return 2
+
+    cache = ValidationCache(cache_path, cache_size) if cache_path else None
+    profiler = None
+    if profile_path is not None:
+        workers, compiled = 0, False
+        profiler = ValidationProfiler()
+        profiler.enable()
+
+    n_records = 0
+    n_failed = 0
+    start = perf_counter()
+    for name, errors in validate_batch(
+        paths, schema_folder, workers, vocabulary_folder, compiled, cache, fast_reject
+    ):
+        n_records += 1
+        if errors:
+            n_failed += 1
+            print(f"FAIL {name}")
+            for error in errors:
+                # the errors of a choose span several lines
+                print("    " + error.replace("\n", "\n        "))
+        else:
+            print(f"PASS {name}")
+    elapsed = perf_counter() - start
+    if profiler is not None:
+        profiler.disable()
+        print(f"\n{profiler.report()}")
+        profiler.dump_json(profile_path)
+
+    print(
+        f"\n{n_records} records validated in {elapsed:.2f} s "
+        f"({n_records / elapsed:.1f} records/s): "
+        f"{n_records - n_failed} passed, {n_failed} failed"
+    )
+    if cache is not None:
+        evicted = cache.evict()
+        print(
+            f"Validation cache {cache.path}: {cache.hits} hits, {cache.misses} misses, "
+            f"{len(cache)} records ({evicted} evicted)"
+        )
+        cache.close()
+    return 1 if n_failed else 0
+
+
+def validate_test_data(
+    schema_folder: Path = PATH_TO_SCHEMAS, examples_folder: Path = PATH_TO_TEST_DATA
+) -> None:
+    """
+    Validates the metadata examples of every technique and converts them to
+    JSON records (Invenio fixtures)
+    """
+    general_param_file_name = schema_folder.joinpath(GENERAL_PARAMETERS)
 
     file_names = ("MST.yaml", "BLI.yaml", "SPR.yaml", "ITC.yaml")
 
     for file_name in file_names:
         # Validate file
         schema = merged_schema(
-            PATH_TO_SCHEMAS.joinpath(file_name), general_param_file_name
+            schema_folder.joinpath(file_name), general_param_file_name
         )
-        current_schema.schema = schema
-        full_test_path = PATH_TO_TEST_DATA.joinpath(file_name)
+        full_test_path = examples_folder.joinpath(file_name)
         test_data = yamale.make_data(full_test_path)
         yamale.validate(schema, test_data)
+        link_errors = check_links(schema, test_data[0][0])
+        if link_errors:
+            raise ValueError(f"{full_test_path}\n" + "\n".join(link_errors))
 
         # Convert to JSON record, note that an array is needed to load it as an Invenio fixture.
         metadata_with_header = [{"metadata": test_data[0][0]}]
@@ -52,5 +470,94 @@ def main():
             json_out.write(json_metadata)
 
 
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Validate the metadata examples or, in batch mode, deposited records"
+    )
+    parser.add_argument(
+        "records",
+        nargs="*",
+        help="Directories, files or glob patterns of YAML/JSON records to validate "
+        "in batch mode. Without records the metadata examples are validated "
+        "and converted to JSON",
+    )
+    parser.add_argument(
+        "--schema-folder",
+        type=Path,
+        default=PATH_TO_SCHEMAS,
+        help="Folder containing the values-only technique schemas",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes used in batch mode (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--vocabularies",
+        type=Path,
+        default=None,
+        help="Folder of vocabulary fixtures (e.g. vocabularies/generated_vocabularies) "
+        "whose ids the vocabulary items of the records must be in",
+    )
+    parser.add_argument(
+        "--interpreted",
+        action="store_true",
+        help="Validate batches with the Yamale interpreter instead of the "
+        "schemas compiled by schema_compiler.py",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="SQLite file caching the errors of already validated records in "
+        "batch mode, keyed by the record and the schema files",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="Maximum number of records in the cache, least recently used "
+        "records are evicted first",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        help="Profile the validation by schema path and validator type, print "
+        "the slowest ones and write the whole profile to this JSON file. The "
+        "records are validated by the interpreter in a single process",
+    )
+    parser.add_argument(
+        "--fast-reject",
+        action="store_true",
+        help="Screen records with a check stopping at the first error and "
+        "collect the errors of rejected records only, faster if most records "
+        "are valid",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    if args.records:
+        sys.exit(
+            run_batch(
+                args.records,
+                args.schema_folder,
+                args.workers,
+                args.vocabularies,
+                not args.interpreted,
+                args.cache,
+                args.cache_size,
+                args.profile,
+                args.fast_reject,
+            )
+        )
+
+    validate_test_data(args.schema_folder)
+
+
 if __name__ == "__main__":
     main()
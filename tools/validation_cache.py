@@ -0,0 +1,148 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from custom_validators import extend_validators
+from module_sources import module_sources
+from schema_cache import schema_key
+
+DEFAULT_MAX_ENTRIES = 100_000
+# modules whose code decides a verdict besides the validators: the link check
+# of validate_record, the compiled schemas and the id checks
+VERDICT_MODULES = tuple(
+    Path(__file__).parent / f"{module}.py"
+    for module in ("link_index", "schema_compiler", "identifiers")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT NOT NULL,
+    record_hash TEXT NOT NULL,
+    errors TEXT NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (fingerprint, record_hash)
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def _tagged(value):
+    """JSON form of values JSON has no type for, e.g. dates of day() fields"""
+    return {"__type__": type(value).__name__, "value": str(value)}
+
+
+def record_hash(record) -> str:
+    """
+    Hash of the canonical JSON form of a record: keys are sorted, so it does
+    not depend on their order, while types are kept apart (1, 1.0, True, "1"
+    and a date and its string all hash differently)
+    """
+    canonical = json.dumps(
+        record,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_tagged,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def schema_fingerprint(
+    schema_files: Iterable[Path],
+    vocabulary_folder: Optional[Path] = None,
+    validators=extend_validators,
+    modules: Iterable[Path] = VERDICT_MODULES,
+) -> str:
+    """
+    Fingerprint of everything a verdict depends on: the contents of the schema
+    files, the validator set, the sources of modules and of the tool modules
+    they import and, if ids are checked against vocabulary fixtures, their size
+    and modification time
+    """
+    sources = [Path(schema_file).read_bytes() for schema_file in schema_files]
+    module_files = {source for module in modules for source in module_sources(module)}
+    sources.extend(module_file.read_bytes() for module_file in sorted(module_files))
+    if vocabulary_folder is not None:
+        for fixture in sorted(Path(vocabulary_folder).glob("*.yaml")):
+            stat = fixture.stat()
+            sources.append(f"{fixture.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return schema_key(*sources, validators=validators)
+
+
+class ValidationCache:
+    """
+    Persistent cache of validation errors in a SQLite file, keyed by the
+    fingerprint of the schema and the hash of the record. Least recently used
+    entries are evicted once there are more than max_entries, which is checked
+    on every tenth of max_entries stores and by evict().
+
+    Several processes may use the same file at once, e.g. the workers of
+    validate_examples.py, each with its own ValidationCache.
+    """
+
+    def __init__(self, path: Path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, fingerprint: str, record_hash: str) -> Optional[List[str]]:
+        """Returns the stored errors of a record ([] if valid) or None"""
+        row = self._db.execute(
+            "SELECT errors FROM results WHERE fingerprint = ? AND record_hash = ?",
+            (fingerprint, record_hash),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE results SET last_used = ? WHERE fingerprint = ? AND record_hash = ?",
+            (time.time_ns(), fingerprint, record_hash),
+        )
+        return json.loads(row[0])
+
+    def put(self, fingerprint: str, record_hash: str, errors: List[str]) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (fingerprint, record_hash, json.dumps(errors), time.time_ns()),
+        )
+        self._stores += 1
+        if self._stores % max(1, self.max_entries // 10) == 0:
+            self.evict()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def evict(self) -> int:
+        """Removes the least recently used entries above max_entries, returns how many"""
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self._db.execute(
+            "DELETE FROM results WHERE rowid IN "
+            "(SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        return excess
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
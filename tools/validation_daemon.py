@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import math
+import sys
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from multiprocessing import cpu_count
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from validate_examples import PATH_TO_SCHEMAS, _init_worker, _validate_records
+from validation_cache import DEFAULT_MAX_ENTRIES
+from vocabulary_index import update_indexes
+
+MAX_BATCH = 64
+MAX_BODY = 64 << 20
+# latencies of the last requests the percentiles are computed from
+LATENCY_WINDOW = 10000
+QUANTILES = (0.5, 0.9, 0.99)
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class _HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Metrics:
+    """Counters of a validation service, exposed in the Prometheus text format"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.records = 0
+        self.invalid_records = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency_sum = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, latency: float) -> None:
+        self.requests += 1
+        self.latency_sum += latency
+        self.latencies.append(latency)
+
+    def quantile(self, q: float) -> float:
+        if not self.latencies:
+            return math.nan
+        ranked = sorted(self.latencies)
+        return ranked[min(len(ranked) - 1, int(q * len(ranked)))]
+
+    def prometheus(self) -> str:
+        lines = []
+        for name, kind, help_text, value in (
+            ("requests_total", "counter", "Validation requests", self.requests),
+            ("request_errors_total", "counter", "Failed requests", self.errors),
+            ("records_total", "counter", "Validated records", self.records),
+            (
+                "invalid_records_total",
+                "counter",
+                "Records with errors",
+                self.invalid_records,
+            ),
+            ("cache_hits_total", "counter", "Validation cache hits", self.cache_hits),
+            (
+                "cache_misses_total",
+                "counter",
+                "Validation cache misses",
+                self.cache_misses,
+            ),
+        ):
+            lines.append(f"# HELP mbdb_validation_{name} {help_text}")
+            lines.append(f"# TYPE mbdb_validation_{name} {kind}")
+            lines.append(f"mbdb_validation_{name} {value}")
+
+        name = "mbdb_validation_request_latency_seconds"
+        lines.append(f"# HELP {name} Latency of validation requests")
+        lines.append(f"# TYPE {name} summary")
+        for q in QUANTILES:
+            lines.append(f'{name}{{quantile="{q}"}} {self.quantile(q)}')
+        lines.append(f"{name}_sum {self.latency_sum}")
+        lines.append(f"{name}_count {self.requests}")
+        return "\n".join(lines) + "\n"
+
+
+class ValidationService:
+    """
+    Validates records with the technique schemas preloaded in a pool of worker
+    processes (or in a thread of this process with 0 workers). Records of
+    requests arriving together are validated in shared batches, so a worker
+    call validates many records and large requests are spread over the pool.
+    """
+
+    def __init__(
+        self,
+        schema_folder: Path = PATH_TO_SCHEMAS,
+        workers: Optional[int] = None,
+        vocabulary_folder: Optional[Path] = None,
+        compiled: bool = True,
+        cache_path: Optional[Path] = None,
+        cache_size: int = DEFAULT_MAX_ENTRIES,
+        fast_reject: bool = False,
+        max_batch: int = MAX_BATCH,
+    ):
+        initargs = (
+            schema_folder,
+            vocabulary_folder,
+            compiled,
+            cache_path,
+            cache_size,
+            fast_reject,
+        )
+        if workers == 0:
+            self.workers = 1
+            self.executor: Executor = ThreadPoolExecutor(
+                1, initializer=_init_worker, initargs=initargs
+            )
+        else:
+            self.workers = workers or cpu_count()
+            if vocabulary_folder is not None:
+                # built once here, a failing initializer would break the pool
+                update_indexes(vocabulary_folder)
+            self.executor = ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=initargs
+            )
+        self.max_batch = max_batch
+        self.metrics = Metrics()
+        self._pending: List[Tuple[object, asyncio.Future]] = []
+        self._flush_scheduled = False
+
+    def close(self) -> None:
+        self.executor.shutdown()
+
+    async def warm_up(self) -> None:
+        """Waits until every worker has built its schemas"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, _validate_records, [])
+                for _ in range(self.workers)
+            )
+        )
+
+    async def validate(self, records: List) -> List[List[str]]:
+        """
+        Errors of every record decoded from JSON, which is validated in its
+        YAML form (see validate_examples.record_from_json)
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in records]
+        self._pending.extend(zip(records, futures))
+        if not self._flush_scheduled:
+            # records of all requests read in this iteration of the loop are
+            # batched together
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        results = await asyncio.gather(*futures)
+
+        for errors, hit in results:
+            self.metrics.records += 1
+            self.metrics.invalid_records += bool(errors)
+            if hit is not None:
+                if hit:
+                    self.metrics.cache_hits += 1
+                else:
+                    self.metrics.cache_misses += 1
+        return [errors for errors, _ in results]
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        size = max(1, min(self.max_batch, math.ceil(len(pending) / self.workers)))
+        loop = asyncio.get_running_loop()
+        for i in range(0, len(pending), size):
+            batch = pending[i : i + size]
+            future = loop.run_in_executor(
+                self.executor, _validate_records, [record for record, _ in batch], True
+            )
+            future.add_done_callback(partial(self._resolve, batch))
+
+    @staticmethod
+    def _resolve(batch, future) -> None:
+        if future.exception() is not None:
+            for _, record_future in batch:
+                if not record_future.done():
+                    record_future.set_exception(future.exception())
+            return
+        for (_, record_future), result in zip(batch, future.result()):
+            if not record_future.done():
+                record_future.set_result(result)
+
+    # HTTP
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves the HTTP/1.1 requests of a (keep-alive) connection"""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except _HttpError as e:
+                    _write_response(writer, e.status, {"error": str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self.dispatch(method, target, body)
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, body: bytes):
+        path = target.split("?", 1)[0]
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "Use GET"}
+            return 200, self.metrics.prometheus()
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path != "/validate":
+            return 404, {"error": f"Unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+
+        start = perf_counter()
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            self.metrics.errors += 1
+            return 400, {"error": f"Invalid JSON: {e}"}
+        records = data if isinstance(data, list) else [data]
+        records = [
+            r["metadata"] if isinstance(r, dict) and "metadata" in r else r
+            for r in records
+        ]
+        try:
+            errors = await self.validate(records)
+        except Exception as e:
+            self.metrics.errors += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        results = [{"valid": not e, "errors": e} for e in errors]
+        self.metrics.observe(perf_counter() - start)
+        return 200, results if isinstance(data, list) else results[0]
+
+
+async def _read_line(reader: asyncio.StreamReader, status: int, what: str) -> bytes:
+    """Next line of a request, an error with status if it exceeds the limit"""
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        raise _HttpError(status, f"{what} too long")
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """Method, target, headers and body of the next request, None at EOF"""
+    line = await _read_line(reader, 400, "Request line")
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise _HttpError(400, "Malformed request line")
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await _read_line(reader, 431, "Header line")
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    # a chunked body would otherwise be parsed as the next request
+    if "transfer-encoding" in headers:
+        raise _HttpError(411, "Send the body with a Content-Length, not chunked")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise _HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise _HttpError(413, f"Requests are limited to {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+def _write_response(writer, status: int, payload, keep_alive: bool) -> None:
+    if isinstance(payload, str):
+        body = payload.encode()
+        content_type = "text/plain; version=0.0.4"
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        content_type = "application/json"
+    writer.write(
+        (
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode()
+        + body
+    )
+
+
+async def serve(
+    service: ValidationService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[Path] = None,
+) -> None:
+    """Serves the validation API over TCP or, given a socket_path, a Unix socket"""
+    await service.warm_up()
+    if socket_path is not None:
+        server = await asyncio.start_unix_server(
+            service.handle_connection, path=str(socket_path)
+        )
+        address = socket_path
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        address = f"http://{host}:{port}"
+    print(f"Validating records at {address}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def _mk_arg_parser() -> ArgumentParser:
+    """Command line interface"""
+    parser = ArgumentParser(
+        description="Serve record validation over HTTP with warm schemas: POST a "
+        "record or a list of records to /validate, GET /metrics for Prometheus"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Listen on this Unix socket instead of TCP",
+    )
+    parser.add_argument(
+        "--schema-folder",
+        type=Path,
+        default=PATH_TO_SCHEMAS,
+        help="Folder containing the values-only technique schemas",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs, 0 validates "
+        "in a thread of the server process)",
+    )
+    parser.add_argument(
+        "--vocabularies",
+        type=Path,
+        default=None,
+        help="Folder of vocabulary fixtures whose ids the vocabulary items of the "
+        "records must be in",
+    )
+    parser.add_argument(
+        "--interpreted",
+        action="store_true",
+        help="Validate with the Yamale interpreter instead of compiled schemas",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="SQLite file caching the errors of already validated records",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help="Maximum number of records in the cache",
+    )
+    parser.add_argument(
+        "--fast-reject",
+        action="store_true",
+        help="Collect the errors of records rejected by a fast check only",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=MAX_BATCH,
+        help="Maximum number of records validated by a worker call",
+    )
+    return parser
+
+
+def main():
+    args = _mk_arg_parser().parse_args()
+    service = ValidationService(
+        args.schema_folder,
+        args.workers,
+        args.vocabularies,
+        not args.interpreted,
+        args.cache,
+        args.cache_size,
+        args.fast_reject,
+        args.max_batch,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import dataclasses
+import json
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from yamale.schema import Schema
+
+from custom_validators import Choose
+
+
+@dataclasses.dataclass
+class Stats:
+    """Calls of validators and their time, own time excludes nested validators"""
+
+    calls: int = 0
+    total: float = 0.0
+    own: float = 0.0
+
+
+def schema_path(path: Tuple) -> str:
+    """Path of a validated item with list indexes replaced by '*'"""
+    return ".".join("*" if isinstance(key, int) else str(key) for key in path)
+
+
+class ValidationProfiler:
+    """
+    Counts the calls and time of every validator called by the Yamale
+    interpreter (Schema._validate_primitive), by schema path and by validator
+    type. Nested validators are run by the choose validator itself with paths
+    relative to the choose node, which are made absolute again.
+
+    Only one profiler can be enabled at a time, and the compiled schemas of
+    schema_compiler.py are not profiled.
+
+    with ValidationProfiler() as profiler:
+        schema.validate(record, "", True)
+    print(profiler.report())
+    """
+
+    _enabled = None
+
+    def __init__(self):
+        self.by_path: Dict[str, Stats] = {}
+        self.by_validator: Dict[str, Stats] = {}
+        # path of the enclosing choose nodes and time spent in nested validators
+        self._prefix: List[Tuple] = [()]
+        self._nested: List[float] = [0.0]
+
+    def enable(self) -> None:
+        if ValidationProfiler._enabled is not None:
+            raise RuntimeError("A validation profiler is already enabled")
+        original = Schema._validate_primitive
+        profiler = self
+
+        def _validate_primitive(schema, validator, data, path):
+            return profiler._call(original, schema, validator, data, path)
+
+        ValidationProfiler._enabled = original
+        Schema._validate_primitive = _validate_primitive
+
+    def disable(self) -> None:
+        if ValidationProfiler._enabled is not None:
+            Schema._validate_primitive = ValidationProfiler._enabled
+            ValidationProfiler._enabled = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def _call(self, original, schema, validator, data, path):
+        full_path = self._prefix[-1] + tuple(path._path)
+        is_choose = isinstance(validator, Choose)
+        if is_choose:
+            self._prefix.append(full_path)
+        self._nested.append(0.0)
+        start = perf_counter()
+        try:
+            return original(schema, validator, data, path)
+        finally:
+            elapsed = perf_counter() - start
+            nested = self._nested.pop()
+            self._nested[-1] += elapsed
+            if is_choose:
+                self._prefix.pop()
+            for stats in (
+                self.by_path.setdefault(schema_path(full_path), Stats()),
+                self.by_validator.setdefault(type(validator).__name__, Stats()),
+            ):
+                stats.calls += 1
+                stats.total += elapsed
+                stats.own += elapsed - nested
+
+    def to_dict(self) -> dict:
+        def sorted_stats(stats: Dict[str, Stats]):
+            return {
+                name: dataclasses.asdict(s)
+                for name, s in sorted(stats.items(), key=lambda item: -item[1].own)
+            }
+
+        return {
+            "by_validator": sorted_stats(self.by_validator),
+            "by_path": sorted_stats(self.by_path),
+        }
+
+    def dump_json(self, path: Path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self, limit: int = 20) -> str:
+        """Validator types and the limit slowest paths, sorted by own time"""
+        lines = []
+        for title, stats in (
+            ("validator", self.by_validator),
+            ("schema path", self.by_path),
+        ):
+            lines.append(f"{'calls':>10} {'total s':>10} {'own s':>10}  {title}")
+            ranked = sorted(stats.items(), key=lambda item: -item[1].own)
+            for name, s in ranked[:limit]:
+                lines.append(
+                    f"{s.calls:>10} {s.total:>10.4f} {s.own:>10.4f}  {name or '<root>'}"
+                )
+            lines.append("")
+        return "\n".join(lines)
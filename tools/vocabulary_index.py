@@ -0,0 +1,140 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Dict, Iterable, Iterator
+
+import yaml
+
+# Index file layout (little endian):
+#   header   MAGIC, number of ids n
+#   offsets  n + 1 uint64 offsets of the ids within the blob
+#   blob     the UTF-8 encoded ids, sorted bytewise and deduplicated
+# Membership is a binary search directly on the memory mapped file, so opening
+# an index is instant and only the touched pages are ever read.
+MAGIC = b"MBDBVOC1"
+HEADER = struct.Struct("<8sQ")
+OFFSET = struct.Struct("<Q")
+INDEX_SUFFIX = ".idx"
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class VocabularyIndex:
+    """Sorted, memory mapped set of the ids of a vocabulary"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a vocabulary index")
+        self._offsets = HEADER.size
+        self._blob = HEADER.size + OFFSET.size * (self._count + 1)
+
+    def _key(self, i: int) -> bytes:
+        start, end = struct.unpack_from("<2Q", self._data, self._offsets + 8 * i)
+        return self._data[self._blob + start : self._blob + end]
+
+    def __contains__(self, vocabulary_id) -> bool:
+        key = str(vocabulary_id).encode()
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self._count and self._key(lo) == key
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._key(i).decode()
+
+    def __reduce__(self):
+        # reopened from its file when pickled, e.g. to a worker process
+        return type(self), (self.path,)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def close(self) -> None:
+        self._data.close()
+
+
+def write_index(ids: Iterable, index_path: Path) -> int:
+    """Writes the index of the ids and returns the number of distinct ids"""
+    keys = sorted({str(i).encode() for i in ids})
+    offsets = array("Q", [0])
+    end = 0
+    for key in keys:
+        end += len(key)
+        offsets.append(end)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    # a temporary file of its own, as several processes may build an index
+    index_path = Path(index_path)
+    with NamedTemporaryFile(dir=index_path.parent, delete=False) as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        f.write(offsets.tobytes())
+        for key in keys:
+            f.write(key)
+    os.replace(f.name, index_path)
+    return len(keys)
+
+
+def read_fixture_ids(fixture: Path) -> Iterator:
+    """Yields the ids of a vocabulary fixture written by generate_vocabularies.py"""
+    with open(fixture) as f:
+        for entry in yaml.load_all(f, Loader=_Loader):
+            if entry:
+                yield entry["id"]
+
+
+def index_path(fixture: Path) -> Path:
+    return Path(fixture).with_suffix(INDEX_SUFFIX)
+
+
+def update_index(fixture: Path) -> Path:
+    """
+    Returns the path of the index of a vocabulary fixture, which is (re)built
+    when it doesn't exist or is older than the fixture
+    """
+    fixture = Path(fixture)
+    path = index_path(fixture)
+    if not path.exists() or path.stat().st_mtime < fixture.stat().st_mtime:
+        write_index(read_fixture_ids(fixture), path)
+    return path
+
+
+def load_index(fixture: Path) -> VocabularyIndex:
+    """Returns the index of a vocabulary fixture, see update_index"""
+    return VocabularyIndex(update_index(fixture))
+
+
+def update_indexes(vocabulary_folder: Path) -> None:
+    """
+    (Re)builds the outdated indexes of a folder of vocabulary fixtures, e.g.
+    before starting worker processes which then only map them
+    """
+    for fixture in sorted(Path(vocabulary_folder).glob("*.yaml")):
+        update_index(fixture)
+
+
+def load_indexes(vocabulary_folder: Path) -> Dict[str, VocabularyIndex]:
+    """
+    Returns the indexes of all vocabulary fixtures in a folder by vocabulary
+    name, i.e. the file name of the fixture without suffix
+    """
+    return {
+        fixture.stem: load_index(fixture)
+        for fixture in sorted(Path(vocabulary_folder).glob("*.yaml"))
+    }
@@ -2,16 +2,16 @@ import copy
 import dataclasses
 import logging
 import re
+import sys
 from collections import namedtuple
 from io import StringIO
 from pathlib import Path
+from time import perf_counter
 from typing import Any, Dict, Union
 
 import click
-import ruamel
+import ruamel.yaml
 import yamale
-from ruamel.yaml import YAML as ruamel_YAML
-from ruamel.yaml.scalarstring import DoubleQuotedScalarString
 from yamale.schema import Schema
 from yamale.validators import (
     Boolean,
@@ -42,14 +42,14 @@ from custom_validators import (
     Uuid,
     Vocabulary,
 )
+from dedup_definitions import dedup_outputs, share_outputs
+from schema_cache import load_schema
 from yamale2oarepo_config import PRIMITIVES_MAPPING, VOCABULARY_MAPPING
+from yaml_emitter import dump_yaml
 
 log = logging.getLogger("yamale2oarepo")
 
-
-class NonAliasingRTRepresenter(ruamel.yaml.RoundTripRepresenter):
-    def ignore_aliases(self, data):
-        return True
+ATTACHMENT = Path(__file__).parent.parent / "models" / "main" / "file_attachment.yaml"
 
 
 class TrueValidator(Validator):
@@ -84,6 +84,75 @@ validators[Vocabulary.tag] = Vocabulary
 validators[Url.tag] = Url
 
 
+class ParseCache:
+    """
+    Schema snippets (bodies of string includes, fields of links) parsed once,
+    keyed by their kind, text and validator set. Parsed values are shared and
+    must not be changed. The time spent parsing every entry is kept to sum up
+    the time saved by the hits.
+    """
+
+    def __init__(self):
+        self.entries: Dict[tuple, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        self.parse_time = 0.0
+        self.saved_time = 0.0
+
+    def get(self, key: tuple, parse_snippet):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.saved_time += entry[1]
+            return entry[0]
+        start = perf_counter()
+        value = parse_snippet()
+        elapsed = perf_counter() - start
+        self.entries[key] = (value, elapsed)
+        self.misses += 1
+        self.parse_time += elapsed
+        return value
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def stats(self) -> str:
+        return (
+            f"Parsed snippets: {self.misses} parsed in {self.parse_time * 1000:.1f} "
+            f"ms, {self.hits} reused saving {self.saved_time * 1000:.1f} ms"
+        )
+
+
+parse_cache = ParseCache()
+
+
+def _validators_key(validator_set) -> tuple:
+    return tuple(
+        sorted(
+            (str(tag), f"{v.__module__}.{v.__qualname__}")
+            for tag, v in validator_set.items()
+        )
+    )
+
+
+def parse_include_body(body: str, validator_set=DefaultValidators):
+    """Validator of the body of a string include, e.g. enum(...) or choose(...)"""
+    return parse_cache.get(
+        ("include", body, _validators_key(validator_set)),
+        lambda: yamale.make_schema(
+            content="root:\n" + "    " + body, validators=validator_set
+        ).dict["root"],
+    )
+
+
+def parse_link_fields(fields: str):
+    """Fields of a link given as YAML, e.g. '[id, name]'"""
+    return parse_cache.get(
+        ("link_fields", fields),
+        lambda: ruamel.yaml.safe_load(StringIO(fields)),
+    )
+
+
 class KeyModifier:
     def __init__(self, value) -> None:
         self.value = value
@@ -577,7 +646,7 @@ class ModelLink(ModelBase):
         self.target = data.target
         self.fields = data.fields
         if isinstance(self.fields, str):
-            self.fields = ruamel.yaml.safe_load(StringIO(self.fields))
+            self.fields = parse_link_fields(self.fields)
 
     def to_json(self):
         ret = super().to_json()
@@ -660,11 +729,26 @@ class Model:
         }
 
     def add_includes_from(self, filename):
-        included_model = parse_file(filename)
+        self.add_includes(parse_file(filename))
+
+    def add_includes(self, included_model: "Model"):
         for k, v in included_model.model.children.items():
             self.includes[k] = v
         self.includes.update(included_model.includes)
 
+    def copy(self) -> "Model":
+        """
+        Copy of the model whose processing (links, polymorphic base schemas)
+        leaves this model unchanged, without parsing it again: the nodes the
+        processing changes, the includes and the objects holding them, are
+        copied and the others shared
+        """
+        return Model(
+            includes={k: v.copy() for k, v in self.includes.items()},
+            model=self.model.copy(),
+            package=self.package,
+        )
+
     def propagate_polymorphic_base_schemas(self):
         self.model.propagate_polymorphic_base_schemas(self.includes, [])
 
@@ -759,11 +843,7 @@ def parse(d, path, includes, default_search=False, label=None):
     elif clz is Database_id:
         return parse_database_id(d, path, default_search, label)
     elif clz is str:
-        return parse(
-            yamale.make_schema(content="root:\n" + "    " + d).dict["root"],
-            path,
-            includes,
-        )
+        return parse(parse_include_body(d), path, includes)
     else:
         raise NotImplementedError(
             f"Element of type {type(d)} not implemented on path {path}"
@@ -807,7 +887,7 @@ def parse_file(ym_file, modelbase_only=False) -> Union[Model, ModelBase]:
     schema_data = re.sub(
         r"default_search(\s*:\s*)True", r"default_search\1true()", schema_data
     )
-    schema = yamale.make_schema(content=schema_data, validators=validators)
+    schema = load_schema(content=schema_data, validators=validators)
     includes = {}
     model = parse_schema(schema, "", includes)
     parsed_includes = {}
@@ -823,36 +903,16 @@ def parse_file(ym_file, modelbase_only=False) -> Union[Model, ModelBase]:
     if modelbase_only:
         return model
 
-    return Model(
-        model=model,
-        includes=parsed_includes,
-        package=Path(ym_file).stem.lower().replace("_with_description", ""),
-    )
+    return Model(model=model, includes=parsed_includes, package=model_package(ym_file))
 
 
-def set_flow_style(d):
-    if isinstance(d, (list, tuple)):
-        d.fa.set_flow_style()
-    elif isinstance(d, dict):
-        for v in d.values():
-            set_flow_style(v)
+def model_package(ym_file) -> str:
+    """Package of the outputs of a model file"""
+    return Path(ym_file).stem.lower().replace("_with_description", "")
 
 
 def json_to_yaml(json_dict):
-    yaml = ruamel_YAML()
-    yaml.default_flow_style = False
-    yaml.preserve_quotes = True
-    yaml.allow_unicode = True
-    yaml.sort_base_mapping_type_on_output = True
-    yaml.Representer = NonAliasingRTRepresenter
-    io = StringIO()
-    yaml.dump(ruamel_quote_booleans(json_dict), io)
-    io.seek(0)
-    loaded = yaml.load(io)
-    set_flow_style(loaded)
-    io = StringIO()
-    yaml.dump(loaded, io)
-    return io.getvalue()
+    return dump_yaml(json_dict)
 
 
 def get_filename(name: str, out_dir: Path, model_package: str) -> Path:
@@ -862,58 +922,61 @@ def get_filename(name: str, out_dir: Path, model_package: str) -> Path:
     return out_dir / f"{model_package}{name}.yaml"
 
 
-def ruamel_quote_booleans(d):
-    if isinstance(d, (list, tuple)):
-        return [ruamel_quote_booleans(x) for x in d]
-    elif isinstance(d, dict):
-        return {
-            ruamel_quote_booleans(k): ruamel_quote_booleans(v) for k, v in d.items()
-        }
-    elif d in ("Yes", "No", "On", "Off"):
-        return DoubleQuotedScalarString(d)
-    else:
-        return d
-
-
-@click.command()
-@click.argument(
-    "input_file",
-    default=Path(__file__).parent.parent / "models" / "main" / "MST.yaml",
-    required=True,
-)
-@click.option("--debug", type=bool)
-@click.option("--only_defs", type=bool)
-@click.option("--out_dir", type=Path)
-@click.option(
-    "--include",
-    default=Path(__file__).parent.parent
-    / "models"
-    / "main"
-    / "general_parameters.yaml",
-    required=False,
-)
-def run(input_file, debug, out_dir, only_defs, include):
-    if debug:
-        logging.basicConfig(level=logging.DEBUG)
-    ym_file = input_file
-    attachment = (
-        Path(__file__).parent.parent / "models" / "main" / "file_attachment.yaml"
-    )
-    model = parse_file(ym_file)
+def convert(input_file, include=None, only_defs=False):
+    """(json, name, package) of the definitions and metadata of a model"""
+    model = parse_file(input_file)
     if include:
         model.add_includes_from(include)
+    return model_outputs(model, only_defs)
+
+
+def convert_batch(input_files, include=None, only_defs=False):
+    """
+    Outputs of convert for several models with the same include, which is
+    parsed once and given to every model as a copy. The include itself, if one
+    of the input files, is only converted to definitions.
+    """
+    shared = parse_file(include) if include else None
+    out = []
+    for input_file in input_files:
+        is_include = shared is not None and Path(input_file).samefile(include)
+        model = shared.copy() if is_include else parse_file(input_file)
+        if shared is not None:
+            model.add_includes(shared.copy())
+        out += model_outputs(model, only_defs or is_include)
+    return out
+
+
+def model_outputs(model, only_defs=False):
+    """Processes a model with its includes and returns its outputs"""
     model.remove_unused_includes()
     model.set_links()
     model.propagate_polymorphic_base_schemas()
 
     out = [(model.to_defs(), "definitions", model.package)]
-
     if not only_defs:
-        out += [
-            (model.to_json(), "metadata", model.package),
-            (model.to_files_meta(filename=attachment), "files", ""),
-        ]
+        out.append((model.to_json(), "metadata", model.package))
+    return out
+
+
+def share_include_definitions(out, include):
+    """
+    Outputs with the definitions of the include removed from the definitions
+    of the other models, which use them from the definitions file of the
+    include, written next to theirs
+    """
+    package = model_package(include)
+    file = get_filename("definitions", Path(), package).name
+    return share_outputs(out, package, file)
 
+
+def files_output(attachment=ATTACHMENT):
+    """(json, name, package) of the metadata of the files of all models"""
+    return Model.to_files_meta(filename=attachment), "files", ""
+
+
+def write_outputs(out, out_dir=None) -> None:
+    """Writes the outputs to out_dir, or prints them without out_dir"""
     for json_dict, name, model_package in out:
         yaml_text = json_to_yaml(json_dict)
 
@@ -926,5 +989,55 @@ def run(input_file, debug, out_dir, only_defs, include):
             print(yaml_text)
 
 
+@click.command()
+@click.argument("input_files", nargs=-1, type=Path)
+@click.option("--debug", type=bool)
+@click.option(
+    "--stats", is_flag=True, help="Print the time saved by reusing parsed snippets"
+)
+@click.option("--only_defs", type=bool)
+@click.option(
+    "--dedup",
+    is_flag=True,
+    help="Merge identical definitions of a model and print what was removed",
+)
+@click.option(
+    "--share",
+    is_flag=True,
+    help="Write the definitions of the include once, in its definitions file, "
+    "and have the models use them from there",
+)
+@click.option("--out_dir", type=Path)
+@click.option(
+    "--include",
+    default=Path(__file__).parent.parent
+    / "models"
+    / "main"
+    / "general_parameters.yaml",
+    required=False,
+)
+def run(input_files, debug, stats, out_dir, only_defs, dedup, share, include):
+    if debug:
+        logging.basicConfig(level=logging.DEBUG)
+    if not input_files:
+        input_files = [Path(__file__).parent.parent / "models" / "main" / "MST.yaml"]
+    if share and not any(Path(f).samefile(include) for f in input_files):
+        input_files = [*input_files, include]
+    out = convert_batch(input_files, include, only_defs)
+    if dedup:
+        out, reports = dedup_outputs(out)
+        for report in reports:
+            print(report, file=sys.stderr)
+    if share:
+        out, reports = share_include_definitions(out, include)
+        for report in reports:
+            print(report, file=sys.stderr)
+    if not only_defs:
+        out.append(files_output())
+    write_outputs(out, out_dir)
+    if stats:
+        print(parse_cache.stats(), file=sys.stderr)
+
+
 if __name__ == "__main__":
     run()
@@ -10,3 +10,14 @@ VOCABULARY_MAPPING = {
     "title": {"mapping": {"properties": {"en": PRIMITIVES_MAPPING}}},
     "id": {"mapping": PRIMITIVES_MAPPING},
 }
+
+# limits of the OpenSearch index the mapping of every model must stay within:
+# index.mapping.total_fields.limit, index.mapping.nested_fields.limit and
+# index.mapping.depth.limit, None for no limit
+MAPPING_LIMITS = {
+    "fields": 1000,
+    "nested": 50,
+    "polymorphic": None,
+    "depth": 20,
+    "default_search_fields": None,
+}
@@ -0,0 +1,394 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple
+
+from ruamel.yaml.nodes import ScalarNode
+from ruamel.yaml.resolver import VersionedResolver
+
+BEST_WIDTH = 80
+INDENT = 2
+MAX_SIMPLE_KEY_LENGTH = 128
+# read as booleans by YAML 1.1 parsers
+QUOTED = frozenset(("Yes", "No", "On", "Off"))
+
+PLAIN = ""
+SINGLE_QUOTED = "'"
+DOUBLE_QUOTED = '"'
+
+_STR_TAG = "tag:yaml.org,2002:str"
+_BREAKS = "\n\x85\u2028\u2029"
+_WHITESPACE = "\0 \t\r\n\x85\u2028\u2029"
+_SPACES = re.compile("( +)")
+_ESCAPES = {
+    "\0": "0",
+    "\x07": "a",
+    "\x08": "b",
+    "\x09": "t",
+    "\x0A": "n",
+    "\x0B": "v",
+    "\x0C": "f",
+    "\x0D": "r",
+    "\x1B": "e",
+    '"': '"',
+    "\\": "\\",
+    "\x85": "N",
+    "\xA0": "_",
+    "\u2028": "L",
+    "\u2029": "P",
+}
+_resolver = VersionedResolver()
+
+
+class Analysis(NamedTuple):
+    multiline: bool
+    allow_flow_plain: bool
+    allow_block_plain: bool
+    allow_single_quoted: bool
+
+
+def _printable(ch: str) -> bool:
+    return (
+        "\x20" <= ch <= "\x7E"
+        or "\xA0" <= ch <= "\uD7FF"
+        or "\uE000" <= ch <= "\uFFFD"
+        or "\U00010000" <= ch <= "\U0010FFFF"
+    )
+
+
+@lru_cache(maxsize=None)
+def analyze(scalar: str) -> Analysis:
+    """Styles a string can be written in, by the rules of the ruamel.yaml emitter"""
+    if not scalar:
+        return Analysis(False, False, True, True)
+    block_indicators = flow_indicators = line_breaks = special_characters = False
+    leading_space = leading_break = trailing_space = trailing_break = False
+    break_space = space_break = previous_space = previous_break = False
+    if scalar.startswith(("---", "...")):
+        block_indicators = flow_indicators = True
+    preceded_by_whitespace = True
+    followed_by_whitespace = len(scalar) == 1 or scalar[1] in _WHITESPACE
+    last = len(scalar) - 1
+
+    for index, ch in enumerate(scalar):
+        if index == 0:
+            if ch in "#,[]{}&*!|>'\"%@`":
+                flow_indicators = block_indicators = True
+            if ch in "?:":
+                if len(scalar) == 1:
+                    flow_indicators = True
+                if followed_by_whitespace:
+                    block_indicators = True
+            if ch == "-" and followed_by_whitespace:
+                flow_indicators = block_indicators = True
+        else:
+            if ch in ",[]{}":
+                flow_indicators = True
+            if ch == ":" and followed_by_whitespace:
+                flow_indicators = block_indicators = True
+            if ch == "#" and preceded_by_whitespace:
+                flow_indicators = block_indicators = True
+
+        if ch in _BREAKS:
+            line_breaks = True
+        if ch != "\n" and not "\x20" <= ch <= "\x7E":
+            if ch != "\x85" and not (_printable(ch) and ch != "\uFEFF"):
+                special_characters = True
+
+        if ch == " ":
+            leading_space = leading_space or index == 0
+            trailing_space = index == last
+            break_space = break_space or previous_break
+            previous_space, previous_break = True, False
+        elif ch in _BREAKS:
+            leading_break = leading_break or index == 0
+            trailing_break = index == last
+            space_break = space_break or previous_space
+            previous_space, previous_break = False, True
+        else:
+            previous_space = previous_break = False
+
+        preceded_by_whitespace = ch in _WHITESPACE
+        followed_by_whitespace = index + 2 > last or scalar[index + 2] in _WHITESPACE
+
+    flow_plain = block_plain = not (
+        leading_space or leading_break or trailing_space or trailing_break
+    )
+    single_quoted = True
+    if break_space or special_characters or space_break:
+        flow_plain = block_plain = single_quoted = False
+    if line_breaks or flow_indicators:
+        flow_plain = False
+    if line_breaks or block_indicators:
+        block_plain = False
+    return Analysis(line_breaks, flow_plain, block_plain, single_quoted)
+
+
+@lru_cache(maxsize=None)
+def scalar_style(value: str, flow: bool = False, simple_key: bool = False) -> str:
+    """
+    Style of a string in a block mapping, in a flow sequence or as a key. The
+    models used to be written by ruamel.yaml with block sequences and read
+    back to be written with flow sequences, so strings in a flow sequence are
+    also quoted when they could not be plain in a block sequence.
+    """
+    if value in QUOTED:
+        return DOUBLE_QUOTED
+    analysis = analyze(value)
+    if (
+        _resolver.resolve(ScalarNode, value, (True, False)) == _STR_TAG
+        and not (simple_key and analysis.multiline)
+        and analysis.allow_block_plain
+        and (analysis.allow_flow_plain or not flow)
+    ):
+        return PLAIN
+    if "'" in value or "\n" in value:
+        return DOUBLE_QUOTED
+    if analysis.allow_single_quoted and not (simple_key and analysis.multiline):
+        return SINGLE_QUOTED
+    return DOUBLE_QUOTED
+
+
+def represent(value) -> str:
+    """Plain text of a scalar that is not a string"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if value != value:
+            return ".nan"
+        if value in (float("inf"), float("-inf")):
+            return ".inf" if value > 0 else "-.inf"
+        return repr(value).lower()
+    raise TypeError(f"Can not write {type(value).__name__} {value!r} as YAML")
+
+
+class YamlEmitter:
+    """
+    Writes a json-like dict as YAML in one pass, byte for byte as ruamel.yaml
+    does with allow_unicode, no aliases and flow style lists: mappings in block
+    style in insertion order, lines folded after 80 columns and "Yes", "No",
+    "On" and "Off" double quoted. Lists may only contain scalars.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.column = 0
+        self.whitespace = True
+        self.indention = True
+
+    def emit(self, data: dict) -> str:
+        self.__init__()
+        if data:
+            self._mapping(data, 0)
+        else:
+            self._empty("{}")
+        self._write_indent(0)
+        return "".join(self.chunks)
+
+    def _write(self, data: str) -> None:
+        self.chunks.append(data)
+        self.column += len(data)
+
+    def _write_indicator(
+        self,
+        indicator: str,
+        need_whitespace: bool,
+        whitespace: bool = False,
+        indention: bool = False,
+    ) -> None:
+        if self.whitespace or not need_whitespace:
+            self._write(indicator)
+        else:
+            self._write(" " + indicator)
+        self.whitespace = whitespace
+        self.indention = self.indention and indention
+
+    def _line_break(self, data: str = "\n") -> None:
+        self.chunks.append(data)
+        self.column = 0
+        self.whitespace = self.indention = True
+
+    def _write_indent(self, indent: int) -> None:
+        if (
+            not self.indention
+            or self.column > indent
+            or (self.column == indent and not self.whitespace)
+        ):
+            self._line_break()
+        if self.column < indent:
+            self.whitespace = True
+            self._write(" " * (indent - self.column))
+
+    def _empty(self, brackets: str) -> None:
+        self._write_indicator(brackets[0], True, whitespace=True)
+        self._write_indicator(brackets[1], False)
+        self._line_break()
+
+    def _mapping(self, mapping: dict, indent: int) -> None:
+        for key, value in mapping.items():
+            self._write_indent(indent)
+            if isinstance(key, str) and (
+                len(key) >= MAX_SIMPLE_KEY_LENGTH or analyze(key).multiline
+            ):
+                raise ValueError(f"Key {key!r} can not be written as a simple key")
+            self._scalar(key, indent + INDENT, simple_key=True)
+            self._write_indicator(":", False)
+            if isinstance(value, dict):
+                if value:
+                    self._mapping(value, indent + INDENT)
+                else:
+                    self._empty("{}")
+            elif isinstance(value, (list, tuple)):
+                if value:
+                    self._flow_sequence(value, indent + INDENT)
+                else:
+                    self._empty("[]")
+            else:
+                self._scalar(value, indent + INDENT)
+
+    def _flow_sequence(self, items, indent: int) -> None:
+        self._write_indicator("[", True, whitespace=True)
+        for index, item in enumerate(items):
+            if index:
+                self._write_indicator(",", False)
+            if self.column > BEST_WIDTH:
+                self._write_indent(indent)
+            if isinstance(item, (dict, list, tuple)):
+                raise TypeError(f"Can not write {item!r} in a flow style list")
+            self._scalar(item, indent + INDENT, flow=True)
+        self._write_indicator("]", False)
+
+    def _scalar(
+        self, value, indent: int, flow: bool = False, simple_key: bool = False
+    ) -> None:
+        if not isinstance(value, str):
+            self._write_plain(represent(value), indent, not simple_key)
+            return
+        style = scalar_style(value, flow, simple_key)
+        if style == PLAIN:
+            self._write_plain(value, indent, not simple_key)
+        elif style == SINGLE_QUOTED:
+            self._write_single_quoted(value, indent, not simple_key)
+        else:
+            self._write_double_quoted(value, indent, not simple_key)
+
+    def _write_plain(self, text: str, indent: int, split: bool) -> None:
+        if not text:
+            return
+        if not self.whitespace:
+            self._write(" ")
+        self.whitespace = self.indention = False
+        if self.column + len(text) <= BEST_WIDTH:
+            self._write(text)
+            return
+        # plain scalars have no line breaks, they are folded at single spaces
+        for index, chunk in enumerate(_SPACES.split(text)):
+            if index % 2 == 0:
+                if len(chunk) > BEST_WIDTH and self.column > indent:
+                    # words longer than a line get a line of their own
+                    self._write_indent(indent)
+                self._write(chunk)
+            elif len(chunk) == 1 and self.column > BEST_WIDTH and split:
+                self._write_indent(indent)
+                self.whitespace = self.indention = False
+            else:
+                self._write(chunk)
+
+    def _write_single_quoted(self, text: str, indent: int, split: bool) -> None:
+        self._write_indicator("'", True)
+        spaces = breaks = False
+        start = end = 0
+        while end <= len(text):
+            ch = text[end] if end < len(text) else None
+            if spaces:
+                if ch != " ":
+                    if (
+                        start + 1 == end
+                        and self.column > BEST_WIDTH
+                        and split
+                        and start != 0
+                        and end != len(text)
+                    ):
+                        self._write_indent(indent)
+                    else:
+                        self._write(text[start:end])
+                    start = end
+            elif breaks:
+                if ch is None or ch not in _BREAKS:
+                    if text[start] == "\n":
+                        self._line_break()
+                    for br in text[start:end]:
+                        self._line_break(br)
+                    self._write_indent(indent)
+                    start = end
+            elif ch is None or ch in " " + _BREAKS or ch == "'":
+                if start < end:
+                    self._write(text[start:end])
+                    start = end
+            if ch == "'":
+                self._write("''")
+                start = end + 1
+            if ch is not None:
+                spaces = ch == " "
+                breaks = ch in _BREAKS
+            end += 1
+        self._write_indicator("'", False)
+
+    def _write_double_quoted(self, text: str, indent: int, split: bool) -> None:
+        self._write_indicator('"', True)
+        start = end = 0
+        while end <= len(text):
+            ch = text[end] if end < len(text) else None
+            if ch is None or ch in '"\\\x85\u2028\u2029\uFEFF' or not _printable(ch):
+                if start < end:
+                    self._write(text[start:end])
+                    start = end
+                if ch is not None:
+                    if ch in _ESCAPES:
+                        self._write("\\" + _ESCAPES[ch])
+                    elif ch <= "\xFF":
+                        self._write("\\x%02X" % ord(ch))
+                    elif ch <= "\uFFFF":
+                        self._write("\\u%04X" % ord(ch))
+                    else:
+                        self._write("\\U%08X" % ord(ch))
+                    start = end + 1
+            if (
+                0 < end < len(text) - 1
+                and (ch == " " or start >= end)
+                and self.column + (end - start) > BEST_WIDTH
+                and split
+            ):
+                # no escaped line break is needed before a word that starts
+                # the next line and is followed by a single space
+                need_backslash = True
+                try:
+                    space = text.index(" ", end)
+                    if (
+                        '"' not in text[end:space]
+                        and "'" not in text[end:space]
+                        and text[space + 1] != " "
+                        and text[end - 1 : end + 1] != "  "
+                    ):
+                        need_backslash = False
+                except (ValueError, IndexError):
+                    pass
+                self._write(text[start:end] + ("\\" if need_backslash else ""))
+                start = max(start, end)
+                self._write_indent(indent)
+                self.whitespace = self.indention = False
+                if text[start] == " ":
+                    if need_backslash:
+                        self._write("\\")
+                    else:
+                        start += 1
+            end += 1
+        self._write_indicator('"', False)
+
+
+def dump_yaml(data: dict) -> str:
+    """YAML text of a json-like dict, see YamlEmitter"""
+    return YamlEmitter().emit(data)